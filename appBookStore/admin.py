@@ -1,5 +1,146 @@
-from django.contrib import admin
+"""Administración del catálogo preparada para catálogos grandes.
+
+- El formulario del libro elige editorial y autores con autocompletado en
+  lugar de volcar todas las filas en un ``<select>``.
+- Los listados no hacen ``COUNT(*)`` de la tabla entera (``PaginadorEstimado``)
+  y traen la editorial del libro en la misma consulta.
+- La búsqueda de libros usa el índice FTS5 del buscador del catálogo (o el
+  índice del ISBN normalizado); la de autores y editoriales, que también sirve al
+  autocompletado, es un rango por prefijo sobre el índice del nombre en
+  minúsculas y sin acentos (``nombre_normalizado``): «garcía» encuentra «García».
+- Las acciones masivas son un solo ``UPDATE``, sin cargar los libros.
+  Como no pasan por ``save()`` actualizan ``updated_at`` e invalidan la caché
+  ellas mismas; el índice de búsqueda no cambia (no incluye ni el stock ni la
+  editorial).
+"""
+
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db.models import F, Max, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from . import cache
 from .models import Book, Author, Publisher
-admin.site.register(Book)
-admin.site.register(Author)
-admin.site.register(Publisher)
\ No newline at end of file
+from .search import buscar_libros
+from .typeahead import normalizar
+
+# Con filtros o búsqueda se cuenta como mucho hasta aquí.
+MAX_RECUENTO = 10000
+
+
+class PaginadorEstimado(Paginator):
+    """``Paginator`` que no cuenta tablas enteras.
+
+    Sin filtros el total se estima con el mayor id, una sola búsqueda en el
+    índice de la clave primaria (los huecos de los borrados lo inflan, así
+    que las últimas páginas pueden salir vacías). Con filtros se cuenta hasta
+    ``MAX_RECUENTO`` y no se pagina más allá.
+    """
+
+    @cached_property
+    def count(self):
+        consulta = self.object_list.order_by()
+        if not consulta.query.where:
+            return consulta.aggregate(ultimo=Max('pk'))['ultimo'] or 0
+        return consulta[:MAX_RECUENTO].count()
+
+
+class AdminCatalogo(admin.ModelAdmin):
+    paginator = PaginadorEstimado
+    # Evita el segundo recuento, el del total sin filtrar ("N en total").
+    show_full_result_count = False
+
+
+class AdminPorNombre(AdminCatalogo):
+    """Autores y editoriales: listado y búsqueda por el índice de ``nombre_normalizado``."""
+    list_display = ('name',)
+    ordering = ('nombre_normalizado', 'pk')
+    search_fields = ('name',)
+
+    def get_search_results(self, request, queryset, search_term):
+        # La misma normalización que al guardar (ver NombreNormalizadoField).
+        prefijo = normalizar(search_term)
+        if not prefijo:
+            return queryset, False
+        # Un rango en lugar de LIKE, que en SQLite no usaría el índice.
+        siguiente = prefijo[:-1] + chr(ord(prefijo[-1]) + 1)
+        queryset = queryset.filter(nombre_normalizado__gte=prefijo, nombre_normalizado__lt=siguiente)
+        return queryset, False
+
+
+@admin.register(Author)
+class AuthorAdmin(AdminPorNombre):
+    pass
+
+
+@admin.register(Publisher)
+class PublisherAdmin(AdminPorNombre):
+    pass
+
+
+class AccionesLibroForm(helpers.ActionForm):
+    cantidad = forms.IntegerField(required=False, label='Cantidad')
+    editorial = forms.ModelChoiceField(
+        Publisher.objects.all(), required=False, label='Editorial',
+        widget=AutocompleteSelect(Book._meta.get_field('publisher'), admin.site),
+    )
+
+
+def _dato(request, campo):
+    # Django valida el formulario de acciones pero no pasa sus datos a la acción.
+    try:
+        return AccionesLibroForm.base_fields[campo].clean(request.POST.get(campo))
+    except ValidationError:
+        return None
+
+
+def _invalidar(request, *etiquetas):
+    if request.POST.get('select_across') == '1':
+        cache.invalidar_todo()
+    else:
+        seleccionados = request.POST.getlist(helpers.ACTION_CHECKBOX_NAME)
+        cache.invalidar(*etiquetas, *(cache.libro(pk) for pk in seleccionados))
+
+
+@admin.register(Book)
+class BookAdmin(AdminCatalogo):
+    list_display = ('title', 'publisher', 'publication_date', 'stock', 'isbn')
+    list_select_related = ('publisher',)
+    autocomplete_fields = ('publisher', 'authors')
+    search_fields = ('title',)
+    action_form = AccionesLibroForm
+    actions = ('ajustar_stock', 'cambiar_editorial')
+
+    def get_search_results(self, request, queryset, search_term):
+        busqueda = buscar_libros(search_term) if search_term.strip() else None
+        if busqueda is None:
+            return super().get_search_results(request, queryset, search_term)
+        return queryset.filter(busqueda.filtro()), False
+
+    @admin.action(description='Sumar la cantidad al stock (sin bajar de 0)')
+    def ajustar_stock(self, request, queryset):
+        cantidad = _dato(request, 'cantidad')
+        if cantidad is None:
+            self.message_user(request, 'Indica la cantidad que se suma al stock.', messages.WARNING)
+            return
+        n = queryset.update(stock=Greatest(F('stock') + cantidad, Value(0)), updated_at=timezone.now())
+        # El stock se muestra en el detalle y en las facetas del listado.
+        _invalidar(request, cache.LISTA_LIBROS)
+        self.message_user(request, f'Stock ajustado en {n} libros.', messages.SUCCESS)
+
+    @admin.action(description='Pasar a la editorial elegida')
+    def cambiar_editorial(self, request, queryset):
+        editorial = _dato(request, 'editorial')
+        if editorial is None:
+            self.message_user(request, 'Elige la editorial.', messages.WARNING)
+            return
+        n = queryset.update(publisher=editorial, updated_at=timezone.now())
+        # Cambian las editoriales de origen, que no se conocen sin leer los libros.
+        cache.invalidar_todo()
+        self.message_user(request, f'{n} libros pasados a {editorial}.', messages.SUCCESS)
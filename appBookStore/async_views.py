@@ -0,0 +1,93 @@
+"""Versiones asíncronas de las vistas del catálogo para el punto de entrada ASGI.
+
+Con ``CATALOGO_ASYNC_VIEWS`` activado (lo hace ``bookStore/asgi.py``),
+``urls.py`` enruta el catálogo a estas vistas y las peticiones no pasan por el
+ejecutor de hilos síncrono. Los datos se leen con el ORM asíncrono y se
+materializan antes de renderizar, de modo que las plantillas no lanzan
+consultas desde el bucle de eventos.
+
+La paginación (``Paginator`` y cursores) y la búsqueda del listado de libros
+(FTS5 y facetas) siguen siendo síncronas y se ejecutan con ``sync_to_async``.
+"""
+
+from asgiref.sync import sync_to_async
+from django.shortcuts import aget_object_or_404, render
+
+from . import cache, related
+from .cache import aetiquetar, cache_catalogo
+from .conditional import condicional, marca_autor, marca_editorial, marca_libro
+from .directories import SECCIONES, directorio, seccion_de
+from .models import Author, Book, Publisher
+from .pagination import paginar_catalogo
+from .views import buscar_pagina_de_libros, libros_recientes_por_editorial, respuesta_listado
+
+
+@cache_catalogo
+async def index(request):
+    await aetiquetar(request, cache.PORTADA)
+    libro_por_editorial = {
+        libro.publisher_id: libro async for libro in libros_recientes_por_editorial()
+    }
+    editoriales_con_libro = {
+        publisher: libro_por_editorial.get(publisher.pk)
+        async for publisher in Publisher.objects.all()
+    }
+    return render(request, 'index.html', {'editoriales': editoriales_con_libro})
+
+
+@cache_catalogo
+async def book_list(request):
+    await aetiquetar(request, cache.LISTA_LIBROS)
+    form, pagina, facetas = await sync_to_async(buscar_pagina_de_libros)(request)
+    return respuesta_listado(request, form, pagina, facetas)
+
+
+@cache_catalogo
+@condicional(marca_libro)
+async def book_detail(request, book_id):
+    await aetiquetar(request, cache.libro(book_id))
+    libro = await aget_object_or_404(Book.objects.select_related('publisher'), pk=book_id)
+    await aetiquetar(request, cache.editorial(libro.publisher_id))
+    autores = [autor async for autor in libro.authors.all()]
+    await aetiquetar(request, *(cache.autor(a.pk) for a in autores))
+    relacionados = [r async for r in related.de_libro(book_id)]
+    await aetiquetar(request, *(cache.libro(r.pk) for r in relacionados))
+    return render(request, 'book.html', {'libro': libro, 'autores': autores, 'relacionados': relacionados})
+
+
+@cache_catalogo
+async def publisher_list(request):
+    await aetiquetar(request, cache.LISTA_EDITORIALES)
+    seccion = seccion_de(request.GET)
+    pagina = await sync_to_async(directorio)(Publisher.objects.all(), 'publisher', seccion, request.GET)
+    return render(request, 'publishers.html', {
+        'editoriales': pagina, 'pagina': pagina, 'seccion': seccion, 'secciones': SECCIONES,
+    })
+
+
+@cache_catalogo
+@condicional(marca_editorial)
+async def publisher_detail(request, publisher_id):
+    await aetiquetar(request, cache.editorial(publisher_id), cache.libros_de_editorial(publisher_id))
+    editorial = await aget_object_or_404(Publisher, pk=publisher_id)
+    libros = await sync_to_async(paginar_catalogo)(Book.objects.filter(publisher=editorial), request.GET)
+    return render(request, 'publisher.html', {'editorial': editorial, 'libros': libros, 'pagina': libros})
+
+
+@cache_catalogo
+async def author_list(request):
+    await aetiquetar(request, cache.LISTA_AUTORES)
+    seccion = seccion_de(request.GET)
+    pagina = await sync_to_async(directorio)(Author.objects.all(), 'authors', seccion, request.GET)
+    return render(request, 'authors.html', {
+        'autores': pagina, 'pagina': pagina, 'seccion': seccion, 'secciones': SECCIONES,
+    })
+
+
+@cache_catalogo
+@condicional(marca_autor)
+async def author_detail(request, author_id):
+    await aetiquetar(request, cache.autor(author_id), cache.libros_de_autor(author_id))
+    autor = await aget_object_or_404(Author, pk=author_id)
+    libros = await sync_to_async(paginar_catalogo)(Book.objects.filter(authors=autor), request.GET)
+    return render(request, 'author.html', {'autor': autor, 'libros': libros, 'pagina': libros})
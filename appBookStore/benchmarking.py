@@ -0,0 +1,98 @@
+"""Utilidades compartidas por los benchmarks: bases de datos temporales y
+catálogos sintéticos deterministas."""
+
+import random
+from contextlib import contextmanager
+from datetime import date
+from itertools import accumulate
+
+from django.db import connection, connections
+
+from .models import Author, Book, Publisher, RelatedBook, normalizar_isbn
+from .search import reconstruir_indice
+
+# Palabras reales mezcladas con el vocabulario sintético, para poder buscarlas.
+PALABRAS = ['sombra', 'viento', 'corazón', 'noche', 'ciudad', 'memoria', 'jardín', 'río',
+            'tiempo', 'silencio', 'fuego', 'mar', 'invierno', 'camino', 'historia', 'luz']
+
+_SILABAS = ['ma', 'ri', 'so', 'la', 'te', 'ne', 'bru', 'cal', 'dor', 'fen', 'gis', 'lun',
+            'par', 'quen', 'tro', 'vel']
+
+_LOTE = 10000
+
+
+@contextmanager
+def base_de_datos_temporal():
+    """Crea la base de datos de pruebas (vacía, migrada) y la destruye al salir."""
+    nombre_original = connection.creation.create_test_db(verbosity=0, serialize=False)
+    # Como en las pruebas, la réplica del perfil de producción apunta a la misma base.
+    for alias in connections:
+        if connections[alias].settings_dict['TEST'].get('MIRROR') == connection.alias:
+            connections[alias].creation.set_as_test_mirror(connection.settings_dict)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(nombre_original, verbosity=0)
+
+
+def vaciar_catalogo():
+    """Borra libros, autores y editoriales con DELETE directos, sin señales."""
+    tablas = [RelatedBook._meta.db_table, Book.authors.through._meta.db_table, Book._meta.db_table,
+              Author._meta.db_table, Publisher._meta.db_table]
+    with connection.cursor() as cursor:
+        for tabla in tablas:
+            cursor.execute(f'DELETE FROM "{tabla}"')
+    reconstruir_indice()
+
+
+def vocabulario(rnd, n=20000):
+    palabras = {''.join(rnd.choices(_SILABAS, k=rnd.randint(2, 4))) for _ in range(n)}
+    return sorted(palabras) + PALABRAS
+
+
+def sembrar_catalogo(n_libros, semilla=42, n_editoriales=None, n_autores=None, indexar=True):
+    """Crea ``n_libros`` libros con un reparto de editoriales y autores realista.
+
+    Por defecto hay una editorial cada 200 libros y un autor cada 4; cada libro
+    tiene de 1 a 3 autores y las editoriales grandes concentran más títulos.
+    Con la misma semilla el catálogo generado es siempre el mismo.
+    """
+    rnd = random.Random(semilla)
+    vocab = vocabulario(rnd)
+    n_editoriales = n_editoriales or max(5, n_libros // 200)
+    n_autores = n_autores or max(10, n_libros // 4)
+
+    editoriales = Publisher.objects.bulk_create(
+        [Publisher(name=f'Editorial {rnd.choice(vocab).capitalize()} {i}') for i in range(n_editoriales)]
+    )
+    autores = Author.objects.bulk_create(
+        [Author(name=f'{rnd.choice(vocab).capitalize()} {rnd.choice(vocab).capitalize()} {i}')
+         for i in range(n_autores)]
+    )
+    # Pesos 1/k (acumulados): pocas editoriales con muchos libros y una cola larga.
+    pesos = list(accumulate(1 / (k + 1) for k in range(n_editoriales)))
+    relacion = Book.authors.through
+
+    for inicio in range(0, n_libros, _LOTE):
+        fin = min(inicio + _LOTE, n_libros)
+        libros = []
+        for i in range(inicio, fin):
+            isbn = f'978-84-{i:07d}'
+            libros.append(Book(
+                publisher=rnd.choices(editoriales, cum_weights=pesos)[0],
+                title=' '.join(rnd.sample(vocab, 3)).capitalize(),
+                publication_date=date(rnd.randint(1950, 2024), rnd.randint(1, 12), rnd.randint(1, 28)),
+                stock=rnd.choice([0, 0, 1, 2, 5, 10, 25, 100]),
+                isbn=isbn,
+                isbn_normalizado=normalizar_isbn(isbn),
+                summary=' '.join(rnd.choices(vocab, k=20)),
+            ))
+        libros = Book.objects.bulk_create(libros)
+        relacion.objects.bulk_create([
+            relacion(book_id=libro.pk, author_id=autor.pk)
+            for libro in libros
+            for autor in rnd.sample(autores, rnd.choice([1, 1, 1, 2, 2, 3]))
+        ])
+
+    if indexar:
+        reconstruir_indice()
@@ -0,0 +1,231 @@
+"""Caché de respuestas del catálogo invalidada por etiquetas.
+
+Cada respuesta cacheada guarda, junto al contenido, la versión que tenían en
+ese momento las etiquetas de las que depende (``libro:5``, ``lista:autores``,
+...). Al servirla se comparan con las versiones actuales con un solo
+``get_many``; las señales de ``signals.py`` cambian la versión de las
+etiquetas afectadas por cada modificación. Así no hace falta enumerar claves,
+lo que permite usar tanto la caché en memoria local como la basada en
+ficheros.
+"""
+
+import hashlib
+import uuid
+from functools import wraps
+from typing import Iterable, Optional
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+from django.utils.translation import get_language
+
+# Etiqueta incluida en todas las respuestas: invalidarla vacía el catálogo
+# entero (por ejemplo tras una importación masiva sin señales).
+TODO = 'catalogo'
+PORTADA = 'portada'
+LISTA_LIBROS = 'lista:libros'
+LISTA_EDITORIALES = 'lista:editoriales'
+LISTA_AUTORES = 'lista:autores'
+
+
+def libro(pk):
+    return f'libro:{pk}'
+
+
+def editorial(pk):
+    return f'editorial:{pk}'
+
+
+def libros_de_editorial(pk):
+    return f'editorial-libros:{pk}'
+
+
+def autor(pk):
+    return f'autor:{pk}'
+
+
+def libros_de_autor(pk):
+    return f'autor-libros:{pk}'
+
+
+def _cache():
+    return caches[getattr(settings, 'CATALOGO_CACHE_ALIAS', 'default')]
+
+
+def _activa():
+    return getattr(settings, 'CATALOGO_CACHE_ENABLED', True)
+
+
+def _clave_version(etiqueta):
+    return f'catalogo:v:{etiqueta}'
+
+
+def _versiones(etiquetas: Iterable[str]) -> dict[str, str]:
+    cache = _cache()
+    claves = {_clave_version(e): e for e in etiquetas}
+    actuales = cache.get_many(claves)
+    for clave in claves.keys() - actuales.keys():
+        # Versiones aleatorias en lugar de contadores: si la caché expulsa una
+        # versión, la nueva nunca coincidirá con la que guardaba una entrada.
+        cache.add(clave, uuid.uuid4().hex, None)
+        actuales[clave] = cache.get(clave)
+    return {claves[clave]: version for clave, version in actuales.items()}
+
+
+def invalidar(*etiquetas: str) -> None:
+    """Cambia la versión de las etiquetas: las respuestas que dependan de
+    ellas dejan de servirse."""
+    if not etiquetas:
+        return
+    _cache().set_many({_clave_version(e): uuid.uuid4().hex for e in set(etiquetas)}, None)
+
+
+def invalidar_todo() -> None:
+    invalidar(TODO)
+
+
+def etiquetar(request, *etiquetas: str) -> None:
+    """Declara desde la vista las etiquetas de las que depende la respuesta.
+
+    Las versiones se leen en este momento, antes de consultar los datos
+    dependientes, de modo que un cambio concurrente nunca queda tapado por
+    una respuesta que ya estaba desfasada al guardarse.
+    """
+    if hasattr(request, '_catalogo_etiquetas'):
+        request._catalogo_etiquetas.update(_versiones(etiquetas))
+
+
+async def aetiquetar(request, *etiquetas: str) -> None:
+    """Versión de ``etiquetar`` para las vistas asíncronas."""
+    if hasattr(request, '_catalogo_etiquetas'):
+        await sync_to_async(etiquetar)(request, *etiquetas)
+
+
+def memorizar(clave: str, etiquetas: Iterable[str], calcular):
+    """Guarda el resultado de ``calcular()`` (datos, no respuestas) con las
+    versiones de ``etiquetas``; se recalcula cuando alguna cambia."""
+    if not _activa():
+        return calcular()
+    cache = _cache()
+    clave = f'catalogo:d:{clave}'
+    entrada = cache.get(clave)
+    if entrada is not None:
+        versiones, valor = entrada
+        if _versiones(versiones) == versiones:
+            return valor
+    # Las versiones se leen antes de calcular, como en etiquetar().
+    versiones = _versiones([TODO, *etiquetas])
+    valor = calcular()
+    cache.set(clave, (versiones, valor), getattr(settings, 'CATALOGO_CACHE_TIMEOUT', 600))
+    return valor
+
+
+def _clave_respuesta(request) -> str:
+    parametros = sorted(
+        (clave, valor)
+        for clave, valores in request.GET.lists()
+        for valor in valores
+        if valor != ''
+    )
+    variante = (
+        request.headers.get('x-requested-with') == 'XMLHttpRequest',
+        'application/json' in request.headers.get('accept', ''),
+    )
+    crudo = repr((get_language(), request.path, parametros, variante))
+    return 'catalogo:r:' + hashlib.md5(crudo.encode('utf-8')).hexdigest()
+
+
+def _contar(evento: str) -> None:
+    cache = _cache()
+    clave = f'catalogo:stats:{evento}'
+    try:
+        cache.incr(clave)
+    except ValueError:
+        cache.add(clave, 0, None)
+        cache.incr(clave)
+
+
+def estadisticas() -> dict[str, int]:
+    valores = _cache().get_many(['catalogo:stats:hit', 'catalogo:stats:miss'])
+    hits = valores.get('catalogo:stats:hit', 0)
+    misses = valores.get('catalogo:stats:miss', 0)
+    return {'hits': hits, 'misses': misses}
+
+
+def reiniciar_estadisticas() -> None:
+    _cache().delete_many(['catalogo:stats:hit', 'catalogo:stats:miss'])
+
+
+def _respuesta_cacheada(request) -> Optional[HttpResponse]:
+    """La respuesta guardada para ``request`` si sus etiquetas siguen vigentes.
+
+    Si no la hay, prepara ``request`` para que la vista declare sus etiquetas.
+    """
+    entrada = _cache().get(_clave_respuesta(request))
+    if entrada is not None:
+        versiones, status, cabeceras, contenido = entrada
+        if _versiones(versiones) == versiones:
+            _contar('hit')
+            response = HttpResponse(contenido, status=status)
+            for nombre, valor in cabeceras:
+                response[nombre] = valor
+            response['X-Catalog-Cache'] = 'HIT'
+            if response.has_header('ETag'):
+                # GET condicional sin consultas: la ETag guardada sigue vigente
+                # mientras lo estén las etiquetas (ver conditional.py).
+                return get_conditional_response(
+                    request, etag=response['ETag'],
+                    last_modified=parse_http_date_safe(response.get('Last-Modified')), response=response,
+                )
+            return response
+
+    _contar('miss')
+    request._catalogo_etiquetas = {}
+    etiquetar(request, TODO)
+    return None
+
+
+def _guardar_respuesta(request, response) -> None:
+    if response.status_code == 200 and not response.streaming and not response.cookies:
+        entrada = (request._catalogo_etiquetas, response.status_code,
+                   list(response.items()), response.content)
+        _cache().set(_clave_respuesta(request), entrada, getattr(settings, 'CATALOGO_CACHE_TIMEOUT', 600))
+    response['X-Catalog-Cache'] = 'MISS'
+
+
+def cache_catalogo(vista):
+    """Decorador para las vistas del catálogo que cachea la respuesta por
+    idioma, ruta, parámetros normalizados y variante (HTML, fragmento o JSON).
+
+    Admite vistas síncronas y asíncronas; en estas el acceso a la caché se
+    hace fuera del bucle de eventos, por si el backend bloquea (ficheros).
+    """
+    if iscoroutinefunction(vista):
+        @wraps(vista)
+        async def envoltorio_asincrono(request, *args, **kwargs):
+            if not _activa() or request.method not in ('GET', 'HEAD'):
+                return await vista(request, *args, **kwargs)
+            response = await sync_to_async(_respuesta_cacheada)(request)
+            if response is not None:
+                return response
+            response = await vista(request, *args, **kwargs)
+            await sync_to_async(_guardar_respuesta)(request, response)
+            return response
+
+        return envoltorio_asincrono
+
+    @wraps(vista)
+    def envoltorio(request, *args, **kwargs):
+        if not _activa() or request.method not in ('GET', 'HEAD'):
+            return vista(request, *args, **kwargs)
+        response = _respuesta_cacheada(request)
+        if response is not None:
+            return response
+        response = vista(request, *args, **kwargs)
+        _guardar_respuesta(request, response)
+        return response
+
+    return envoltorio
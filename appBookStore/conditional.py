@@ -0,0 +1,118 @@
+"""GET condicional (ETag / Last-Modified) para los detalles del catálogo.
+
+La marca de una página sale de una sola consulta por clave primaria e índice
+con los ``updated_at`` de lo que muestra: el libro, su editorial, sus
+autores y sus libros relacionados (y cuándo se calcularon, ver related.py);
+o la editorial o el autor junto con el número de libros y el
+``updated_at`` más reciente entre ellos (un libro borrado cambia el número).
+Si el cliente ya tiene esa versión se responde 304 sin consultar nada más
+ni renderizar la plantilla. La respuesta cacheada guarda la ETag, así que
+en un acierto de ``cache_catalogo`` el 304 se decide sin ninguna consulta.
+
+``updated_at`` lo mantiene ``auto_now`` al guardar; los ``UPDATE`` directos
+(stock de las reservas) y los cambios de autores de un libro lo actualizan
+explícitamente (ver reservations.py y signals.py).
+"""
+
+import hashlib
+from dataclasses import dataclass
+from datetime import datetime
+from functools import wraps
+from typing import Optional
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from .models import Author, Book, Publisher
+
+
+@dataclass(frozen=True)
+class Marca:
+    etag: str
+    ultima_modificacion: datetime
+
+
+def _marca(filtro, **agregados) -> Optional[Marca]:
+    # aggregate() sobre la fila y sus relaciones: una consulta sin GROUP BY.
+    partes = filtro.aggregate(propio=Max('updated_at'), **agregados)
+    if partes['propio'] is None:
+        return None
+    valores = tuple(partes.values())
+    huella = hashlib.md5(repr(valores).encode('utf-8')).hexdigest()[:16]
+    fechas = [valor for valor in valores if isinstance(valor, datetime)]
+    # Débil: la misma versión de los datos, no necesariamente los mismos bytes.
+    return Marca(etag=f'W/"{huella}"', ultima_modificacion=max(fechas))
+
+
+def marca_libro(book_id) -> Optional[Marca]:
+    return _marca(Book.objects.filter(pk=book_id),
+                  editorial=Max('publisher__updated_at'), autores=Max('authors__updated_at'),
+                  calculo_relacionados=Max('relacionados__computed_at'),
+                  libros_relacionados=Max('relacionados__related__updated_at'),
+                  n_relacionados=Count('relacionados__related', distinct=True))
+
+
+def marca_editorial(publisher_id) -> Optional[Marca]:
+    return _marca(Publisher.objects.filter(pk=publisher_id),
+                  libros=Max('book__updated_at'), n_libros=Count('book'))
+
+
+def marca_autor(author_id) -> Optional[Marca]:
+    return _marca(Author.objects.filter(pk=author_id),
+                  libros=Max('book__updated_at'), n_libros=Count('book'))
+
+
+def _no_modificada(request, marca: Optional[Marca]):
+    if marca is None:
+        # No existe: la vista responderá 404.
+        return None
+    return get_conditional_response(
+        request, etag=marca.etag, last_modified=int(marca.ultima_modificacion.timestamp()),
+    )
+
+
+def _anotar(response, marca: Optional[Marca]):
+    if marca is not None and response.status_code in (200, 304):
+        response.headers.setdefault('ETag', marca.etag)
+        response.headers.setdefault('Last-Modified', http_date(marca.ultima_modificacion.timestamp()))
+        # Sin heurísticas de frescura: el navegador siempre pregunta (y recibe un 304).
+        patch_cache_control(response, no_cache=True)
+    return response
+
+
+def condicional(calcular_marca):
+    """Decorador para las vistas de detalle: ``calcular_marca`` recibe los
+    mismos argumentos que la vista (``book_id``...) y devuelve su ``Marca``.
+
+    Como ``cache_catalogo``, admite vistas síncronas y asíncronas; va por
+    dentro de él para que la ETag quede en la respuesta cacheada.
+    """
+    def decorador(vista):
+        if iscoroutinefunction(vista):
+            @wraps(vista)
+            async def envoltorio_asincrono(request, *args, **kwargs):
+                if request.method not in ('GET', 'HEAD'):
+                    return await vista(request, *args, **kwargs)
+                marca = await sync_to_async(calcular_marca)(*args, **kwargs)
+                response = _no_modificada(request, marca)
+                if response is None:
+                    response = await vista(request, *args, **kwargs)
+                return _anotar(response, marca)
+
+            return envoltorio_asincrono
+
+        @wraps(vista)
+        def envoltorio(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return vista(request, *args, **kwargs)
+            marca = calcular_marca(*args, **kwargs)
+            response = _no_modificada(request, marca)
+            if response is None:
+                response = vista(request, *args, **kwargs)
+            return _anotar(response, marca)
+
+        return envoltorio
+
+    return decorador
@@ -0,0 +1,157 @@
+"""Agenda de contactos de cada usuario con sincronización incremental.
+
+Cada usuario solo lee y cambia sus contactos (``Contact.owner``). Cada alta, modificación o baja recibe el siguiente número de la secuencia de
+``ContactSequence`` en ``Contact.seq``. El token de sincronización es el
+último número que ha visto el cliente: la respuesta lleva solo los contactos
+del usuario con un ``seq`` mayor (un contacto cambiado varias veces aparece
+una vez, en su último estado) y las bajas como lápidas, así que su tamaño
+depende de los cambios y no del tamaño de la agenda. La secuencia es común a
+todos los usuarios y la consulta es un rango sobre el índice (owner, seq).
+
+La secuencia se reserva con un ``UPDATE`` de su fila al empezar la
+transacción de escritura. Esa fila queda bloqueada hasta el commit, así que
+los números se confirman en orden: un cliente nunca puede ver el cambio N+1
+antes que el N y saltarse este para siempre. (En SQLite, además, escribir
+antes de leer evita pasar de lectura a escritura dentro de la transacción.)
+
+Los clientes envían sus cambios por lotes; cada lote se aplica en una sola
+transacción con una consulta para los contactos existentes, un
+``bulk_update`` y un ``bulk_create``. Si dos clientes cambian el mismo
+contacto, gana el último en llegar. Los cambios no válidos (un correo que el
+formulario rechaza, por ejemplo) no se aplican y se devuelven en
+``rejected`` con sus errores; los demás del lote sí, para que el cliente
+pueda descartar esos y no reenviar el lote entero para siempre.
+"""
+
+import uuid
+from typing import Iterable
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .forms import ContactForm
+from .models import Contact, ContactSequence
+
+# Cambios por lote de escritura y por respuesta.
+MAX_CAMBIOS = 500
+LIMITE = 500
+
+
+class CambiosNoValidos(Exception):
+    """El lote entero no es válido (no es una lista o es demasiado grande)."""
+
+    def __init__(self, errores: dict):
+        super().__init__('Cambios de contactos no válidos')
+        self.errores = errores
+
+
+def leer_token(valor) -> int:
+    """El número de secuencia de un token (``0`` si no hay); ``ValueError`` si no es válido."""
+    if valor in (None, ''):
+        return 0
+    token = int(valor)
+    if token < 0:
+        raise ValueError(valor)
+    return token
+
+
+def _reservar(n: int) -> int:
+    """Reserva ``n`` números consecutivos de la secuencia y devuelve el primero."""
+    if not ContactSequence.objects.filter(pk=1).update(last_value=F('last_value') + n):
+        ContactSequence.objects.get_or_create(pk=1)
+        ContactSequence.objects.filter(pk=1).update(last_value=F('last_value') + n)
+    return ContactSequence.objects.values_list('last_value', flat=True).get(pk=1) - n + 1
+
+
+def _validar(cambios) -> tuple[dict, dict]:
+    """``{uid: datos}`` (``None`` en las bajas) de los cambios válidos y, de
+    los demás, posición en el lote -> ``{campo: [códigos de error]}``."""
+    if not isinstance(cambios, list) or len(cambios) > MAX_CAMBIOS:
+        raise CambiosNoValidos({'changes': ['max_changes']})
+    validos, errores = {}, {}
+    for i, cambio in enumerate(cambios):
+        try:
+            uid = uuid.UUID(str(cambio['id']))
+        except (KeyError, TypeError, ValueError):
+            errores[i] = {'id': ['invalid']}
+            continue
+        if cambio.get('deleted'):
+            validos[uid] = None
+            continue
+        form = ContactForm(cambio)
+        if not form.is_valid():
+            errores[i] = {campo: [e['code'] for e in lista] for campo, lista in form.errors.get_json_data().items()}
+            continue
+        # Dentro de un lote vale el último cambio de cada contacto.
+        validos.pop(uid, None)
+        validos[uid] = form.cleaned_data
+    return validos, errores
+
+
+def aplicar(usuario, cambios: list) -> dict:
+    """Aplica a la agenda de ``usuario`` un lote de cambios ``{"id", "name",
+    "email", "phone"}`` o ``{"id", "deleted": true}``. Devuelve los errores
+    de los que no son válidos, que no se aplican."""
+    validos, errores = _validar(cambios)
+    if not validos:
+        return errores
+    with transaction.atomic():
+        primero = _reservar(len(validos))
+        existentes = {c.uid: c for c in Contact.objects.filter(owner=usuario, uid__in=list(validos))}
+        ahora = timezone.now()
+        nuevos, modificados = [], []
+        for seq, (uid, datos) in enumerate(validos.items(), start=primero):
+            contacto = existentes.get(uid)
+            if contacto is None:
+                if datos is None:
+                    # Baja de un contacto que nunca llegó al servidor.
+                    continue
+                contacto = Contact(owner=usuario, uid=uid)
+                nuevos.append(contacto)
+            else:
+                modificados.append(contacto)
+            if datos is None:
+                contacto.name = contacto.email = contacto.phone = ''
+                contacto.deleted = True
+            else:
+                contacto.name, contacto.email, contacto.phone = datos['name'], datos['email'], datos['phone']
+                contacto.deleted = False
+            contacto.seq, contacto.updated_at = seq, ahora
+        Contact.objects.bulk_update(modificados, ['name', 'email', 'phone', 'deleted', 'seq', 'updated_at'])
+        Contact.objects.bulk_create(nuevos)
+    return errores
+
+
+def _serializar(fila: dict) -> dict:
+    if fila['deleted']:
+        return {'id': str(fila['uid']), 'deleted': True}
+    return {'id': str(fila['uid']), 'name': fila['name'], 'email': fila['email'], 'phone': fila['phone']}
+
+
+def cambios_desde(usuario, token: int, limite: int = LIMITE) -> tuple[list[dict], int, bool]:
+    """Cambios de la agenda de ``usuario`` posteriores a ``token``, el nuevo
+    token y si quedan más."""
+    filas = list(
+        Contact.objects.filter(owner=usuario, seq__gt=token).order_by('seq')
+        .values('uid', 'name', 'email', 'phone', 'deleted', 'seq')[:limite + 1]
+    )
+    hay_mas = len(filas) > limite
+    filas = filas[:limite]
+    return [_serializar(fila) for fila in filas], (filas[-1]['seq'] if filas else token), hay_mas
+
+
+def sincronizar(usuario, token: int, cambios: Iterable = (), limite: int = LIMITE) -> dict:
+    """Aplica los cambios del cliente y devuelve los posteriores a su token
+    (incluidos los suyos, que así avanzan su token) y los rechazados."""
+    rechazados = aplicar(usuario, list(cambios))
+    filas, nuevo, hay_mas = cambios_desde(usuario, token, limite)
+    reiniciar = False
+    if not filas and token:
+        ultimo = ContactSequence.objects.filter(pk=1).values_list('last_value', flat=True).first() or 0
+        if token > ultimo:
+            # El token es de otra base de datos (restaurada, por ejemplo): el
+            # cliente tiene que descartar su copia y cargarla de nuevo.
+            reiniciar = True
+            filas, nuevo, hay_mas = cambios_desde(usuario, 0, limite)
+    return {'changes': filas, 'token': str(nuevo), 'more': hay_mas, 'reset': reiniciar, 'rejected': rechazados}
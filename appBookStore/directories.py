@@ -0,0 +1,68 @@
+"""Directorios de autores y editoriales repartidos por inicial.
+
+Cada página lee solo los nombres de una letra: el filtro es un rango sobre el
+índice de ``UPPER(name)`` (``>= 'B' AND < 'C'``), que además da el orden, de
+modo que la consulta se detiene al llenar la página. El número de libros y la
+fecha de la última publicación se anotan con subconsultas correlacionadas que
+se resuelven por índice solo para las filas de la página, y el recuento de la
+letra se hace sin ellas: dos consultas por página, independientemente del
+tamaño del directorio.
+
+Los nombres que empiezan por un número o un signo van a la sección ``0-9``
+y los que empiezan por una letra fuera de la A-Z (acentuada, por ejemplo), a
+``#``; cada una es también un único rango del índice.
+"""
+
+import string
+
+from django.core.paginator import Page, Paginator
+from django.db.models import Count, IntegerField, Max, OuterRef, Q, QuerySet, Subquery
+from django.db.models.functions import Coalesce, Upper
+
+from .models import Book
+
+LETRAS = list(string.ascii_uppercase)
+NUMEROS = '0-9'
+OTROS = '#'
+SECCIONES = [NUMEROS] + LETRAS + [OTROS]
+TAMANO_PAGINA = 50
+
+
+def filtro_inicial(seccion: str) -> Q:
+    """Rangos del índice sobre ``UPPER(name)`` que corresponden a ``seccion``."""
+    if seccion == NUMEROS:
+        return Q(nombre_mayus__lt='A')
+    if seccion == OTROS:
+        # '[' es el carácter siguiente a la 'Z'.
+        return Q(nombre_mayus__gte='[')
+    return Q(nombre_mayus__gte=seccion, nombre_mayus__lt=chr(ord(seccion) + 1))
+
+
+def seccion_de(query_dict) -> str:
+    seccion = query_dict.get('letter', '').upper()
+    return seccion if seccion in SECCIONES else LETRAS[0]
+
+
+def _de_la_entidad(campo: str, agregado):
+    libros = Book.objects.filter(**{campo: OuterRef('pk')}).order_by().values(campo)
+    return Subquery(libros.annotate(valor=agregado).values('valor'))
+
+
+def directorio(entidades: QuerySet, campo: str, seccion: str, query_dict) -> Page:
+    """Página de ``entidades`` (autores o editoriales) cuya inicial es ``seccion``,
+    con ``n_libros`` y ``ultima_publicacion`` anotados. ``campo`` es el campo de
+    ``Book`` que apunta a la entidad (``publisher`` o ``authors``)."""
+    entidades = entidades.alias(nombre_mayus=Upper('name')).filter(filtro_inicial(seccion))
+    paginator = Paginator(
+        entidades.annotate(
+            n_libros=Coalesce(_de_la_entidad(campo, Count('pk')), 0, output_field=IntegerField()),
+            ultima_publicacion=_de_la_entidad(campo, Max('publication_date')),
+        ).order_by(Upper('name'), 'pk'),
+        TAMANO_PAGINA,
+    )
+    # El recuento no necesita las subconsultas.
+    paginator.count = entidades.count()
+    pagina = paginator.get_page(query_dict.get('page'))
+    # Se materializa aquí para que la plantilla no lance consultas (vistas asíncronas).
+    pagina.object_list = list(pagina.object_list)
+    return pagina
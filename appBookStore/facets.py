@@ -0,0 +1,174 @@
+"""Facetas del listado de libros: editorial, tramo de stock y década.
+
+Todas salen de una sola consulta agrupada por ``(editorial, tramo, década)``
+sobre los libros que cumplen la búsqueda y el stock mínimo. A partir de esas
+filas se calculan en memoria los recuentos de cada faceta aplicando la
+selección de las demás (el recuento de una editorial no depende de qué
+editoriales estén marcadas) y el total de resultados, que se pasa al
+paginador para ahorrar el ``COUNT(*)``.
+
+Sin búsqueda ni stock mínimo las filas son las del catálogo entero y se
+guardan en caché, invalidadas por las mismas etiquetas que el listado.
+"""
+
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import date
+
+from django.db import connection
+from django.db.models import Case, Count, IntegerField, Q, QuerySet, Value, When
+from django.db.models.functions import Cast, ExtractYear, Substr
+from django.utils.translation import gettext_lazy as _
+
+from . import cache
+
+# (clave, etiqueta, desde, hasta); ``hasta`` None es sin límite.
+TRAMOS_STOCK = [
+    ('0', _('Agotado'), None, 0),
+    ('1-5', '1-5', 1, 5),
+    ('6-20', '6-20', 6, 20),
+    ('21+', _('Más de 20'), 21, None),
+]
+
+# Editoriales mostradas en la faceta, además de las seleccionadas.
+MAX_EDITORIALES = 15
+
+
+@dataclass
+class SeleccionFacetas:
+    editoriales: set[int] = field(default_factory=set)
+    tramos: set[str] = field(default_factory=set)
+    decadas: set[int] = field(default_factory=set)
+
+    def filtro(self) -> Q:
+        filtro = Q()
+        if self.editoriales:
+            filtro &= Q(publisher_id__in=self.editoriales)
+        if self.tramos:
+            tramos = Q()
+            for clave, _etiqueta, desde, hasta in TRAMOS_STOCK:
+                if clave in self.tramos:
+                    rango = Q()
+                    if desde is not None:
+                        rango &= Q(stock__gte=desde)
+                    if hasta is not None:
+                        rango &= Q(stock__lte=hasta)
+                    tramos |= rango
+            filtro &= tramos
+        if self.decadas:
+            decadas = Q()
+            for decada in self.decadas:
+                decadas |= Q(publication_date__gte=date(decada, 1, 1),
+                             publication_date__lte=date(decada + 9, 12, 31))
+            filtro &= decadas
+        return filtro
+
+
+@dataclass
+class OpcionFaceta:
+    valor: str
+    etiqueta: str
+    n: int
+    activa: bool
+    enlace: str
+
+
+@dataclass
+class Faceta:
+    nombre: str
+    titulo: str
+    opciones: list[OpcionFaceta]
+
+
+def _tramo():
+    return Case(
+        *[When(stock__lte=hasta, then=Value(clave)) for clave, _e, _d, hasta in TRAMOS_STOCK if hasta is not None],
+        default=Value(TRAMOS_STOCK[-1][0]),
+    )
+
+
+def _decada():
+    if connection.vendor == 'sqlite':
+        # Las fechas se guardan como 'AAAA-MM-DD': los tres primeros caracteres
+        # son la década, sin llamar por cada fila a la función Python de Django
+        # que usa ExtractYear en SQLite.
+        return Cast(Substr('publication_date', 1, 3), IntegerField()) * 10
+    return Cast(ExtractYear('publication_date') / 10, IntegerField()) * 10
+
+
+def filas_agrupadas(libros: QuerySet) -> list[tuple[int, str, str, int, int]]:
+    """``[(editorial_id, editorial, tramo, década, n), ...]`` en una sola consulta."""
+    return list(
+        libros.order_by()
+        .annotate(tramo=_tramo(), decada=_decada())
+        .values_list('publisher_id', 'publisher__name', 'tramo', 'decada')
+        .annotate(n=Count('pk'))
+    )
+
+
+def filas_del_catalogo(libros: QuerySet) -> list[tuple[int, str, str, int, int]]:
+    return cache.memorizar('facetas', [cache.LISTA_LIBROS], lambda: filas_agrupadas(libros))
+
+
+def _alternar(query_dict, nombre: str, valor: str) -> str:
+    params = query_dict.copy()
+    for clave in ('page', 'after', 'before'):
+        params.pop(clave, None)
+    valores = params.getlist(nombre)
+    if valor in valores:
+        valores.remove(valor)
+    else:
+        valores.append(valor)
+    params.setlist(nombre, valores)
+    return '?' + params.urlencode()
+
+
+def calcular_facetas(filas, seleccion: SeleccionFacetas, query_dict) -> tuple[list[Faceta], int]:
+    """Recuentos de cada faceta y total de libros que cumplen la selección."""
+    por_editorial, por_tramo, por_decada = Counter(), Counter(), Counter()
+    nombres = {}
+    total = 0
+    for editorial, nombre, tramo, decada, n in filas:
+        nombres[editorial] = nombre
+        en_editorial = not seleccion.editoriales or editorial in seleccion.editoriales
+        en_tramo = not seleccion.tramos or tramo in seleccion.tramos
+        en_decada = not seleccion.decadas or decada in seleccion.decadas
+        if en_tramo and en_decada:
+            por_editorial[editorial] += n
+        if en_editorial and en_decada:
+            por_tramo[tramo] += n
+        if en_editorial and en_tramo:
+            por_decada[decada] += n
+        if en_editorial and en_tramo and en_decada:
+            total += n
+
+    principales = [pk for pk, _n in por_editorial.most_common(MAX_EDITORIALES)]
+    editoriales = principales + sorted(seleccion.editoriales - set(principales))
+    facetas = [
+        Faceta('publisher', _('Editorial'), [
+            OpcionFaceta(str(pk), nombres.get(pk, str(pk)), por_editorial[pk], pk in seleccion.editoriales,
+                         _alternar(query_dict, 'publisher', str(pk)))
+            for pk in editoriales
+        ]),
+        Faceta('stock', _('Stock'), [
+            OpcionFaceta(clave, str(etiqueta), por_tramo[clave], clave in seleccion.tramos,
+                         _alternar(query_dict, 'stock', clave))
+            for clave, etiqueta, _d, _h in TRAMOS_STOCK
+            if por_tramo[clave] or clave in seleccion.tramos
+        ]),
+        Faceta('decade', _('Década'), [
+            OpcionFaceta(str(decada), f'{decada}s', por_decada[decada], decada in seleccion.decadas,
+                         _alternar(query_dict, 'decade', str(decada)))
+            for decada in sorted(set(por_decada) | seleccion.decadas, reverse=True)
+        ]),
+    ]
+    return facetas, total
+
+
+def seleccion_de(cleaned_data) -> SeleccionFacetas:
+    return SeleccionFacetas(
+        editoriales=set(cleaned_data.get('publisher') or []),
+        tramos=set(cleaned_data.get('stock') or []),
+        decadas=set(cleaned_data.get('decade') or []),
+    )
+
@@ -1,12 +1,28 @@
 from django import forms
 from django.core.exceptions import ValidationError
 import re
+from datetime import date
 from typing import Any, Optional
-from .models import Book, Publisher
-from django import forms
+from .facets import TRAMOS_STOCK
 from .models import NewsletterSubscription
 
 
+class EnterosMultiplesField(forms.Field):
+    """Lista de enteros (``?publisher=1&publisher=2``) sin consultar la base de
+    datos: los valores inexistentes simplemente no devuelven libros."""
+    widget = forms.MultipleHiddenInput
+
+    def to_python(self, value):
+        if not value:
+            return []
+        if not isinstance(value, (list, tuple)):
+            value = [value]
+        try:
+            return sorted({int(v) for v in value if v != ''})
+        except (TypeError, ValueError):
+            raise ValidationError('Valor no válido.', code='invalid')
+
+
 class BookSearchForm(forms.Form):
     """Formulario de búsqueda y filtrado de libros con validaciones de seguridad."""
     
@@ -15,16 +31,19 @@ class BookSearchForm(forms.Form):
         required=False,
         widget=forms.TextInput(attrs={
             'class': 'form-control',
-            'placeholder': 'Buscar por título o ISBN...',
+            'placeholder': 'Buscar por título, autor o ISBN...',
             'aria-label': 'Búsqueda de libros'
         })
     )
-    publisher = forms.ModelChoiceField(
-        queryset=Publisher.objects.none(),
+    # Facetas: se muestran como enlaces con recuento (ver facets.py) y el
+    # formulario solo conserva la selección actual en campos ocultos.
+    publisher = EnterosMultiplesField(required=False)
+    stock = forms.MultipleChoiceField(
+        choices=[(clave, clave) for clave, _etiqueta, _desde, _hasta in TRAMOS_STOCK],
         required=False,
-        empty_label='Todas las editoriales',
-        widget=forms.Select(attrs={'class': 'form-control'})
+        widget=forms.MultipleHiddenInput,
     )
+    decade = EnterosMultiplesField(required=False)
     min_stock = forms.IntegerField(
         min_value=0,
         required=False,
@@ -34,11 +53,6 @@ class BookSearchForm(forms.Form):
             'aria-label': 'Stock mínimo'
         })
     )
-
-    def __init__(self, *args: Any, **kwargs: Any) -> None:
-        super().__init__(*args, **kwargs)
-        # type: ignore permite ignorar el warning de Pylance sobre queryset
-        self.fields['publisher'].queryset = Publisher.objects.all()  # type: ignore[attr-defined]
     
     def clean_search(self) -> str:
         """Validar que el search no contiene caracteres maliciosos."""
@@ -53,6 +67,14 @@ class BookSearchForm(forms.Form):
                 )
         return search
 
+    def clean_decade(self) -> list[int]:
+        """Décadas (1990, 2000...) cuyos diez años caben en ``date``."""
+        decadas = self.cleaned_data.get('decade') or []
+        for decada in decadas:
+            if decada % 10 or not date.min.year <= decada <= date.max.year - 9:
+                raise ValidationError('Década no válida.', code='invalid_decade')
+        return decadas
+
 
 class NewsletterSubscriptionForm(forms.Form):
     """Formulario de suscripción al newsletter con validaciones robustas."""
@@ -103,3 +125,11 @@ class NewsletterSubscriptionForm(forms.Form):
         return email
 
 
+
+
+class ContactForm(forms.Form):
+    """Datos de un contacto de la agenda recibidos en la sincronización (ver contacts.py)."""
+
+    name = forms.CharField(max_length=100)
+    email = forms.EmailField(max_length=254)
+    phone = forms.CharField(max_length=30, required=False)
@@ -0,0 +1,147 @@
+"""Variantes redimensionadas de portadas, logos y fotos de autor.
+
+Por cada imagen subida se generan miniaturas de anchos fijos en JPEG, WebP y,
+si Pillow lo soporta, AVIF, junto al original:
+
+    book_covers/portada.png -> book_covers/variantes/portada_160.jpg
+                               book_covers/variantes/portada_160.webp
+                               book_covers/variantes/portada_160.avif
+                               ...
+
+Las plantillas las usan con la etiqueta ``imagen_responsive`` (``srcset`` y
+``loading="lazy"``) y, si falta alguna variante, se sirve el original.
+
+Qué variantes existen se guarda al generarlas en el propio modelo
+(``<campo>_variants``, por ejemplo ``cover_image_variants``) junto con el
+nombre de la imagen de la que salen; así renderizar no consulta el
+almacenamiento, y al volver a guardar el modelo con la misma imagen no se
+abre de nuevo. Una imagen más estrecha que todos los anchos queda registrada
+sin variantes. Tras la migración 0014, ``generate_image_variants`` registra
+las variantes que ya había en disco.
+"""
+
+import posixpath
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+from PIL import Image, ImageOps, features
+
+# Anchos en píxeles: cubren el listado (120px), la portada (160px) y el
+# detalle (250px) en pantallas normales y de doble densidad.
+ANCHOS = (160, 320, 500)
+
+FORMATOS = {
+    'jpg': ('JPEG', 'image/jpeg', {'quality': 82, 'optimize': True, 'progressive': True}),
+    'webp': ('WEBP', 'image/webp', {'quality': 80, 'method': 4}),
+}
+if features.check('avif'):
+    FORMATOS['avif'] = ('AVIF', 'image/avif', {'quality': 60})
+
+
+def ruta_variante(nombre: str, ancho: int, extension: str) -> str:
+    directorio, fichero = posixpath.split(nombre)
+    base = posixpath.splitext(fichero)[0]
+    return posixpath.join(directorio, 'variantes', f'{base}_{ancho}.{extension}')
+
+
+def generar_variantes(nombre: str, storage=default_storage, forzar: bool = False) -> tuple[int, dict[str, list[int]]]:
+    """Genera las variantes de ``nombre`` que falten. Devuelve cuántas creó y
+    las que existen como ``{extension: [anchos]}``."""
+    if not nombre or not storage.exists(nombre):
+        return 0, {}
+    existentes, pendientes = set(), []
+    for ancho in ANCHOS:
+        for extension in FORMATOS:
+            if not forzar and storage.exists(ruta_variante(nombre, ancho, extension)):
+                existentes.add((ancho, extension))
+            else:
+                pendientes.append((ancho, extension))
+
+    creadas = 0
+    if pendientes:
+        with storage.open(nombre, 'rb') as fichero:
+            original = ImageOps.exif_transpose(Image.open(fichero))
+            original.load()
+        if original.mode not in ('RGB', 'RGBA'):
+            original = original.convert('RGBA' if 'transparency' in original.info else 'RGB')
+
+        redimensionadas = {}
+        for ancho, extension in pendientes:
+            # No se amplían imágenes más pequeñas que el ancho pedido.
+            if ancho > original.width:
+                continue
+            if ancho not in redimensionadas:
+                alto = round(original.height * ancho / original.width)
+                redimensionadas[ancho] = original.resize((ancho, alto), Image.Resampling.LANCZOS)
+            imagen = redimensionadas[ancho]
+            formato, _, opciones = FORMATOS[extension]
+            if formato == 'JPEG' and imagen.mode == 'RGBA':
+                imagen = imagen.convert('RGB')
+
+            buffer = BytesIO()
+            imagen.save(buffer, formato, **opciones)
+            ruta = ruta_variante(nombre, ancho, extension)
+            if storage.exists(ruta):
+                storage.delete(ruta)
+            storage.save(ruta, ContentFile(buffer.getvalue()))
+            existentes.add((ancho, extension))
+            creadas += 1
+
+    anchos = {extension: [ancho for ancho in ANCHOS if (ancho, extension) in existentes]
+              for extension in FORMATOS}
+    return creadas, {extension: lista for extension, lista in anchos.items() if lista}
+
+
+def campo_registro(campo: str) -> str:
+    """Campo del modelo que guarda las variantes de la imagen ``campo``."""
+    return f'{campo}_variants'
+
+
+def registro(nombre: str, anchos: dict[str, list[int]]) -> dict:
+    return {'origen': nombre, 'anchos': anchos}
+
+
+def procesar(instancia, campo: str, forzar: bool = False) -> int:
+    """Genera las variantes de la imagen ``campo`` de ``instancia`` si ha
+    cambiado desde la última vez y guarda en el modelo cuáles hay. Devuelve
+    cuántas creó."""
+    fichero = getattr(instancia, campo)
+    actual = getattr(instancia, campo_registro(campo)) or {}
+    if not fichero:
+        nuevo, creadas = {}, 0
+    elif actual.get('origen') == fichero.name and not forzar:
+        return 0
+    else:
+        creadas, anchos = generar_variantes(fichero.name, fichero.storage, forzar=forzar)
+        nuevo = registro(fichero.name, anchos)
+    if nuevo != actual:
+        setattr(instancia, campo_registro(campo), nuevo)
+        # Sin save(): ni señales ni otra vuelta por aquí. updated_at cambia
+        # porque el HTML (srcset) también cambia.
+        type(instancia).objects.filter(pk=instancia.pk).update(
+            **{campo_registro(campo): nuevo, 'updated_at': timezone.now()}
+        )
+    return creadas
+
+
+def variantes_disponibles(fichero, storage=None) -> dict[str, list[tuple[str, int]]]:
+    """``{extension: [(url, ancho), ...]}`` de las variantes registradas del
+    ``ImageFieldFile`` ``fichero``, sin tocar el almacenamiento."""
+    if not fichero:
+        return {}
+    storage = storage or fichero.storage
+    guardado = getattr(fichero.instance, campo_registro(fichero.field.name), None) or {}
+    if guardado.get('origen') != fichero.name:
+        # Imagen cambiada sin pasar por save() (o aún sin procesar): el original.
+        return {}
+    return {
+        extension: [(storage.url(ruta_variante(fichero.name, ancho, extension)), ancho) for ancho in anchos]
+        for extension, anchos in guardado['anchos'].items() if extension in FORMATOS
+    }
+
+
+def tipo_mime(extension: str) -> str:
+    return FORMATOS[extension][1]
@@ -0,0 +1,176 @@
+import json
+import platform
+import statistics
+import time
+from contextlib import ExitStack
+from datetime import datetime, timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.urls import URLPattern, reverse
+
+from appBookStore import urls as catalog_urls
+from appBookStore.benchmarking import base_de_datos_temporal, sembrar_catalogo, vaciar_catalogo
+from appBookStore.models import Author, Book, Publisher
+
+# La exportación recorre el catálogo entero: tiene su propia medición de
+# memoria. Las reservas solo aceptan POST (ver scripts/bench_reservations.py)
+# y la sincronización de la agenda necesita un usuario.
+RUTAS_EXCLUIDAS = {
+    'catalog-export',
+    'reservation-create', 'reservation-checkout', 'reservation-release',
+    'agenda-sync',
+}
+
+# Variantes del listado de libros además de la primera página.
+VARIANTES = {
+    'book-list': [
+        ('', {}),
+        ('?search', {'search': 'memoria'}),
+        ('?page', {'page': '5'}),
+        ('?min_stock', {'min_stock': '10'}),
+    ],
+}
+
+
+def _percentil(valores, p):
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, max(0, round(p / 100 * len(ordenados)) - 1))
+    return ordenados[indice]
+
+
+class Command(BaseCommand):
+    help = (
+        'Siembra catálogos sintéticos deterministas de varios tamaños en una base '
+        'de datos temporal y mide p50/p95 y número de consultas de cada ruta del '
+        'catálogo en todos los idiomas. Falla si empeora respecto a una línea base.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1000,10000,100000',
+                            help='Tamaños del catálogo, separados por comas.')
+        parser.add_argument('--repeat', type=int, default=20, help='Peticiones medidas por ruta.')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', default='benchmark_results.json',
+                            help='Fichero JSON con los resultados.')
+        parser.add_argument('--baseline', help='Resultados previos con los que comparar.')
+        parser.add_argument('--threshold', type=float, default=0.25,
+                            help='Empeoramiento relativo máximo de p95 (0.25 = 25%%).')
+        parser.add_argument('--min-delta-ms', type=float, default=5.0,
+                            help='Diferencias de p95 menores que esto se consideran ruido.')
+        parser.add_argument('--update-baseline', action='store_true',
+                            help='Guarda los resultados también como nueva línea base.')
+        parser.add_argument('--with-cache', action='store_true',
+                            help='Mide con la caché de respuestas activada.')
+
+    def handle(self, *args, **options):
+        tamanos = [int(t) for t in options['sizes'].split(',') if t.strip()]
+        resultados = []
+
+        setup_test_environment()
+        try:
+            with override_settings(CATALOGO_CACHE_ENABLED=options['with_cache'], DEBUG=False):
+                with base_de_datos_temporal():
+                    for tamano in tamanos:
+                        vaciar_catalogo()
+                        inicio = time.perf_counter()
+                        sembrar_catalogo(tamano, semilla=options['seed'])
+                        self.stdout.write(f'Catálogo de {tamano} libros sembrado en {time.perf_counter() - inicio:.1f}s')
+                        resultados.extend(self._medir(tamano, options['repeat']))
+        finally:
+            teardown_test_environment()
+
+        informe = {
+            'meta': {
+                'fecha': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'sqlite': connection.Database.sqlite_version if connection.vendor == 'sqlite' else None,
+                'repeat': options['repeat'],
+                'seed': options['seed'],
+                'cache': options['with_cache'],
+            },
+            'results': resultados,
+        }
+        Path(options['output']).write_text(json.dumps(informe, indent=2, ensure_ascii=False))
+        self.stdout.write(f'Resultados guardados en {options["output"]}')
+
+        if options['baseline']:
+            if options['update_baseline']:
+                Path(options['baseline']).write_text(json.dumps(informe, indent=2, ensure_ascii=False))
+                self.stdout.write(f'Línea base actualizada en {options["baseline"]}')
+            else:
+                self._comparar(resultados, options)
+
+    def _rutas(self):
+        libro = Book.objects.order_by('pk')[Book.objects.count() // 2]
+        editorial = Publisher.objects.order_by('pk').first()
+        autor = Author.objects.order_by('pk').first()
+        argumentos = {'book_id': libro.pk, 'publisher_id': editorial.pk, 'author_id': autor.pk}
+
+        for patron in catalog_urls.urlpatterns:
+            if not isinstance(patron, URLPattern) or patron.name in RUTAS_EXCLUIDAS:
+                continue
+            kwargs = {nombre: argumentos[nombre] for nombre in patron.pattern.converters}
+            for sufijo, params in VARIANTES.get(patron.name, [('', {})]):
+                yield f'{patron.name}{sufijo}', patron.name, kwargs, params
+
+    def _medir(self, tamano, repeticiones):
+        client = Client()
+        resultados = []
+        for nombre, ruta, kwargs, params in self._rutas():
+            for idioma, _ in settings.LANGUAGES:
+                url = f'/{idioma}' + reverse(ruta, kwargs=kwargs)[len(f'/{settings.LANGUAGE_CODE}'):]
+                response = client.get(url, params)  # calentamiento
+                if response.status_code != 200:
+                    raise CommandError(f'{url} respondió {response.status_code}')
+                # Se cuentan en todas las conexiones (con el perfil de producción
+                # las lecturas del catálogo van a la réplica).
+                with ExitStack() as pila:
+                    capturas = [pila.enter_context(CaptureQueriesContext(connections[alias]))
+                                for alias in connections]
+                    client.get(url, params)
+                # Se cuentan ya: la siguiente petición vacía el registro de consultas.
+                n_consultas = sum(len(captura) for captura in capturas)
+                tiempos = []
+                for _ in range(repeticiones):
+                    inicio = time.perf_counter()
+                    client.get(url, params)
+                    tiempos.append((time.perf_counter() - inicio) * 1000)
+
+                fila = {
+                    'size': tamano,
+                    'route': nombre,
+                    'lang': idioma,
+                    'p50_ms': round(statistics.median(tiempos), 3),
+                    'p95_ms': round(_percentil(tiempos, 95), 3),
+                    'queries': n_consultas,
+                }
+                resultados.append(fila)
+                self.stdout.write(
+                    f"  {tamano:>7} {idioma} {nombre:<22} p50={fila['p50_ms']:>8.2f}ms "
+                    f"p95={fila['p95_ms']:>8.2f}ms consultas={fila['queries']}"
+                )
+        return resultados
+
+    def _comparar(self, resultados, options):
+        base = json.loads(Path(options['baseline']).read_text())
+        previos = {(r['size'], r['route'], r['lang']): r for r in base['results']}
+        regresiones = []
+        for actual in resultados:
+            previo = previos.get((actual['size'], actual['route'], actual['lang']))
+            if previo is None:
+                continue
+            clave = f"{actual['size']} {actual['lang']} {actual['route']}"
+            if actual['queries'] > previo['queries']:
+                regresiones.append(f"{clave}: consultas {previo['queries']} -> {actual['queries']}")
+            delta = actual['p95_ms'] - previo['p95_ms']
+            if delta > options['min_delta_ms'] and actual['p95_ms'] > previo['p95_ms'] * (1 + options['threshold']):
+                regresiones.append(f"{clave}: p95 {previo['p95_ms']:.2f}ms -> {actual['p95_ms']:.2f}ms")
+
+        if regresiones:
+            raise CommandError('Regresiones respecto a la línea base:\n  ' + '\n  '.join(regresiones))
+        self.stdout.write(self.style.SUCCESS('Sin regresiones respecto a la línea base.'))
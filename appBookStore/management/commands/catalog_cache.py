@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from appBookStore import cache
+
+
+class Command(BaseCommand):
+    help = (
+        'Muestra los contadores de aciertos/fallos de la caché del catálogo y '
+        'permite invalidarla. Con la caché en memoria local los contadores son '
+        'los de este proceso; con la de ficheros se comparten entre procesos.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clear', action='store_true', help='Invalida todas las respuestas cacheadas.')
+        parser.add_argument('--reset-stats', action='store_true', help='Pone a cero los contadores.')
+
+    def handle(self, *args, **options):
+        stats = cache.estadisticas()
+        total = stats['hits'] + stats['misses']
+        ratio = stats['hits'] / total * 100 if total else 0
+        self.stdout.write(f"hits={stats['hits']} misses={stats['misses']} ratio={ratio:.1f}%")
+        if options['clear']:
+            cache.invalidar_todo()
+            self.stdout.write(self.style.SUCCESS('Caché del catálogo invalidada.'))
+        if options['reset_stats']:
+            cache.reiniciar_estadisticas()
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from appBookStore.related import calcular
+
+
+class Command(BaseCommand):
+    help = (
+        'Calcula los libros relacionados de cada libro por sus autores y su '
+        'editorial. Solo rehace las listas afectadas por los cambios desde la '
+        'ejecución anterior; pensado para ejecutarse periódicamente (cron).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true',
+                            help='Calcula de nuevo todos los libros (y los pesos de autores y editoriales).')
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        resultado = calcular(completo=options['full'])
+        tipo = 'completo' if resultado.ejecucion.full else 'incremental'
+        self.stdout.write(self.style.SUCCESS(
+            f'Cálculo {tipo}: {resultado.calculados} libros calculados y {resultado.cambiados} listas '
+            f'cambiadas en {time.perf_counter() - inicio:.1f}s.'
+        ))
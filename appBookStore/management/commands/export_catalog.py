@@ -0,0 +1,36 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+
+from appBookStore.export import FORMATOS, TAMANO_BLOQUE, exportar
+
+
+class Command(BaseCommand):
+    help = 'Exporta el catálogo completo (libros, editorial y autores) en CSV o JSONL.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(FORMATOS), default='csv')
+        parser.add_argument('--gzip', action='store_true', help='Comprime la salida en gzip.')
+        parser.add_argument('--output', '-o', help='Fichero de salida (por defecto, la salida estándar).')
+        parser.add_argument('--chunk-size', type=int, default=TAMANO_BLOQUE,
+                            help='Libros leídos de la base de datos por bloque.')
+
+    def handle(self, *args, **options):
+        gzip = options['gzip']
+        bloques = exportar(options['format'], gzip=gzip, chunk_size=options['chunk_size'])
+
+        if not options['output']:
+            for bloque in bloques:
+                if gzip:
+                    sys.stdout.buffer.write(bloque)
+                else:
+                    self.stdout.write(bloque, ending='')
+            return
+
+        inicio = time.perf_counter()
+        escritos = 0
+        with open(options['output'], 'wb') as salida:
+            for bloque in bloques:
+                escritos += salida.write(bloque if gzip else bloque.encode('utf-8'))
+        self.stderr.write(f'{escritos} bytes escritos en {time.perf_counter() - inicio:.1f}s')
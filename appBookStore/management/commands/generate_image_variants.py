@@ -0,0 +1,73 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from appBookStore import cache
+from appBookStore.images import campo_registro, generar_variantes, registro
+from appBookStore.models import Author, Book, Publisher
+
+CAMPOS = ((Book, 'cover_image'), (Publisher, 'logo'), (Author, 'photo'))
+
+
+def _inicializar_worker():
+    # Con el método "spawn" (Windows, macOS) cada proceso arranca sin Django.
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bookStore.settings')
+    django.setup()
+
+
+def _generar(args):
+    nombre, forzar = args
+    try:
+        return nombre, *generar_variantes(nombre, forzar=forzar), None
+    except Exception as exc:  # una imagen corrupta no debe parar el resto
+        return nombre, 0, {}, str(exc)
+
+
+class Command(BaseCommand):
+    help = (
+        'Genera en paralelo las variantes (miniaturas WebP/AVIF/JPEG) de las imágenes ya subidas '
+        'y las registra en su modelo. Solo procesa las imágenes sin registrar o cambiadas.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Número de procesos (por defecto, uno por CPU).')
+        parser.add_argument('--force', action='store_true',
+                            help='Regenera todas las imágenes, también las variantes que ya existen.')
+
+    def handle(self, *args, **options):
+        pendientes = {}
+        for modelo, campo in CAMPOS:
+            filas = (modelo.objects.exclude(**{campo: ''}).exclude(**{f'{campo}__isnull': True})
+                     .values_list(campo, campo_registro(campo)))
+            for nombre, guardado in filas.iterator():
+                if options['force'] or (guardado or {}).get('origen') != nombre:
+                    pendientes.setdefault(nombre, set()).add((modelo, campo))
+        trabajos = [(nombre, options['force']) for nombre in sorted(pendientes)]
+        self.stdout.write(f'{len(trabajos)} imágenes a procesar con {options["workers"]} procesos')
+
+        inicio = time.perf_counter()
+        creadas = errores = 0
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=_inicializar_worker) as pool:
+            for nombre, n, anchos, error in pool.map(_generar, trabajos, chunksize=8):
+                creadas += n
+                if error:
+                    errores += 1
+                    self.stderr.write(f'{nombre}: {error}')
+                    continue
+                for modelo, campo in pendientes[nombre]:
+                    modelo.objects.filter(**{campo: nombre}).update(
+                        **{campo_registro(campo): registro(nombre, anchos), 'updated_at': timezone.now()}
+                    )
+        if trabajos:
+            # Las páginas en caché se generaron sin las variantes.
+            cache.invalidar_todo()
+
+        duracion = time.perf_counter() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f'{creadas} variantes creadas en {duracion:.1f}s ({errores} errores)'
+        ))
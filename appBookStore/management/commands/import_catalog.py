@@ -0,0 +1,196 @@
+import csv
+import json
+import os
+import time
+from datetime import date
+from itertools import islice
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from appBookStore import cache, search
+from appBookStore.models import Author, Book, Publisher, normalizar_isbn
+
+
+def _leer_csv(fichero):
+    lector = csv.DictReader(fichero)
+    for fila in lector:
+        fila['authors'] = [a.strip() for a in (fila.get('authors') or '').split(';') if a.strip()]
+        yield lector.line_num, fila
+
+
+def _leer_jsonl(fichero):
+    for numero, linea in enumerate(fichero, 1):
+        if not linea.strip():
+            continue
+        try:
+            fila = json.loads(linea)
+        except json.JSONDecodeError as error:
+            raise CommandError(f'Línea {numero}: JSON no válido ({error.msg})') from error
+        if not isinstance(fila, dict):
+            raise CommandError(f'Línea {numero}: se esperaba un objeto JSON')
+        autores = fila.get('authors') or []
+        if isinstance(autores, str):
+            autores = autores.split(';')
+        fila['authors'] = [a.strip() for a in autores if isinstance(a, str) and a.strip()]
+        yield numero, fila
+
+
+def _convertir(numero, fila):
+    """Comprueba la fila ``numero`` del fichero y convierte su fecha y stock."""
+    if not fila.get('title'):
+        raise CommandError(f'Línea {numero}: falta el título')
+    if not fila.get('publisher'):
+        raise CommandError(f'Línea {numero}: falta la editorial')
+    try:
+        fila['publication_date'] = date.fromisoformat(str(fila.get('publication_date') or ''))
+    except ValueError:
+        raise CommandError(
+            f'Línea {numero}: fecha de publicación no válida: {fila.get("publication_date")!r} '
+            '(se espera AAAA-MM-DD)'
+        ) from None
+    stock = fila.get('stock') or 0
+    try:
+        fila['stock'] = int(stock)
+        if fila['stock'] < 0:
+            raise ValueError
+    except (TypeError, ValueError):
+        raise CommandError(f'Línea {numero}: stock no válido: {stock!r}') from None
+    return fila
+
+
+class Command(BaseCommand):
+    help = (
+        'Importa un catálogo CSV o JSONL (title, isbn, publication_date, stock, '
+        'summary, publisher, authors) por lotes con bulk_create. En CSV los autores '
+        'van separados por ";". Se puede reanudar tras un fallo con --resume.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Fichero .csv o .jsonl')
+        parser.add_argument('--format', choices=['csv', 'jsonl'],
+                            help='Formato del fichero (por defecto, según la extensión).')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--resume', action='store_true',
+                            help='Continúa desde el último lote confirmado.')
+        parser.add_argument('--checkpoint',
+                            help='Fichero de progreso (por defecto <path>.progress).')
+        parser.add_argument('--no-index', action='store_true',
+                            help='No reconstruye el índice de búsqueda al terminar.')
+
+    def handle(self, *args, **options):
+        ruta = Path(options['path'])
+        if not ruta.exists():
+            raise CommandError(f'No existe el fichero {ruta}')
+        formato = options['format'] or ('jsonl' if ruta.suffix in ('.jsonl', '.ndjson') else 'csv')
+        lector = _leer_jsonl if formato == 'jsonl' else _leer_csv
+        checkpoint = Path(options['checkpoint'] or f'{ruta}.progress')
+        tamano = options['batch_size']
+
+        hechas = 0
+        if options['resume'] and checkpoint.exists():
+            hechas = int(checkpoint.read_text().strip() or 0)
+            self.stdout.write(f'Reanudando tras {hechas} filas ya importadas')
+
+        # Mapas nombre -> id: la deduplicación no necesita consultar fila a fila.
+        self.editoriales = dict(Publisher.objects.values_list('name', 'pk'))
+        self.autores = dict(Author.objects.values_list('name', 'pk'))
+        self.duplicadas = 0
+
+        inicio = time.perf_counter()
+        importadas = 0
+        with open(ruta, newline='', encoding='utf-8') as fichero:
+            filas = lector(fichero)
+            for _ in islice(filas, hechas):
+                pass
+            while True:
+                try:
+                    lote = [_convertir(numero, fila) for numero, fila in islice(filas, tamano)]
+                except CommandError as error:
+                    # Los lotes anteriores ya están confirmados y anotados.
+                    raise CommandError(
+                        f'{error}. Importadas {hechas} filas; corrige el fichero y continúa con --resume.'
+                    ) from error
+                if not lote:
+                    break
+                with transaction.atomic():
+                    self._importar_lote(lote)
+                hechas += len(lote)
+                importadas += len(lote)
+                self._guardar_progreso(checkpoint, hechas)
+                duracion = time.perf_counter() - inicio
+                self.stdout.write(f'{hechas} filas ({importadas / duracion:.0f} filas/s)')
+
+        if importadas:
+            if not options['no_index']:
+                self.stdout.write('Reconstruyendo el índice de búsqueda...')
+                search.reconstruir_indice()
+            # bulk_create no dispara señales: se invalida toda la caché de una vez.
+            cache.invalidar_todo()
+
+        duracion = time.perf_counter() - inicio
+        checkpoint.unlink(missing_ok=True)
+        self.stdout.write(self.style.SUCCESS(
+            f'{importadas} filas procesadas en {duracion:.1f}s '
+            f'({importadas / max(duracion, 1e-9):.0f} filas/s), '
+            f'{self.duplicadas} descartados por ISBN repetido'
+        ))
+
+    def _importar_lote(self, lote):
+        # Para que reimportar un fichero no duplique libros se descartan las
+        # filas cuyo ISBN ya existe, consultando una sola vez por lote.
+        isbns = [normalizar_isbn(f.get('isbn')) for f in lote]
+        vistos = set(
+            Book.objects.filter(isbn_normalizado__in=[i for i in isbns if i])
+            .values_list('isbn_normalizado', flat=True)
+        )
+        filtrado = []
+        for fila, isbn in zip(lote, isbns):
+            if isbn and isbn in vistos:
+                self.duplicadas += 1
+                continue
+            vistos.add(isbn)
+            fila['isbn_normalizado'] = isbn
+            filtrado.append(fila)
+        lote = filtrado
+
+        nuevas = {f['publisher'] for f in lote} - self.editoriales.keys()
+        for editorial in Publisher.objects.bulk_create([Publisher(name=n) for n in nuevas]):
+            self.editoriales[editorial.name] = editorial.pk
+
+        nuevos = {a for f in lote for a in f['authors']} - self.autores.keys()
+        for autor in Author.objects.bulk_create([Author(name=n) for n in nuevos]):
+            self.autores[autor.name] = autor.pk
+
+        libros = Book.objects.bulk_create([
+            Book(
+                publisher_id=self.editoriales[f['publisher']],
+                title=f['title'],
+                isbn=f.get('isbn') or None,
+                isbn_normalizado=f['isbn_normalizado'],
+                publication_date=f['publication_date'],
+                stock=f['stock'],
+                summary=f.get('summary') or None,
+            )
+            for f in lote
+        ])
+
+        # Las filas de la tabla intermedia no necesitan instancias de modelo:
+        # un executemany evita construir cientos de miles de objetos.
+        tabla = Book.authors.through._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO "{tabla}" (book_id, author_id) VALUES (%s, %s)',
+                [
+                    (libro.pk, self.autores[nombre])
+                    for libro, fila in zip(libros, lote)
+                    for nombre in dict.fromkeys(fila['authors'])
+                ],
+            )
+
+    def _guardar_progreso(self, checkpoint, hechas):
+        # Escritura atómica: un fallo a medias no deja un fichero corrupto.
+        temporal = checkpoint.with_suffix(checkpoint.suffix + '.tmp')
+        temporal.write_text(str(hechas))
+        os.replace(temporal, checkpoint)
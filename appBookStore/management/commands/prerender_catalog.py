@@ -0,0 +1,40 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from appBookStore.prerender import prerenderizar, verificar
+
+
+class Command(BaseCommand):
+    help = (
+        'Pre-renderiza en ficheros estáticos la portada y los listados y detalles '
+        'de libros, autores y editoriales en cada idioma. Solo vuelve a generar '
+        'las páginas afectadas por los cambios desde la ejecución anterior.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', '-o', default=settings.PRERENDER_ROOT,
+                            help='Directorio de salida (por defecto, PRERENDER_ROOT).')
+        parser.add_argument('--jobs', '-j', type=int, default=os.cpu_count() or 1,
+                            help='Procesos que renderizan en paralelo.')
+        parser.add_argument('--full', action='store_true', help='Renderiza todas las páginas.')
+        parser.add_argument('--verify', action='store_true',
+                            help='Compara byte a byte cada fichero con la respuesta de su vista.')
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        resultado = prerenderizar(options['output'], procesos=options['jobs'], completo=options['full'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(resultado.renderizadas)} páginas renderizadas, {resultado.vigentes} sin cambios '
+            f'y {len(resultado.borradas)} borradas en {time.perf_counter() - inicio:.1f}s.'
+        ))
+
+        if options['verify']:
+            distintas = verificar(options['output'], procesos=options['jobs'])
+            if distintas:
+                raise CommandError(
+                    f'{len(distintas)} páginas no coinciden con la vista: ' + ', '.join(distintas[:10])
+                )
+            self.stdout.write(self.style.SUCCESS('Todas las páginas coinciden con las vistas.'))
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from appBookStore.search import fts_disponible, reconstruir_indice
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye desde cero el índice de texto completo de libros (FTS5).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=10000,
+            help='Número de libros indexados por sentencia INSERT ... SELECT.',
+        )
+
+    def handle(self, *args, **options):
+        if not fts_disponible():
+            self.stdout.write(self.style.WARNING('La base de datos no es SQLite; no hay índice FTS5 que reconstruir.'))
+            return
+        inicio = time.perf_counter()
+        total = reconstruir_indice(options['batch_size'])
+        duracion = time.perf_counter() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f'{total} libros indexados en {duracion:.2f}s ({total / max(duracion, 1e-9):.0f} libros/s)'
+        ))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from appBookStore.reservations import liberar_caducadas
+
+
+class Command(BaseCommand):
+    help = (
+        'Libera las reservas de stock pendientes que han caducado y devuelve su '
+        'stock. Pensado para ejecutarse periódicamente (cron).'
+    )
+
+    def handle(self, *args, **options):
+        liberadas = liberar_caducadas()
+        self.stdout.write(self.style.SUCCESS(f'{liberadas} reservas caducadas liberadas.'))
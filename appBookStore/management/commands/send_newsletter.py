@@ -0,0 +1,67 @@
+import signal
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from appBookStore.models import NewsletterCampaign
+from appBookStore.newsletter import crear_campana, enviar_campana
+
+
+def _interrumpir(signum, frame):
+    # SIGTERM se convierte en KeyboardInterrupt para cerrar la conexión de correo
+    # y avisar de cómo reanudar (el progreso se guarda tras cada mensaje).
+    raise KeyboardInterrupt
+
+
+class Command(BaseCommand):
+    help = (
+        'Envía el newsletter a todos los suscriptores por lotes, reutilizando una '
+        'conexión de correo por lote. Un envío interrumpido se continúa con --resume.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--subject', help='Asunto de una campaña nueva.')
+        parser.add_argument('--body-file', help='Fichero de texto con el cuerpo del mensaje.')
+        parser.add_argument('--resume', type=int, metavar='ID',
+                            help='Continúa la campaña indicada desde el último destinatario.')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--rate', type=float,
+                            help='Máximo de mensajes por segundo (sin límite por defecto).')
+
+    def handle(self, *args, **options):
+        if options['resume']:
+            try:
+                campana = NewsletterCampaign.objects.get(pk=options['resume'])
+            except NewsletterCampaign.DoesNotExist:
+                raise CommandError(f'No existe la campaña {options["resume"]}')
+            self.stdout.write(f'Reanudando la campaña {campana.pk} tras {campana.sent_count} envíos')
+        else:
+            if not options['subject'] or not options['body_file']:
+                raise CommandError('Hacen falta --subject y --body-file (o --resume ID).')
+            cuerpo = Path(options['body_file']).read_text(encoding='utf-8')
+            campana = crear_campana(options['subject'], cuerpo)
+            self.stdout.write(f'Campaña {campana.pk} creada')
+
+        signal.signal(signal.SIGTERM, _interrumpir)
+        inicio = time.perf_counter()
+
+        def progreso(campana):
+            self.stdout.write(
+                f'{campana.sent_count} enviados (hasta el suscriptor {campana.last_sent_id}, '
+                f'{time.perf_counter() - inicio:.1f}s)'
+            )
+
+        try:
+            enviados = enviar_campana(campana, options['batch_size'], options['rate'], progreso=progreso)
+        except KeyboardInterrupt:
+            raise CommandError(
+                f'Envío interrumpido tras {campana.sent_count} mensajes; '
+                f'continúe con --resume {campana.pk}'
+            )
+
+        duracion = time.perf_counter() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f'Campaña {campana.pk}: {enviados} mensajes enviados en {duracion:.1f}s '
+            f'({enviados / max(duracion, 1e-9):.0f} mensajes/s)'
+        ))
@@ -0,0 +1,185 @@
+"""Instrumentación por petición: consultas SQL, renderizado y tiempo total.
+
+``InstrumentacionMiddleware`` cuenta las consultas de cada petición con un
+``execute_wrapper`` instalado en cada conexión (funciona con ``DEBUG = False``
+y también en las vistas asíncronas, cuyas consultas se ejecutan en otro
+hilo: la petición en curso se localiza con una ``ContextVar``), detecta las
+repetidas, mide el tiempo de renderizado de plantillas y lo publica en la
+cabecera ``Server-Timing``:
+
+    Server-Timing: db;dur=12.4;desc="14 queries, 10 dup", tpl;dur=30.1, total;dur=45.0
+
+Las peticiones más lentas que ``SLOW_REQUEST_MS`` se registran, con una
+probabilidad de ``SLOW_REQUEST_SAMPLE_RATE``, en el logger
+``appBookStore.rendimiento`` junto a las huellas de las consultas más
+frecuentes. Por petición solo se guarda el SQL y su duración; las huellas se
+calculan únicamente cuando se escribe en el registro.
+
+El tiempo de las consultas lanzadas desde las plantillas (relaciones que se
+cargan al recorrerlas) cuenta tanto en ``db`` como en ``tpl``.
+"""
+
+import logging
+import random
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template.backends.django import Template
+
+logger = logging.getLogger('appBookStore.rendimiento')
+
+_metricas_actuales = ContextVar('metricas_peticion', default=None)
+
+_NUMERO_RE = re.compile(r'\b\d+\b')
+_CADENA_RE = re.compile(r"'(?:[^']|'')*'")
+_LISTA_RE = re.compile(r'\((?:\s*(?:%s|\?)\s*,)+\s*(?:%s|\?)\s*\)')
+
+
+def huella(sql: str) -> str:
+    """SQL sin literales ni listas ``IN`` variables: agrupa consultas iguales."""
+    sql = _CADENA_RE.sub('?', sql)
+    sql = _NUMERO_RE.sub('?', sql)
+    return _LISTA_RE.sub('(...)', sql)
+
+
+class MetricasPeticion:
+    __slots__ = ('consultas', 'tiempo_sql', 'tiempo_plantillas', 'profundidad')
+
+    def __init__(self):
+        self.consultas = []
+        self.tiempo_sql = 0.0
+        self.tiempo_plantillas = 0.0
+        self.profundidad = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duracion = time.perf_counter() - inicio
+            self.tiempo_sql += duracion
+            self.consultas.append((sql, duracion))
+
+    def duplicadas(self) -> int:
+        """Consultas con el mismo SQL que otra anterior de la petición."""
+        return len(self.consultas) - len({sql for sql, _ in self.consultas})
+
+    def huellas(self, limite: int = 10) -> list[tuple[str, int, float]]:
+        """``[(huella, veces, ms), ...]`` de las consultas que más se repiten."""
+        veces = Counter()
+        tiempos = Counter()
+        for sql, duracion in self.consultas:
+            clave = huella(sql)
+            veces[clave] += 1
+            tiempos[clave] += duracion
+        return [(clave, n, round(tiempos[clave] * 1000, 2)) for clave, n in veces.most_common(limite)]
+
+
+def _registrar_consulta(execute, sql, params, many, context):
+    metricas = _metricas_actuales.get()
+    if metricas is None:
+        return execute(sql, params, many, context)
+    return metricas(execute, sql, params, many, context)
+
+
+def _instalar(connection, **kwargs):
+    if _registrar_consulta not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_registrar_consulta)
+
+
+connection_created.connect(_instalar)
+
+
+_render_original = Template.render
+
+
+def _render_medido(self, context=None, request=None):
+    metricas = _metricas_actuales.get()
+    if metricas is None:
+        return _render_original(self, context, request)
+    # render_to_string dentro de otra plantilla no se cuenta dos veces.
+    metricas.profundidad += 1
+    inicio = time.perf_counter()
+    try:
+        return _render_original(self, context, request)
+    finally:
+        metricas.profundidad -= 1
+        if metricas.profundidad == 0:
+            metricas.tiempo_plantillas += time.perf_counter() - inicio
+
+
+Template.render = _render_medido
+
+
+class InstrumentacionMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.asincrono = iscoroutinefunction(get_response)
+        if self.asincrono:
+            markcoroutinefunction(self)
+        # Las conexiones que ya estaban abiertas no pasan por connection_created.
+        for conexion in connections.all(initialized_only=True):
+            _instalar(conexion)
+
+    def __call__(self, request):
+        if self.asincrono:
+            return self.__acall__(request)
+        if not getattr(settings, 'INSTRUMENTATION_ENABLED', True):
+            return self.get_response(request)
+
+        metricas = MetricasPeticion()
+        token = _metricas_actuales.set(metricas)
+        inicio = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _metricas_actuales.reset(token)
+        return self._publicar(request, response, metricas, time.perf_counter() - inicio)
+
+    async def __acall__(self, request):
+        if not getattr(settings, 'INSTRUMENTATION_ENABLED', True):
+            return await self.get_response(request)
+
+        metricas = MetricasPeticion()
+        token = _metricas_actuales.set(metricas)
+        inicio = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _metricas_actuales.reset(token)
+        return self._publicar(request, response, metricas, time.perf_counter() - inicio)
+
+    def _publicar(self, request, response, metricas, total):
+        response['Server-Timing'] = (
+            f'db;dur={metricas.tiempo_sql * 1000:.1f};'
+            f'desc="{len(metricas.consultas)} queries, {metricas.duplicadas()} dup", '
+            f'tpl;dur={metricas.tiempo_plantillas * 1000:.1f}, '
+            f'total;dur={total * 1000:.1f}'
+        )
+
+        umbral = getattr(settings, 'SLOW_REQUEST_MS', 500)
+        muestreo = getattr(settings, 'SLOW_REQUEST_SAMPLE_RATE', 1.0)
+        if total * 1000 >= umbral and random.random() < muestreo:
+            self._registrar_lenta(request, response, metricas, total)
+        return response
+
+    def _registrar_lenta(self, request, response, metricas, total):
+        huellas = metricas.huellas()
+        logger.warning(
+            'Petición lenta %s %s -> %s: %.1fms total, %.1fms SQL en %d consultas '
+            '(%d repetidas), %.1fms plantillas%s',
+            request.method, request.get_full_path(), response.status_code,
+            total * 1000, metricas.tiempo_sql * 1000, len(metricas.consultas),
+            metricas.duplicadas(), metricas.tiempo_plantillas * 1000,
+            ''.join(f'\n  {veces:4d}x {ms:8.2f}ms  {clave}' for clave, veces, ms in huellas),
+            extra={'huellas': huellas},
+        )
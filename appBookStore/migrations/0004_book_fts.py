@@ -0,0 +1,40 @@
+from django.db import migrations
+
+
+def crear_indice_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        'CREATE VIRTUAL TABLE IF NOT EXISTS "appBookStore_book_fts" '
+        'USING fts5(title, isbn, summary, authors, '
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    )
+    # SQL fijo, con las tablas tal como están en esta migración: no depende de
+    # los modelos ni de appBookStore.search, que pueden cambiar después.
+    schema_editor.execute(
+        'INSERT INTO "appBookStore_book_fts" (rowid, title, isbn, summary, authors) '
+        'SELECT b.id, b.title, '
+        "COALESCE(b.isbn || ' ' || REPLACE(REPLACE(b.isbn, '-', ''), ' ', ''), ''), "
+        "COALESCE(b.summary, ''), "
+        "COALESCE((SELECT GROUP_CONCAT(a.name, ' ') "
+        'FROM "appBookStore_book_authors" ba JOIN "appBookStore_author" a ON a.id = ba.author_id '
+        "WHERE ba.book_id = b.id), '') "
+        'FROM "appBookStore_book" b'
+    )
+
+
+def borrar_indice_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute('DROP TABLE IF EXISTS "appBookStore_book_fts"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appBookStore', '0003_author_photo'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indice_fts, borrar_indice_fts),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:51
+
+import re
+
+from django.db import migrations, models
+
+
+def rellenar_isbn_normalizado(apps, schema_editor):
+    Book = apps.get_model('appBookStore', 'Book')
+    vistos = set()
+    lote = []
+    for libro in Book.objects.exclude(isbn__isnull=True).exclude(isbn='').only('isbn').order_by('pk').iterator():
+        normalizado = re.sub(r'[^0-9X]', '', libro.isbn.upper()) or None
+        # Si hay ISBN repetidos, solo el libro más antiguo se queda el normalizado.
+        if normalizado in vistos:
+            continue
+        vistos.add(normalizado)
+        libro.isbn_normalizado = normalizado
+        lote.append(libro)
+        if len(lote) >= 1000:
+            Book.objects.bulk_update(lote, ['isbn_normalizado'])
+            lote = []
+    Book.objects.bulk_update(lote, ['isbn_normalizado'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appBookStore', '0004_book_fts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='isbn_normalizado',
+            field=models.CharField(blank=True, editable=False, max_length=20, null=True),
+        ),
+        migrations.RunPython(rellenar_isbn_normalizado, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='book',
+            name='isbn_normalizado',
+            field=models.CharField(blank=True, editable=False, max_length=20, null=True, unique=True),
+        ),
+        migrations.AddIndex(
+            model_name='author',
+            index=models.Index(fields=['name'], name='author_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['title'], name='book_title_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['publisher', '-publication_date'], name='book_publisher_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['publisher', 'title'], name='book_publisher_title_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['stock'], name='book_stock_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='publisher',
+            index=models.Index(fields=['name'], name='publisher_name_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appBookStore', '0007_newslettercampaign'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['publisher', 'stock', 'publication_date'], name='book_facets_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:19
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appBookStore', '0008_book_facets_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='author',
+            index=models.Index(django.db.models.functions.text.Upper('name'), models.F('id'), name='author_initial_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='publisher',
+            index=models.Index(django.db.models.functions.text.Upper('name'), models.F('id'), name='publisher_initial_idx'),
+        ),
+    ]
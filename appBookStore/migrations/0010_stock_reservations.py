@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:29
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+def stock_negativo_a_cero(apps, schema_editor):
+    # Sin esto la restricción no se puede crear si algún libro ya tiene stock negativo.
+    apps.get_model('appBookStore', 'Book').objects.filter(stock__lt=0).update(stock=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appBookStore', '0009_directory_initial_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Reservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('status', models.CharField(choices=[('pending', 'Pendiente'), ('confirmed', 'Confirmada'), ('released', 'Liberada')], default='pending', max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ReservationItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField()),
+            ],
+        ),
+        migrations.RunPython(stock_negativo_a_cero, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='book',
+            constraint=models.CheckConstraint(condition=models.Q(('stock__gte', 0)), name='book_stock_no_negativo'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['status', 'expires_at'], name='reservation_expiry_idx'),
+        ),
+        migrations.AddField(
+            model_name='reservationitem',
+            name='book',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='appBookStore.book'),
+        ),
+        migrations.AddField(
+            model_name='reservationitem',
+            name='reservation',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='appBookStore.reservation'),
+        ),
+    ]
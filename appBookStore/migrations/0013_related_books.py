@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appBookStore', '0012_contacts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedBooksRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField()),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('full', models.BooleanField(default=False)),
+                ('books', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RelatedBook',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+                ('computed_at', models.DateTimeField()),
+                ('book', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='relacionados', to='appBookStore.book')),
+                ('related', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='relacionado_de', to='appBookStore.book')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('book', 'rank'), name='related_book_rank_uniq')],
+            },
+        ),
+    ]
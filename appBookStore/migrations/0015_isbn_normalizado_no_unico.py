@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:43
+
+import re
+
+from django.db import migrations, models
+
+
+def rellenar_isbn_repetidos(apps, schema_editor):
+    # La 0005 dejó sin normalizar los ISBN repetidos; ya no hace falta.
+    Book = apps.get_model('appBookStore', 'Book')
+    lote = []
+    pendientes = (Book.objects.filter(isbn_normalizado__isnull=True)
+                  .exclude(isbn__isnull=True).exclude(isbn='').only('isbn').order_by('pk'))
+    for libro in pendientes.iterator():
+        libro.isbn_normalizado = re.sub(r'[^0-9X]', '', libro.isbn.upper()) or None
+        lote.append(libro)
+        if len(lote) >= 1000:
+            Book.objects.bulk_update(lote, ['isbn_normalizado'])
+            lote = []
+    Book.objects.bulk_update(lote, ['isbn_normalizado'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appBookStore', '0014_image_variants'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='book',
+            name='isbn_normalizado',
+            field=models.CharField(blank=True, editable=False, max_length=20, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['isbn_normalizado'], name='book_isbn_normalizado_idx'),
+        ),
+        migrations.RunPython(rellenar_isbn_repetidos, migrations.RunPython.noop),
+    ]
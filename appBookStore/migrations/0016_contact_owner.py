@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:20
+
+import uuid
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def borrar_contactos_sin_usuario(apps, schema_editor):
+    # La agenda era común y no se sabe de quién es cada contacto: cada
+    # navegador conserva su copia y la sube a la cuenta con la que se entre.
+    apps.get_model('appBookStore', 'Contact').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appBookStore', '0015_isbn_normalizado_no_unico'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(borrar_contactos_sin_usuario, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='contact',
+            name='owner',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='contactos', to=settings.AUTH_USER_MODEL),
+            preserve_default=False,
+        ),
+        migrations.AlterField(
+            model_name='contact',
+            name='uid',
+            field=models.UUIDField(default=uuid.uuid4),
+        ),
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(fields=['owner', 'seq'], name='contact_owner_seq_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='contact',
+            constraint=models.UniqueConstraint(fields=('owner', 'uid'), name='contact_owner_uid_uniq'),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:04
+
+import re
+import unicodedata
+
+import appBookStore.models
+from django.db import migrations, models
+
+
+def _normalizar(texto):
+    # La de typeahead.normalizar en el momento de esta migración.
+    texto = texto.casefold()
+    if not texto.isascii():
+        texto = re.sub('[\u0300-\u036f]', '', unicodedata.normalize('NFKD', texto))
+    return ' '.join(re.findall(r'\w+', texto))
+
+
+def rellenar_nombres(apps, schema_editor):
+    for nombre_modelo in ('Author', 'Publisher'):
+        modelo = apps.get_model('appBookStore', nombre_modelo)
+        lote = []
+        for entidad in modelo.objects.only('name').order_by('pk').iterator():
+            entidad.nombre_normalizado = _normalizar(entidad.name)
+            lote.append(entidad)
+            if len(lote) >= 1000:
+                modelo.objects.bulk_update(lote, ['nombre_normalizado'])
+                lote = []
+        modelo.objects.bulk_update(lote, ['nombre_normalizado'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appBookStore', '0016_contact_owner'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='author',
+            name='nombre_normalizado',
+            field=appBookStore.models.NombreNormalizadoField(default='', editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='publisher',
+            name='nombre_normalizado',
+            field=appBookStore.models.NombreNormalizadoField(default='', editable=False, max_length=100),
+        ),
+        migrations.RunPython(rellenar_nombres, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='author',
+            index=models.Index(fields=['nombre_normalizado', 'id'], name='author_normalizado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='publisher',
+            index=models.Index(fields=['nombre_normalizado', 'id'], name='publisher_normalizado_idx'),
+        ),
+    ]
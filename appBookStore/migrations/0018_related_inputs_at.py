@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:12
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F
+
+
+def copiar_updated_at(apps, schema_editor):
+    # Hasta ahora el cálculo incremental usaba ``updated_at``: se parte de él.
+    apps.get_model('appBookStore', 'Book').objects.update(related_inputs_at=F('updated_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appBookStore', '0017_nombre_normalizado'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='related_inputs_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.RunPython(copiar_updated_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['related_inputs_at'], name='book_related_inputs_idx'),
+        ),
+    ]
@@ -1,11 +1,58 @@
+import re
+import uuid
+
+from django.conf import settings
 from django.db import models
+from django.db.models.functions import Upper
+from django.utils import timezone
+
+from .typeahead import normalizar
+
+
+def normalizar_isbn(isbn):
+    """Quita guiones, espacios y demás separadores; ``None`` si queda vacío."""
+    if not isbn:
+        return None
+    return re.sub(r'[^0-9X]', '', isbn.upper()) or None
 
 # Create your models here.
 
+class NombreNormalizadoField(models.CharField):
+    """``name`` en minúsculas y sin acentos, como en el autocompletado (ver
+    typeahead.py), para buscar por prefijo con un índice. Se calcula al
+    guardar, también en ``bulk_create``; no en ``update()`` de ``name``."""
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('max_length', 100)
+        kwargs.setdefault('editable', False)
+        kwargs.setdefault('default', '')
+        super().__init__(*args, **kwargs)
+
+    def pre_save(self, model_instance, add):
+        valor = normalizar(model_instance.name)
+        setattr(model_instance, self.attname, valor)
+        return valor
+
+
 class Publisher(models.Model):
     name = models.CharField(max_length=100)
+    # Búsqueda en el admin y su autocompletado
+    nombre_normalizado = NombreNormalizadoField()
     description = models.TextField(null=True, blank=True)
     logo = models.ImageField(upload_to='publisher_logos/', null=True, blank=True)
+    # Variantes generadas del logo (ver images.py)
+    logo_variants = models.JSONField(default=dict, blank=True, editable=False)
+    # Para el GET condicional de las páginas de detalle (ver conditional.py)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['name'], name='publisher_name_idx'),
+            # Directorio por inicial: rango sobre UPPER(name), ordenado por nombre e id
+            models.Index(Upper('name'), 'id', name='publisher_initial_idx'),
+            # Búsqueda por prefijo del admin, ordenada por nombre e id
+            models.Index(fields=['nombre_normalizado', 'id'], name='publisher_normalizado_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -14,8 +61,23 @@ class Publisher(models.Model):
 class Author(models.Model):
     
     name = models.CharField(max_length=50)
+    # Búsqueda en el admin y su autocompletado
+    nombre_normalizado = NombreNormalizadoField()
     biography = models.TextField(null=True, blank=True)
     photo = models.ImageField(upload_to='author_photos/', null=True, blank=True)
+    # Variantes generadas de la foto (ver images.py)
+    photo_variants = models.JSONField(default=dict, blank=True, editable=False)
+    # Para el GET condicional de las páginas de detalle (ver conditional.py)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['name'], name='author_name_idx'),
+            # Directorio por inicial: rango sobre UPPER(name), ordenado por nombre e id
+            models.Index(Upper('name'), 'id', name='author_initial_idx'),
+            # Búsqueda por prefijo del admin, ordenada por nombre e id
+            models.Index(fields=['nombre_normalizado', 'id'], name='author_normalizado_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -34,14 +96,54 @@ class Book(models.Model):
     stock = models.IntegerField(default=0)
 
     isbn = models.CharField(max_length=20, null=True, blank=True)
+    # ISBN sin guiones ni espacios, para búsquedas exactas por índice. No es
+    # único: varios libros (ediciones, ejemplares) pueden compartir ISBN.
+    isbn_normalizado = models.CharField(max_length=20, null=True, blank=True, editable=False)
 
     summary = models.TextField(null=True, blank=True)
 
     #foto de portada de los libros
     cover_image = models.ImageField(upload_to='book_covers/', null=True, blank=True)
+    # Variantes generadas de la portada (ver images.py)
+    cover_image_variants = models.JSONField(default=dict, blank=True, editable=False)
+
+    # También cambia al cambiar sus autores o su stock (ver conditional.py)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Último cambio de lo que cuenta para los libros relacionados: editorial,
+    # fecha y autores (ver related.py y signals.py)
+    related_inputs_at = models.DateTimeField(default=timezone.now, editable=False)
+
+    class Meta:
+        indexes = [
+            # Listado ordenado por título (el id va implícito en el índice)
+            models.Index(fields=['title'], name='book_title_idx'),
+            # Libro más reciente de cada editorial en la portada
+            models.Index(fields=['publisher', '-publication_date'], name='book_publisher_date_idx'),
+            # Libros de una editorial ordenados por título
+            models.Index(fields=['publisher', 'title'], name='book_publisher_title_idx'),
+            # Filtro de stock mínimo del buscador
+            models.Index(fields=['stock'], name='book_stock_idx'),
+            # Búsqueda exacta por ISBN
+            models.Index(fields=['isbn_normalizado'], name='book_isbn_normalizado_idx'),
+            # Cubre la consulta agrupada de las facetas (editorial, stock, década)
+            models.Index(fields=['publisher', 'stock', 'publication_date'], name='book_facets_idx'),
+            # Cubre el número de libros y el último cambio de una editorial (GET condicional)
+            models.Index(fields=['publisher', 'updated_at'], name='book_publisher_updated_idx'),
+            # Libros que recalcular en la ejecución incremental de los relacionados
+            models.Index(fields=['related_inputs_at'], name='book_related_inputs_idx'),
+        ]
+        constraints = [
+            # Última defensa contra la sobreventa: las reservas ya descuentan
+            # con un UPDATE condicional (ver reservations.py).
+            models.CheckConstraint(condition=models.Q(stock__gte=0), name='book_stock_no_negativo'),
+        ]
 
     def __str__(self):
         return self.title
+
+    def save(self, *args, **kwargs):
+        self.isbn_normalizado = normalizar_isbn(self.isbn)
+        super().save(*args, **kwargs)
     
 class NewsletterSubscription(models.Model):
     name = models.CharField(max_length=100)
@@ -51,3 +153,133 @@ class NewsletterSubscription(models.Model):
     def __str__(self):
          return f"{self.name} <{self.email}>"
 
+
+
+class NewsletterCampaign(models.Model):
+    """Envío del newsletter a todos los suscriptores.
+
+    ``last_sent_id`` es el id del último suscriptor al que se le envió, que se
+    anota tras cada mensaje: el envío recorre los suscriptores por id, así que
+    al reanudar se sigue justo después (ver newsletter.py). Solo se incluyen los suscritos al crear la
+    campaña (``max_subscription_id``).
+    """
+    subject = models.CharField(max_length=200)
+    body = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    max_subscription_id = models.BigIntegerField(default=0)
+    last_sent_id = models.BigIntegerField(default=0)
+    sent_count = models.PositiveIntegerField(default=0)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return self.subject
+
+
+class Reservation(models.Model):
+    """Reserva de stock de uno o varios libros hasta ``expires_at``.
+
+    El stock se descuenta al reservar; al confirmar (checkout) se queda
+    descontado y al liberar o caducar se devuelve. ``token`` identifica la
+    reserva ante el cliente.
+    """
+    PENDING = 'pending'
+    CONFIRMED = 'confirmed'
+    RELEASED = 'released'
+    STATUS_CHOICES = [(PENDING, 'Pendiente'), (CONFIRMED, 'Confirmada'), (RELEASED, 'Liberada')]
+
+    token = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            # Búsqueda de las reservas pendientes caducadas
+            models.Index(fields=['status', 'expires_at'], name='reservation_expiry_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.token} ({self.status})'
+
+
+class ReservationItem(models.Model):
+    reservation = models.ForeignKey(Reservation, on_delete=models.CASCADE, related_name='items')
+    book = models.ForeignKey(Book, on_delete=models.CASCADE)
+    quantity = models.PositiveIntegerField()
+
+    def __str__(self):
+        return f'{self.quantity} x {self.book_id}'
+
+
+class Contact(models.Model):
+    """Contacto de la agenda de un usuario.
+
+    ``seq`` es el número de cambio: cada alta, modificación o baja le asigna
+    el siguiente de ``ContactSequence``, así que los clientes piden los
+    cambios con ``seq`` mayor que el último que vieron. Las bajas quedan como
+    lápidas (``deleted``) sin datos personales para que también se sincronicen.
+    ``uid`` lo genera el cliente, de modo que reenviar un alta no la duplica.
+    """
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='contactos')
+    uid = models.UUIDField(default=uuid.uuid4)
+    name = models.CharField(max_length=100, blank=True)
+    email = models.EmailField(blank=True)
+    phone = models.CharField(max_length=30, blank=True)
+    seq = models.BigIntegerField(unique=True)
+    deleted = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Cambios de la agenda de un usuario desde su token
+            models.Index(fields=['owner', 'seq'], name='contact_owner_seq_idx'),
+        ]
+        constraints = [
+            # El uid solo identifica el contacto dentro de la agenda de su usuario.
+            models.UniqueConstraint(fields=['owner', 'uid'], name='contact_owner_uid_uniq'),
+        ]
+
+    def __str__(self):
+        return f'{self.name} <{self.email}>'
+
+
+class ContactSequence(models.Model):
+    """Fila única con el último ``seq`` asignado a un cambio de ``Contact``."""
+    last_value = models.BigIntegerField(default=0)
+
+
+class RelatedBook(models.Model):
+    """Libro relacionado precalculado (ver related.py): los ``rank`` 0, 1, ...
+    de cada libro, de más a menos parecido.
+
+    Al borrar el libro relacionado la fila se queda con ``related`` vacío,
+    así el siguiente cálculo incremental sabe qué listas tiene que rehacer.
+    """
+    # Sin índice propio: lo cubre la restricción única (book, rank).
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='relacionados', db_index=False)
+    related = models.ForeignKey(Book, on_delete=models.SET_NULL, null=True, related_name='relacionado_de')
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+    # Para el GET condicional del detalle del libro: cambia al rehacer su lista.
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            # Panel del detalle: un rango sobre este índice, ya ordenado
+            models.UniqueConstraint(fields=['book', 'rank'], name='related_book_rank_uniq'),
+        ]
+
+    def __str__(self):
+        return f'{self.book_id} -> {self.related_id} ({self.rank})'
+
+
+class RelatedBooksRun(models.Model):
+    """Ejecución del cálculo de libros relacionados. La siguiente incremental
+    rehace lo cambiado desde ``started_at`` de la última terminada."""
+    started_at = models.DateTimeField()
+    finished_at = models.DateTimeField(null=True, blank=True)
+    full = models.BooleanField(default=False)
+    books = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.started_at:%Y-%m-%d %H:%M} ({self.books})'
@@ -0,0 +1,177 @@
+"""Cola de suscripciones al newsletter escrita por lotes.
+
+Las vistas no insertan cada suscripción por separado: la encolan en memoria y
+la cola se vuelca con un único ``bulk_create(ignore_conflicts=True)`` cuando
+llega a ``NEWSLETTER_BATCH_SIZE`` suscripciones o, como mucho,
+``NEWSLETTER_FLUSH_INTERVAL`` segundos después de la primera pendiente. Los
+correos se normalizan a minúsculas y la restricción única de ``email`` hace que
+repetir una suscripción no tenga efecto, sin consultar antes si ya existía.
+
+La cola es de cada proceso; al terminar el proceso se vuelca lo pendiente.
+
+El envío de una campaña (``enviar_campana``) recorre los suscriptores por id
+en lotes, abre una sola conexión del backend de correo por lote y guarda tras
+cada mensaje el id de su destinatario, de modo que un envío interrumpido se
+reanuda justo después del último anotado. Si el proceso muere entre la
+entrega de un mensaje y ese ``UPDATE``, al reanudar se repite como mucho ese
+destinatario.
+"""
+
+import atexit
+import threading
+import time
+from typing import Callable, Optional
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import close_old_connections, connection
+from django.db.models import F, Max
+from django.utils import timezone
+
+from .models import NewsletterCampaign, NewsletterSubscription
+
+_cerrojo = threading.Lock()
+_pendientes: dict[str, str] = {}
+_temporizador: Optional[threading.Timer] = None
+
+
+def normalizar_email(email: str) -> str:
+    return email.strip().lower()
+
+
+def _tamano_lote() -> int:
+    return getattr(settings, 'NEWSLETTER_BATCH_SIZE', 500)
+
+
+def _intervalo() -> Optional[float]:
+    return getattr(settings, 'NEWSLETTER_FLUSH_INTERVAL', 1.0)
+
+
+def encolar_suscripcion(name: str, email: str) -> None:
+    """Añade la suscripción a la cola y la vuelca si el lote está completo."""
+    global _temporizador
+    email = normalizar_email(email)
+    with _cerrojo:
+        # Dentro de la cola también gana la primera suscripción de cada correo,
+        # igual que en la base de datos con ignore_conflicts.
+        _pendientes.setdefault(email, name)
+        lleno = len(_pendientes) >= _tamano_lote()
+        intervalo = _intervalo()
+        if not lleno and _temporizador is None and intervalo is not None:
+            _temporizador = threading.Timer(intervalo, _volcar_en_segundo_plano)
+            _temporizador.daemon = True
+            _temporizador.start()
+    if lleno:
+        volcar_suscripciones()
+
+
+def volcar_suscripciones() -> int:
+    """Escribe las suscripciones pendientes. Devuelve cuántas había en la cola."""
+    global _temporizador
+    with _cerrojo:
+        lote = list(_pendientes.items())
+        _pendientes.clear()
+        if _temporizador is not None:
+            _temporizador.cancel()
+            _temporizador = None
+    if lote:
+        try:
+            NewsletterSubscription.objects.bulk_create(
+                [NewsletterSubscription(name=name, email=email) for email, name in lote],
+                batch_size=_tamano_lote(),
+                ignore_conflicts=True,
+            )
+        except Exception:
+            # Si falla la escritura, el lote vuelve a la cola para el próximo volcado.
+            with _cerrojo:
+                for email, name in lote:
+                    _pendientes.setdefault(email, name)
+            raise
+    return len(lote)
+
+
+def pendientes() -> int:
+    with _cerrojo:
+        return len(_pendientes)
+
+
+def _volcar_en_segundo_plano():
+    try:
+        volcar_suscripciones()
+    finally:
+        # El hilo del temporizador abre su propia conexión: se cierra al acabar.
+        connection.close()
+
+
+@atexit.register
+def _volcar_al_salir():
+    close_old_connections()
+    volcar_suscripciones()
+
+
+def crear_campana(subject: str, body: str) -> NewsletterCampaign:
+    """Crea una campaña dirigida a los suscriptores que hay en este momento."""
+    maximo = NewsletterSubscription.objects.aggregate(m=Max('pk'))['m'] or 0
+    return NewsletterCampaign.objects.create(subject=subject, body=body, max_subscription_id=maximo)
+
+
+def enviar_campana(
+    campana: NewsletterCampaign,
+    tamano_lote: int = 500,
+    por_segundo: Optional[float] = None,
+    conexion=None,
+    progreso: Optional[Callable[[NewsletterCampaign], None]] = None,
+) -> int:
+    """Envía la campaña desde donde se quedó. Devuelve los enviados en esta llamada.
+
+    Cada mensaje se entrega con ``send_messages`` sobre la conexión abierta
+    del lote y su destinatario se anota en cuanto se entrega, así se sabe
+    exactamente hasta cuál se llegó si el backend falla a mitad o se mata el
+    proceso. ``por_segundo`` limita el ritmo de envío.
+    """
+    conexion = conexion or get_connection()
+    remitente = settings.DEFAULT_FROM_EMAIL
+    enviados_total = 0
+    inicio = time.monotonic()
+
+    while True:
+        lote = list(
+            NewsletterSubscription.objects
+            .filter(pk__gt=campana.last_sent_id, pk__lte=campana.max_subscription_id)
+            .order_by('pk')
+            .values_list('pk', 'email')[:tamano_lote]
+        )
+        if not lote:
+            break
+
+        conexion.open()
+        try:
+            for pk, email in lote:
+                if por_segundo:
+                    espera = inicio + enviados_total / por_segundo - time.monotonic()
+                    if espera > 0:
+                        time.sleep(espera)
+                mensaje = EmailMessage(campana.subject, campana.body, remitente, [email],
+                                       connection=conexion)
+                conexion.send_messages([mensaje])
+                # Antes del siguiente mensaje: un corte no puede repetir más de uno.
+                _guardar_progreso(campana, pk)
+                enviados_total += 1
+        finally:
+            conexion.close()
+        if progreso:
+            progreso(campana)
+        if len(lote) < tamano_lote:
+            break
+
+    campana.finished_at = timezone.now()
+    campana.save(update_fields=['finished_at'])
+    return enviados_total
+
+
+def _guardar_progreso(campana, ultimo):
+    NewsletterCampaign.objects.filter(pk=campana.pk).update(
+        last_sent_id=ultimo, sent_count=F('sent_count') + 1
+    )
+    campana.last_sent_id = ultimo
+    campana.sent_count += 1
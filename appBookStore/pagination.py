@@ -0,0 +1,174 @@
+"""Paginación del catálogo: por número de página para las primeras páginas y
+por cursor (keyset) sobre ``(title, id)`` para las páginas profundas."""
+
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
+from django.db.models import Q, QuerySet
+
+TAMANO_PAGINA = 25
+# A partir de esta página el COUNT(*) y el OFFSET dejan de compensar y se
+# continúa navegando con cursores.
+MAX_PAGINAS_NUMERADAS = 10
+
+
+def codificar_cursor(titulo: str, pk: int) -> str:
+    datos = json.dumps([titulo, pk], ensure_ascii=False).encode('utf-8')
+    return base64.urlsafe_b64encode(datos).decode('ascii').rstrip('=')
+
+
+def decodificar_cursor(cursor: str) -> Optional[tuple[str, int]]:
+    """Devuelve ``(titulo, pk)`` o ``None`` si el cursor no es válido."""
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        titulo, pk = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+    except (ValueError, TypeError, binascii.Error):
+        return None
+    if not isinstance(titulo, str) or not isinstance(pk, int):
+        return None
+    return titulo, pk
+
+
+@dataclass
+class PaginaCatalogo:
+    """Una página de resultados junto con los enlaces de navegación."""
+    objetos: list[Any]
+    numero: Optional[int] = None
+    num_paginas: Optional[int] = None
+    anterior: Optional[str] = None
+    siguiente: Optional[str] = None
+
+    def __iter__(self):
+        return iter(self.objetos)
+
+    def __len__(self):
+        return len(self.objetos)
+
+    def __bool__(self):
+        return bool(self.objetos)
+
+
+def _enlace(query_dict, **nuevos) -> str:
+    params = query_dict.copy()
+    for clave in ('page', 'after', 'before'):
+        params.pop(clave, None)
+    for clave, valor in nuevos.items():
+        params[clave] = valor
+    return '?' + params.urlencode()
+
+
+def _pagina_por_cursor(libros: QuerySet, query_dict, tamano: int) -> Optional[PaginaCatalogo]:
+    after = query_dict.get('after')
+    before = query_dict.get('before')
+    cursor = decodificar_cursor(after or before or '')
+    if cursor is None:
+        return None
+    titulo, pk = cursor
+
+    if after:
+        filtro = Q(title__gt=titulo) | Q(title=titulo, pk__gt=pk)
+        filas = list(libros.filter(filtro).order_by('title', 'pk')[:tamano + 1])
+        hay_mas = len(filas) > tamano
+        filas = filas[:tamano]
+        hay_anteriores = True
+        hay_siguientes = hay_mas
+    else:
+        filtro = Q(title__lt=titulo) | Q(title=titulo, pk__lt=pk)
+        filas = list(libros.filter(filtro).order_by('-title', '-pk')[:tamano + 1])
+        hay_mas = len(filas) > tamano
+        filas = filas[:tamano][::-1]
+        hay_anteriores = hay_mas
+        hay_siguientes = True
+
+    pagina = PaginaCatalogo(objetos=filas)
+    if filas and hay_anteriores:
+        pagina.anterior = _enlace(query_dict, before=codificar_cursor(filas[0].title, filas[0].pk))
+    if filas and hay_siguientes:
+        pagina.siguiente = _enlace(query_dict, after=codificar_cursor(filas[-1].title, filas[-1].pk))
+    return pagina
+
+
+def paginar_catalogo(libros: QuerySet, query_dict, tamano: int = TAMANO_PAGINA,
+                     total: Optional[int] = None) -> PaginaCatalogo:
+    """Pagina ``libros`` según los parámetros ``page``, ``after`` o ``before``.
+
+    Las primeras ``MAX_PAGINAS_NUMERADAS`` páginas se sirven con ``Paginator``;
+    a partir de ahí los enlaces usan un cursor ``(title, id)`` que se resuelve
+    con una consulta por índice, de modo que la memoria y el coste no crecen
+    con la profundidad. Si ya se conoce ``total`` (las facetas lo calculan)
+    no se hace el ``COUNT(*)``.
+    """
+    libros = libros.order_by('title', 'pk')
+
+    if query_dict.get('after') or query_dict.get('before'):
+        pagina = _pagina_por_cursor(libros, query_dict, tamano)
+        if pagina is not None:
+            return pagina
+
+    paginator = Paginator(libros, tamano)
+    if total is not None:
+        paginator.count = total
+    try:
+        numero = min(int(query_dict.get('page', 1)), MAX_PAGINAS_NUMERADAS)
+        page = paginator.page(numero)
+    except (PageNotAnInteger, ValueError):
+        page = paginator.page(1)
+    except EmptyPage:
+        page = paginator.page(paginator.num_pages)
+
+    filas = list(page.object_list)
+    pagina = PaginaCatalogo(objetos=filas, numero=page.number, num_paginas=paginator.num_pages)
+    if page.has_previous():
+        pagina.anterior = _enlace(query_dict, page=str(page.previous_page_number()))
+    if page.has_next():
+        if page.number < MAX_PAGINAS_NUMERADAS:
+            pagina.siguiente = _enlace(query_dict, page=str(page.next_page_number()))
+        else:
+            ultimo = filas[-1]
+            pagina.siguiente = _enlace(query_dict, after=codificar_cursor(ultimo.title, ultimo.pk))
+    return pagina
+
+
+class _PorRelevancia:
+    """Resultados de una búsqueda para ``Paginator``: el total ya se conoce
+    (de las facetas) y cada página pide al índice solo sus ids."""
+
+    def __init__(self, busqueda, libros: QuerySet, total: int):
+        self.busqueda, self.libros, self.total = busqueda, libros, total
+
+    def count(self):
+        return self.total
+
+    def __len__(self):
+        return self.total
+
+    def __getitem__(self, corte: slice):
+        return self.busqueda.ids(self.libros, corte.start or 0, corte.stop)
+
+
+def paginar_por_relevancia(libros: QuerySet, busqueda, query_dict, total: int,
+                           tamano: int = TAMANO_PAGINA) -> PaginaCatalogo:
+    """Pagina los resultados de una búsqueda (``search.Busqueda``) respetando
+    el orden de relevancia.
+
+    El índice devuelve por ``LIMIT``/``OFFSET`` los ids de la página pedida y
+    solo se cargan esos libros.
+    """
+    paginator = Paginator(_PorRelevancia(busqueda, libros, total), tamano)
+    page = paginator.get_page(query_dict.get('page'))
+    por_id = libros.in_bulk(list(page.object_list))
+
+    pagina = PaginaCatalogo(
+        objetos=[por_id[pk] for pk in page.object_list if pk in por_id],
+        numero=page.number,
+        num_paginas=paginator.num_pages,
+    )
+    if page.has_previous():
+        pagina.anterior = _enlace(query_dict, page=str(page.previous_page_number()))
+    if page.has_next():
+        pagina.siguiente = _enlace(query_dict, page=str(page.next_page_number()))
+    return pagina
@@ -0,0 +1,302 @@
+"""Pre-renderizado estático de las páginas del catálogo en cada idioma.
+
+Se generan la portada, la primera página del listado de libros, el detalle
+de cada libro, autor y editorial (con sus páginas numeradas) y los
+directorios de autores y editoriales por inicial, para cada idioma de
+``LANGUAGES``. Cada página se guarda en un árbol que reproduce la URL:
+``/es/publishers/?letter=B`` se escribe en ``es/publishers/index.letter=B.html``
+y ``/es/books/7/`` en ``es/books/7/index.html``. Un servidor web puede
+servirlas antes de llegar a Django, por ejemplo con nginx::
+
+    map $args $prerender { "" ""; default ".$args"; }
+    location ~ ^/(es|en)/ {
+        root /srv/bookstore/prerender;
+        try_files $uri/index$prerender.html @django;
+    }
+
+El listado de libros solo se pre-renderiza sin parámetros: la búsqueda en
+vivo pide a la misma URL el fragmento o el JSON según las cabeceras.
+
+El mapa de dependencias son las mismas etiquetas que declaran las vistas
+para la caché de respuestas (``cache.etiquetar``), pero sus versiones no se
+leen de la caché (la de memoria local es de cada proceso): se calculan con
+los ``updated_at`` de la base de datos (``versiones_del_catalogo``), como las
+marcas del GET condicional (ver conditional.py). El manifiesto guarda, por
+cada URL, la versión de cada etiqueta al renderizarla. En la siguiente
+ejecución solo se vuelven a renderizar las páginas con alguna etiqueta
+cambiada, las nuevas (un libro recién creado) y se borran las que ya no
+existen. Los cambios que no pasan por ``updated_at`` (``catalog_cache
+--clear``, por ejemplo) requieren ``--full``.
+
+Las páginas se renderizan llamando a la vista sin la caché de respuestas,
+repartidas por lotes entre varios procesos.
+"""
+
+import hashlib
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import chain
+from pathlib import Path
+from typing import Iterable, Optional
+from urllib.parse import urlencode, urlsplit
+
+import django
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.models import Count, Max
+from django.db.models.functions import Upper
+from django.test import Client, RequestFactory, override_settings
+from django.urls import resolve, reverse
+from django.utils import translation
+
+from . import cache
+from .directories import LETRAS, SECCIONES, filtro_inicial
+from .directories import TAMANO_PAGINA as TAMANO_DIRECTORIO
+from .models import Author, Book, Publisher, RelatedBook
+from .pagination import MAX_PAGINAS_NUMERADAS, TAMANO_PAGINA
+
+MANIFIESTO = 'manifest.json'
+# URLs que renderiza cada tarea de un proceso.
+TAMANO_LOTE = 200
+
+
+@dataclass
+class Resultado:
+    renderizadas: list[str] = field(default_factory=list)
+    vigentes: int = 0
+    borradas: list[str] = field(default_factory=list)
+
+
+def fichero(raiz: Path, url: str) -> Path:
+    """Ruta del fichero que guarda la página de ``url``."""
+    partes = urlsplit(url)
+    nombre = f'index.{partes.query}.html' if partes.query else 'index.html'
+    return Path(raiz, *filter(None, partes.path.split('/')), nombre)
+
+
+def _num_paginas(n: int, tamano: int) -> int:
+    return max(1, math.ceil(n / tamano))
+
+
+def _variantes(url: str, num_paginas: int, **params) -> list[str]:
+    """``url`` y sus páginas con ``page`` tal como las enlaza la paginación
+    (que no aparece si solo hay una)."""
+    base = f'{url}?{urlencode(params)}' if params else url
+    if num_paginas == 1:
+        return [base]
+    return [base] + [f'{url}?{urlencode({**params, "page": n})}' for n in range(1, num_paginas + 1)]
+
+
+def _por_seccion(modelo) -> dict[str, int]:
+    entidades = modelo.objects.alias(nombre_mayus=Upper('name'))
+    return {seccion: entidades.filter(filtro_inicial(seccion)).count() for seccion in SECCIONES}
+
+
+def _directorio(url: str, por_seccion: dict[str, int]) -> list[str]:
+    # Sin ``letter`` se muestra la primera letra, y su paginación enlaza solo con ``page``.
+    urls = _variantes(url, _num_paginas(por_seccion[LETRAS[0]], TAMANO_DIRECTORIO))
+    for seccion, n in por_seccion.items():
+        urls += _variantes(url, _num_paginas(n, TAMANO_DIRECTORIO), letter=seccion)
+    return urls
+
+
+def urls_del_catalogo() -> list[str]:
+    """Todas las URLs que se pre-renderizan, en todos los idiomas."""
+    libros = list(Book.objects.values_list('pk', flat=True))
+    editoriales = list(Publisher.objects.annotate(n=Count('book')).values_list('pk', 'n'))
+    autores = list(Author.objects.annotate(n=Count('book')).values_list('pk', 'n'))
+    secciones_editoriales = _por_seccion(Publisher)
+    secciones_autores = _por_seccion(Author)
+
+    def paginas_de(n):
+        return min(_num_paginas(n, TAMANO_PAGINA), MAX_PAGINAS_NUMERADAS)
+
+    urls = []
+    for idioma, _nombre in settings.LANGUAGES:
+        with translation.override(idioma):
+            urls += [reverse('index'), reverse('book-list')]
+            urls += [reverse('book-detail', args=[pk]) for pk in libros]
+            urls += _directorio(reverse('publisher-list'), secciones_editoriales)
+            urls += _directorio(reverse('author-list'), secciones_autores)
+            for pk, n in editoriales:
+                urls += _variantes(reverse('publisher-detail', args=[pk]), paginas_de(n))
+            for pk, n in autores:
+                urls += _variantes(reverse('author-detail', args=[pk]), paginas_de(n))
+    return urls
+
+
+def _huella(*valores) -> str:
+    return hashlib.md5(repr(valores).encode('utf-8')).hexdigest()[:16]
+
+
+def _resumen(modelo) -> tuple:
+    return tuple(modelo.objects.aggregate(n=Count('pk'), ultimo=Max('updated_at')).values())
+
+
+def versiones_del_catalogo() -> dict[str, str]:
+    """Versión de cada etiqueta de la caché calculada con los datos.
+
+    Un libro, un autor o una editorial cambian con su ``updated_at`` (el del
+    libro también con el cálculo de sus relacionados); sus libros, con el
+    número y el ``updated_at`` más reciente entre ellos; los directorios, con
+    el nombre y el número de libros y la última publicación de cada entrada,
+    que es lo que muestran; la portada y el listado, con cualquier cambio.
+    Las etiquetas de lo que no existe no aparecen.
+    """
+    versiones = {}
+    relacionados = dict(RelatedBook.objects.order_by().values('book_id')
+                        .annotate(ultimo=Max('computed_at')).values_list('book_id', 'ultimo'))
+    for pk, actualizado in Book.objects.order_by().values_list('pk', 'updated_at').iterator(chunk_size=10000):
+        versiones[cache.libro(pk)] = _huella(actualizado, relacionados.get(pk))
+
+    entidades = (
+        (Publisher, cache.editorial, cache.libros_de_editorial, cache.LISTA_EDITORIALES,
+         Book.objects.values_list('publisher_id').annotate(
+             Count('pk'), Max('updated_at'), Max('publication_date'))),
+        (Author, cache.autor, cache.libros_de_autor, cache.LISTA_AUTORES,
+         Book.authors.through.objects.values_list('author_id').annotate(
+             Count('book_id'), Max('book__updated_at'), Max('book__publication_date'))),
+    )
+    for modelo, etiqueta, etiqueta_libros, etiqueta_lista, libros in entidades:
+        por_entidad = {pk: (n, ultimo, publicacion) for pk, n, ultimo, publicacion in libros.order_by()}
+        directorio = hashlib.md5()
+        for pk, actualizado in modelo.objects.order_by('pk').values_list('pk', 'updated_at').iterator(chunk_size=10000):
+            n, ultimo, publicacion = por_entidad.get(pk, (0, None, None))
+            versiones[etiqueta(pk)] = _huella(actualizado)
+            versiones[etiqueta_libros(pk)] = _huella(n, ultimo)
+            directorio.update(repr((pk, actualizado, n, publicacion)).encode('utf-8'))
+        versiones[etiqueta_lista] = directorio.hexdigest()[:16]
+
+    libros, editoriales = _resumen(Book), _resumen(Publisher)
+    versiones[cache.PORTADA] = _huella(libros, editoriales)
+    versiones[cache.LISTA_LIBROS] = _huella(libros, editoriales, _resumen(Author))
+    return versiones
+
+
+def renderizar(url: str) -> tuple[bytes, set[str]]:
+    """Contenido de ``url`` generado por su vista y etiquetas de las que depende."""
+    idioma = translation.get_language_from_path(url)
+    request = RequestFactory().get(url)
+    request.LANGUAGE_CODE = idioma
+    # Con la caché desactivada la vista declara igualmente sus etiquetas aquí.
+    request._catalogo_etiquetas = {}
+    with translation.override(idioma), override_settings(CATALOGO_CACHE_ENABLED=False):
+        match = request.resolver_match = resolve(request.path_info)
+        vista = async_to_sync(match.func) if iscoroutinefunction(match.func) else match.func
+        response = vista(request, *match.args, **match.kwargs)
+    if response.status_code != 200:
+        raise ValueError(f'{url} respondió {response.status_code}')
+    return response.content, set(request._catalogo_etiquetas)
+
+
+def _escribir(ruta: Path, contenido: bytes) -> None:
+    # Se reemplaza de golpe para que el servidor web nunca sirva un fichero a medias.
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    temporal = ruta.with_name(f'.{ruta.name}.{os.getpid()}.tmp')
+    temporal.write_bytes(contenido)
+    os.replace(temporal, ruta)
+
+
+def _renderizar_lote(raiz: Path, urls: list[str], hashes: dict[str, str]):
+    resultado = []
+    for url in urls:
+        contenido, etiquetas = renderizar(url)
+        huella = hashlib.sha256(contenido).hexdigest()
+        ruta = fichero(raiz, url)
+        # Si no ha cambiado no se reescribe: la fecha del fichero sigue valiendo.
+        if huella != hashes.get(url) or not ruta.exists():
+            _escribir(ruta, contenido)
+        resultado.append((url, etiquetas, huella))
+    return resultado
+
+
+def _verificar_lote(raiz: Path, urls: list[str]) -> list[str]:
+    cliente = Client()
+    distintas = []
+    with override_settings(CATALOGO_CACHE_ENABLED=False):
+        for url in urls:
+            response = cliente.get(url)
+            ruta = fichero(raiz, url)
+            if response.status_code != 200 or not ruta.exists() or ruta.read_bytes() != response.content:
+                distintas.append(url)
+    return distintas
+
+
+def _inicializar_worker(bases_de_datos: dict[str, str]):
+    # Con el método "spawn" (Windows, macOS) cada proceso arranca sin Django.
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bookStore.settings')
+    django.setup()
+    # La misma base de datos que el proceso principal, aunque no sea la de settings.
+    for alias, nombre in bases_de_datos.items():
+        connections[alias].settings_dict['NAME'] = nombre
+
+
+def _en_paralelo(funcion, lotes: list[tuple], procesos: int) -> list:
+    if procesos <= 1 or len(lotes) <= 1:
+        return [funcion(*lote) for lote in lotes]
+    # Las conexiones abiertas no deben pasar a los procesos hijos.
+    connections.close_all()
+    bases_de_datos = {alias: connections[alias].settings_dict['NAME'] for alias in connections}
+    with ProcessPoolExecutor(procesos, initializer=_inicializar_worker, initargs=(bases_de_datos,)) as pool:
+        return list(pool.map(funcion, *zip(*lotes)))
+
+
+def _lotes(urls: list[str]) -> Iterable[list[str]]:
+    return (urls[i:i + TAMANO_LOTE] for i in range(0, len(urls), TAMANO_LOTE))
+
+
+def leer_manifiesto(raiz: Path) -> dict[str, dict]:
+    try:
+        return json.loads((Path(raiz) / MANIFIESTO).read_text(encoding='utf-8'))
+    except FileNotFoundError:
+        return {}
+
+
+def prerenderizar(raiz, procesos: int = 1, completo: bool = False) -> Resultado:
+    """Actualiza el árbol de páginas de ``raiz``: renderiza las nuevas y las
+    que dependen de algo que ha cambiado y borra las que ya no existen.
+    Con ``completo`` se renderizan todas."""
+    raiz = Path(raiz)
+    manifiesto = leer_manifiesto(raiz)
+    # Antes de renderizar: un cambio durante la ejecución lo verá la siguiente.
+    actuales = versiones_del_catalogo()
+    urls = urls_del_catalogo()
+
+    vigentes = set()
+    if not completo:
+        vigentes = {
+            url for url, pagina in manifiesto.items()
+            if all(actuales.get(e) == v for e, v in pagina['etiquetas'].items())
+            and fichero(raiz, url).exists()
+        }
+
+    resultado = Resultado()
+    pendientes = [url for url in urls if url not in vigentes]
+    lotes = [(raiz, lote, {url: manifiesto[url]['sha256'] for url in lote if url in manifiesto})
+             for lote in _lotes(pendientes)]
+    for url, etiquetas, huella in chain.from_iterable(_en_paralelo(_renderizar_lote, lotes, procesos)):
+        manifiesto[url] = {'etiquetas': {e: actuales.get(e) for e in sorted(etiquetas)}, 'sha256': huella}
+        resultado.renderizadas.append(url)
+    resultado.vigentes = len(urls) - len(pendientes)
+
+    for url in manifiesto.keys() - set(urls):
+        fichero(raiz, url).unlink(missing_ok=True)
+        del manifiesto[url]
+        resultado.borradas.append(url)
+
+    raiz.mkdir(parents=True, exist_ok=True)
+    _escribir(raiz / MANIFIESTO, json.dumps(manifiesto, sort_keys=True).encode('utf-8'))
+    return resultado
+
+
+def verificar(raiz, procesos: int = 1, urls: Optional[list[str]] = None) -> list[str]:
+    """URLs del manifiesto (o ``urls``) cuyo fichero no coincide byte a byte
+    con la respuesta de la vista servida por Django."""
+    raiz = Path(raiz)
+    urls = sorted(leer_manifiesto(raiz)) if urls is None else urls
+    lotes = [(raiz, lote) for lote in _lotes(urls)]
+    return list(chain.from_iterable(_en_paralelo(_verificar_lote, lotes, procesos)))
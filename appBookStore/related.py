@@ -0,0 +1,252 @@
+"""Libros relacionados precalculados a partir de autores y editoriales.
+
+Dos libros se parecen por lo que comparten: cada autor en común suma
+``1 / log2(1 + n)``, con ``n`` el número de libros del autor, y la misma
+editorial suma lo mismo con los libros de la editorial (compartir un autor
+con pocos libros dice más que compartir una editorial grande). Es el producto
+de la matriz dispersa libros × (autores + editoriales) por su traspuesta, con
+un peso como el IDF de un buscador. A igual puntuación va antes el libro con
+la fecha de publicación más cercana y después el de menor id.
+
+El cálculo se hace fuera de las peticiones (``compute_related_books``) y
+guarda los ``TOP_K`` mejores de cada libro en ``RelatedBook``; el detalle del
+libro los lee con una sola consulta por rango sobre su índice único.
+
+La matriz no se multiplica entera. Los candidatos de un libro son los libros
+de sus autores y, de su editorial, basta con los ``TOP_K`` más cercanos en
+fecha a cada lado que no comparten autor: entre ellos todos puntúan igual.
+Los autores con más de ``MAX_LIBROS_AUTOR`` libros («Anónimo», «Varios») no
+cuentan, como las palabras vacías. El grafo se guarda en ``array`` indexados
+por posición, como una matriz CSR. Con un millón de libros el cálculo
+completo tarda unos 12 minutos y uno incremental tras cien cambios unos
+20 s, casi todo en cargar el grafo (``scripts/bench_related.py``).
+
+Cada ejecución incremental rehace solo las listas que pueden haber cambiado
+desde la anterior: las de los libros con ``related_inputs_at`` posterior
+(nuevos o con otra editorial, fecha o autores, ver signals.py; el stock y la
+portada no cuentan), las de los libros que mostraban uno de ellos o uno ya
+borrado (``related`` vacío), las de los que comparten autor con ellos y las
+de sus vecinos en fecha dentro de la editorial. Los pesos de los demás libros se actualizan en la siguiente
+ejecución completa. Solo se reescriben, y se invalidan en la caché, las
+listas que cambian.
+"""
+
+import heapq
+import math
+from array import array
+from dataclasses import dataclass
+from itertools import accumulate
+from typing import Iterable, Optional
+
+from django.db import connection, transaction
+from django.db.models import Q, QuerySet
+from django.utils import timezone
+
+from . import cache
+from .models import Book, RelatedBook, RelatedBooksRun
+
+TOP_K = 10
+MAX_LIBROS_AUTOR = 1000
+# Libros cuyas listas se escriben en cada transacción.
+TAMANO_LOTE = 2000
+
+
+def peso(n: int) -> float:
+    return 1 / math.log2(1 + n)
+
+
+def de_libro(book_id) -> QuerySet:
+    """Libros relacionados con ``book_id``, en orden: una consulta por el
+    índice único (book, rank)."""
+    return (Book.objects.filter(relacionado_de__book_id=book_id)
+            .order_by('relacionado_de__rank').only('pk', 'title', 'publication_date'))
+
+
+class Grafo:
+    """Libros, autores y editoriales del catálogo, con los libros por posición."""
+
+    def __init__(self):
+        self.libros = array('q')
+        self.editorial = array('q')
+        self.fecha = array('l')
+        # Autor -> libros: miembros[inicio_autor[a]:inicio_autor[a + 1]].
+        self.inicio_autor = array('l', [0])
+        self.miembros = array('l')
+        # Libros y autores se leen en la misma transacción: en SQLite es una sola
+        # instantánea (y con WAL no bloquea a quien escribe), sin libros nuevos
+        # entre una consulta y otra.
+        with transaction.atomic():
+            filas = Book.objects.order_by('pk').values_list('pk', 'publisher_id', 'publication_date')
+            for pk, editorial, fecha in filas.iterator(chunk_size=10000):
+                self.libros.append(pk)
+                self.editorial.append(editorial)
+                self.fecha.append(fecha.toordinal())
+            self.posicion = {pk: i for i, pk in enumerate(self.libros)}
+
+            enlaces = (Book.authors.through.objects.order_by('author_id', 'book_id')
+                       .values_list('author_id', 'book_id'))
+            anterior = None
+            for autor, libro in enlaces.iterator(chunk_size=10000):
+                i = self.posicion.get(libro)
+                if i is None:
+                    # Con READ COMMITTED (PostgreSQL) sí pueden aparecer: lo verá la siguiente ejecución.
+                    continue
+                if autor != anterior and anterior is not None:
+                    self.inicio_autor.append(len(self.miembros))
+                anterior = autor
+                self.miembros.append(i)
+            if self.miembros:
+                self.inicio_autor.append(len(self.miembros))
+        n = len(self.libros)
+
+        # Libro -> autores (la traspuesta), por recuento.
+        cuenta = array('l', [0]) * (n + 1)
+        for i in self.miembros:
+            cuenta[i + 1] += 1
+        self.inicio_libro = array('l', accumulate(cuenta))
+        self.autores = array('l', [0]) * len(self.miembros)
+        siguiente = array('l', self.inicio_libro)
+        for a in range(len(self.inicio_autor) - 1):
+            for i in self.miembros[self.inicio_autor[a]:self.inicio_autor[a + 1]]:
+                self.autores[siguiente[i]] = a
+                siguiente[i] += 1
+
+        # Libros de cada editorial por fecha: orden[desde:hasta], y el lugar de cada libro.
+        self.orden = array('l', sorted(range(n), key=lambda i: (self.editorial[i], self.fecha[i], self.libros[i])))
+        self.lugar = array('l', [0]) * n
+        self.rango: dict[int, tuple[int, int]] = {}
+        for p, i in enumerate(self.orden):
+            self.lugar[i] = p
+            desde, _hasta = self.rango.get(self.editorial[i], (p, p))
+            self.rango[self.editorial[i]] = (desde, p + 1)
+
+    def __len__(self):
+        return len(self.libros)
+
+    def _autores_de(self, i: int) -> Iterable[tuple[int, int]]:
+        """``(desde, hasta)`` en ``miembros`` de cada autor del libro ``i`` que cuenta."""
+        for a in self.autores[self.inicio_libro[i]:self.inicio_libro[i + 1]]:
+            desde, hasta = self.inicio_autor[a], self.inicio_autor[a + 1]
+            if hasta - desde <= MAX_LIBROS_AUTOR:
+                yield desde, hasta
+
+    def _vecinos(self, i: int, k: int, excluidos) -> Iterable[int]:
+        """Hasta ``k`` libros de la editorial de ``i`` a cada lado en fecha,
+        sin contar los de ``excluidos``."""
+        desde, hasta = self.rango[self.editorial[i]]
+        for paso in (-1, 1):
+            p, encontrados = self.lugar[i] + paso, 0
+            while desde <= p < hasta and encontrados < k:
+                j = self.orden[p]
+                if j not in excluidos:
+                    encontrados += 1
+                    yield j
+                p += paso
+
+    def relacionados(self, i: int, k: int = TOP_K) -> list[tuple[int, float]]:
+        """Los ``k`` libros más parecidos a ``i`` como ``(posición, puntuación)``."""
+        puntos: dict[int, float] = {}
+        for desde, hasta in self._autores_de(i):
+            w = peso(hasta - desde)
+            for j in self.miembros[desde:hasta]:
+                puntos[j] = puntos.get(j, 0.0) + w
+        puntos.pop(i, None)
+
+        editorial = self.editorial[i]
+        desde, hasta = self.rango[editorial]
+        w = peso(hasta - desde)
+        for j in puntos:
+            if self.editorial[j] == editorial:
+                puntos[j] += w
+        for j in list(self._vecinos(i, k, puntos)):
+            puntos[j] = w
+
+        fecha = self.fecha[i]
+        return heapq.nsmallest(k, ((j, round(s, 6)) for j, s in puntos.items()),
+                               key=lambda e: (-e[1], abs(self.fecha[e[0]] - fecha), self.libros[e[0]]))
+
+    def afectados(self, desde) -> set[int]:
+        """Posiciones de los libros cuya lista puede haber cambiado desde ``desde``."""
+        cambiados = Book.objects.filter(related_inputs_at__gte=desde).values_list('pk', flat=True)
+        tocados = {self.posicion[pk] for pk in cambiados if pk in self.posicion}
+        # Por el índice de ``related``, sin recorrer la tabla entera.
+        mostraban = RelatedBook.objects.filter(Q(related__isnull=True) | Q(related__in=cambiados))
+        resultado = {self.posicion[pk] for pk in mostraban.values_list('book_id', flat=True).distinct()
+                     if pk in self.posicion}
+        for i in tocados:
+            resultado.add(i)
+            for desde_autor, hasta_autor in self._autores_de(i):
+                resultado.update(self.miembros[desde_autor:hasta_autor])
+            resultado.update(self._vecinos(i, TOP_K, ()))
+        return resultado
+
+
+@dataclass
+class Resultado:
+    ejecucion: RelatedBooksRun
+    calculados: int
+    cambiados: int
+
+
+_INSERTAR = 'INSERT INTO {} (book_id, related_id, rank, score, computed_at) VALUES (%s, %s, %s, %s, %s)'.format(
+    connection.ops.quote_name(RelatedBook._meta.db_table)
+)
+
+
+def _guardar(listas: dict[int, list[tuple[int, float]]], ahora) -> list[int]:
+    """Escribe las listas ``{book_id: [(related_id, score)]}`` que han cambiado
+    y devuelve sus libros."""
+    with transaction.atomic():
+        actuales: dict[int, list] = {}
+        filas = (RelatedBook.objects.filter(book_id__in=list(listas)).order_by('book_id', 'rank')
+                 .values_list('book_id', 'related_id', 'score'))
+        for book_id, related_id, score in filas:
+            actuales.setdefault(book_id, []).append((related_id, score))
+        cambiados = [pk for pk, lista in listas.items() if actuales.get(pk, []) != lista]
+        calculado = connection.ops.adapt_datetimefield_value(ahora)
+        if not cambiados:
+            return []
+        RelatedBook.objects.filter(book_id__in=cambiados).delete()
+        # Después del DELETE (que ya bloquea la escritura): sin libros borrados mientras tanto.
+        relacionados = {related_id for pk in cambiados for related_id, _score in listas[pk]}
+        existen = set(Book.objects.filter(pk__in=relacionados | set(cambiados)).values_list('pk', flat=True))
+        # INSERT directo: con millones de filas, construir los modelos para
+        # bulk_create cuesta diez veces más que escribirlas.
+        filas = [
+            (pk, related_id, rank, score, calculado)
+            for pk in cambiados if pk in existen
+            for rank, (related_id, score) in enumerate(r for r in listas[pk] if r[0] in existen)
+        ]
+        with connection.cursor() as cursor:
+            cursor.executemany(_INSERTAR, filas)
+    cache.invalidar(*(cache.libro(pk) for pk in cambiados))
+    return cambiados
+
+
+def calcular(completo: bool = False, tamano_lote: int = TAMANO_LOTE) -> Resultado:
+    """Calcula los libros relacionados de todo el catálogo (``completo`` o si
+    es la primera vez) o solo de los afectados por los cambios desde la
+    última ejecución terminada."""
+    anterior: Optional[RelatedBooksRun] = (
+        RelatedBooksRun.objects.filter(finished_at__isnull=False).order_by('-started_at').first()
+    )
+    # Se anota antes de leer nada: lo que cambie durante el cálculo lo verá la siguiente.
+    ejecucion = RelatedBooksRun.objects.create(started_at=timezone.now(), full=completo or anterior is None)
+    grafo = Grafo()
+    if ejecucion.full:
+        posiciones = list(range(len(grafo)))
+    else:
+        posiciones = sorted(grafo.afectados(anterior.started_at))
+
+    cambiados = 0
+    for inicio in range(0, len(posiciones), tamano_lote):
+        listas = {
+            grafo.libros[i]: [(grafo.libros[j], score) for j, score in grafo.relacionados(i)]
+            for i in posiciones[inicio:inicio + tamano_lote]
+        }
+        cambiados += len(_guardar(listas, timezone.now()))
+
+    ejecucion.books = len(posiciones)
+    ejecucion.finished_at = timezone.now()
+    ejecucion.save(update_fields=['books', 'finished_at'])
+    return Resultado(ejecucion=ejecucion, calculados=len(posiciones), cambiados=cambiados)
@@ -0,0 +1,135 @@
+"""Reservas de stock sin sobreventa.
+
+El stock nunca se lee para luego escribirlo: cada línea de la reserva es un
+``UPDATE ... SET stock = stock - n WHERE id = ? AND stock >= n``. Si alguna
+no actualiza ninguna fila no había stock suficiente y la transacción entera
+se deshace, de modo que un pedido de varios libros se reserva completo o no
+se reserva. Los libros se actualizan siempre en el mismo orden (por id) para
+que dos pedidos no se bloqueen mutuamente en bases de datos con bloqueo por
+fila.
+
+Las reservas caducan a los ``RESERVATION_TTL`` segundos: hasta entonces se
+pueden confirmar (checkout); después ``liberar_caducadas`` (comando
+``release_reservations``) devuelve su stock. Los cambios de estado también son
+``UPDATE`` condicionados al estado anterior, así que una reserva no se libera
+dos veces ni se confirma una ya liberada aunque lo intenten a la vez.
+
+En SQLite una escritura concurrente puede fallar con "database is locked";
+fuera de una transacción abierta por quien llama, esas operaciones se
+reintentan con una espera creciente.
+"""
+
+import random
+import time
+from datetime import timedelta
+from typing import Mapping, Optional
+
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import cache
+from .models import Book, Reservation, ReservationItem
+
+MAX_REINTENTOS = 20
+# Espera máxima entre reintentos, en segundos.
+MAX_ESPERA = 0.05
+
+
+class StockInsuficiente(Exception):
+    def __init__(self, book_id: int):
+        super().__init__(f'Stock insuficiente del libro {book_id}')
+        self.book_id = book_id
+
+
+class ReservaNoDisponible(Exception):
+    """La reserva no existe, ha caducado o ya se confirmó o liberó."""
+
+
+def _duracion() -> timedelta:
+    return timedelta(seconds=getattr(settings, 'RESERVATION_TTL', 15 * 60))
+
+
+def _reintentar(operacion):
+    """Ejecuta ``operacion`` reintentando los bloqueos transitorios de SQLite."""
+    if connection.in_atomic_block:
+        # Dentro de la transacción de quien llama no se puede repetir solo una parte.
+        return operacion()
+    for intento in range(MAX_REINTENTOS):
+        try:
+            return operacion()
+        except OperationalError as error:
+            if 'locked' not in str(error) or intento == MAX_REINTENTOS - 1:
+                raise
+            time.sleep(random.uniform(0, min(MAX_ESPERA, 0.001 * 2 ** intento)))
+
+
+def _invalidar_stock(book_ids) -> None:
+    # El stock se muestra en el detalle y en las facetas del listado.
+    ids = list(book_ids)
+    transaction.on_commit(lambda: cache.invalidar(cache.LISTA_LIBROS, *(cache.libro(pk) for pk in ids)))
+
+
+def reservar(lineas: Mapping[int, int], duracion: Optional[timedelta] = None) -> Reservation:
+    """Reserva ``{book_id: cantidad}`` entero o lanza ``StockInsuficiente``."""
+    if not lineas or any(cantidad <= 0 for cantidad in lineas.values()):
+        raise ValueError('La reserva necesita al menos un libro y cantidades positivas')
+
+    def operacion():
+        with transaction.atomic():
+            for book_id, cantidad in sorted(lineas.items()):
+                actualizados = Book.objects.filter(pk=book_id, stock__gte=cantidad).update(
+                    stock=F('stock') - cantidad, updated_at=timezone.now(),
+                )
+                if not actualizados:
+                    raise StockInsuficiente(book_id)
+            reserva = Reservation.objects.create(expires_at=timezone.now() + (duracion or _duracion()))
+            ReservationItem.objects.bulk_create([
+                ReservationItem(reservation=reserva, book_id=book_id, quantity=cantidad)
+                for book_id, cantidad in lineas.items()
+            ])
+            _invalidar_stock(lineas)
+            return reserva
+
+    return _reintentar(operacion)
+
+
+def confirmar(token) -> None:
+    """Checkout: el stock reservado queda vendido. Solo antes de caducar."""
+    def operacion():
+        return Reservation.objects.filter(
+            token=token, status=Reservation.PENDING, expires_at__gt=timezone.now(),
+        ).update(status=Reservation.CONFIRMED)
+
+    if not _reintentar(operacion):
+        raise ReservaNoDisponible(token)
+
+
+def _liberar(filtro) -> bool:
+    with transaction.atomic():
+        # Se escribe antes de leer (no hay que pasar de lectura a escritura en
+        # SQLite) y solo quien cambia el estado devuelve el stock.
+        if not Reservation.objects.filter(status=Reservation.PENDING, **filtro).update(status=Reservation.RELEASED):
+            return False
+        lineas = list(ReservationItem.objects.filter(**{f'reservation__{k}': v for k, v in filtro.items()})
+                      .values_list('book_id', 'quantity'))
+        for book_id, cantidad in sorted(lineas):
+            Book.objects.filter(pk=book_id).update(stock=F('stock') + cantidad, updated_at=timezone.now())
+        _invalidar_stock(book_id for book_id, _cantidad in lineas)
+        return True
+
+
+def liberar(token) -> None:
+    """Cancela una reserva pendiente y devuelve su stock."""
+    if not _reintentar(lambda: _liberar({'token': token})):
+        raise ReservaNoDisponible(token)
+
+
+def liberar_caducadas(ahora=None) -> int:
+    """Libera las reservas pendientes caducadas; devuelve cuántas."""
+    ahora = ahora or timezone.now()
+    caducadas = list(
+        Reservation.objects.filter(status=Reservation.PENDING, expires_at__lte=ahora).values_list('pk', flat=True)
+    )
+    return sum(_reintentar(lambda pk=pk: _liberar({'pk': pk})) for pk in caducadas)
@@ -0,0 +1,33 @@
+"""Router de bases de datos del perfil de producción (ver ``bookStore/databases.py``).
+
+Las lecturas del catálogo (libros, autores, editoriales y su tabla
+intermedia) van a la conexión de solo lectura ``replica``; todo lo demás, y
+cualquier escritura, a ``default``. Dentro de una transacción abierta en
+``default`` también se lee de ``default``, para ver lo que se acaba de escribir.
+"""
+
+from django.db import connections
+
+from .models import Author, Book, Publisher
+
+MODELOS_CATALOGO = {Publisher, Author, Book, Book.authors.through}
+
+
+class CatalogoRouter:
+    replica = 'replica'
+    primaria = 'default'
+
+    def db_for_read(self, model, **hints):
+        if model in MODELOS_CATALOGO and not connections[self.primaria].in_atomic_block:
+            return self.replica
+        return self.primaria
+
+    def db_for_write(self, model, **hints):
+        return self.primaria
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Réplica y primaria contienen los mismos datos.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == self.primaria
@@ -0,0 +1,156 @@
+"""Índice de texto completo de libros sobre una tabla virtual FTS5 de SQLite.
+
+La tabla ``appBookStore_book_fts`` (creada en la migración 0004) guarda por
+cada libro, con ``rowid`` igual al id del libro, el título, el ISBN (tal cual
+y sin guiones), el resumen y los nombres de sus autores. El tokenizador
+``unicode61 remove_diacritics 2`` hace que la búsqueda no distinga mayúsculas
+ni acentos. Las señales de ``signals.py`` mantienen el índice al día y el
+comando ``rebuild_search_index`` lo reconstruye entero.
+
+En bases de datos que no sean SQLite las funciones devuelven ``None`` y la
+vista vuelve a la búsqueda con ``icontains``.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+from django.db import connection, connections
+from django.db.models import Q, QuerySet
+from django.db.models.expressions import RawSQL
+
+from .models import Author, Book, normalizar_isbn
+
+FTS_TABLE = 'appBookStore_book_fts'
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+_ISBN_RE = re.compile(r'^[0-9Xx\- ]+$')
+
+
+def fts_disponible() -> bool:
+    return connection.vendor == 'sqlite'
+
+
+def construir_consulta(termino: str) -> str:
+    """Convierte la búsqueda del usuario en una consulta FTS5 por prefijos.
+
+    Cada palabra se cita (para neutralizar la sintaxis de FTS5) y se marca
+    como prefijo; todas deben aparecer.
+    """
+    return ' '.join(f'"{token}"*' for token in _TOKEN_RE.findall(termino))
+
+
+@dataclass(frozen=True)
+class Busqueda:
+    """Libros que casan con un término: un filtro para el ORM y sus ids por
+    relevancia, página a página, sin límite de resultados."""
+    consulta: str = ''
+    isbn: Optional[str] = None
+
+    def _coincidencias(self) -> str:
+        return f'SELECT rowid FROM "{FTS_TABLE}" WHERE "{FTS_TABLE}" MATCH %s'
+
+    def filtro(self) -> Q:
+        if self.isbn:
+            return Q(isbn_normalizado=self.isbn)
+        if not self.consulta:
+            return Q(pk__in=[])
+        return Q(pk__in=RawSQL(self._coincidencias(), [self.consulta]))
+
+    def ids(self, libros: QuerySet, desde: int, hasta: int) -> list[int]:
+        """Ids de ``libros`` (ya filtrados) de la posición ``desde`` a ``hasta``
+        en orden de relevancia."""
+        if self.isbn:
+            return list(libros.order_by('pk').values_list('pk', flat=True)[desde:hasta])
+        if not self.consulta:
+            return []
+        sql, params = libros.order_by().values('pk').query.get_compiler(libros.db).as_sql()
+        with connections[libros.db].cursor() as cursor:
+            # Con ``rowid IN`` a secas FTS5 recibe la restricción y repite el
+            # MATCH por cada libro del filtro; ``+rowid`` la deja fuera del
+            # índice y solo comprueba las coincidencias.
+            cursor.execute(
+                f'{self._coincidencias()} AND +rowid IN ({sql}) ORDER BY rank LIMIT %s OFFSET %s',
+                [self.consulta, *params, hasta - desde, desde],
+            )
+            return [fila[0] for fila in cursor.fetchall()]
+
+
+def buscar_libros(termino: str) -> Optional[Busqueda]:
+    """Búsqueda de ``termino`` por el índice, o ``None`` si no hay índice FTS5."""
+    if not fts_disponible():
+        return None
+    # Un ISBN completo se resuelve con el índice del ISBN normalizado, sin pasar por FTS5.
+    isbn = normalizar_isbn(termino)
+    if _ISBN_RE.match(termino) and isbn and len(isbn) in (10, 13):
+        if Book.objects.filter(isbn_normalizado=isbn).exists():
+            return Busqueda(isbn=isbn)
+    return Busqueda(consulta=construir_consulta(termino))
+
+
+def _select_documentos(where: str) -> str:
+    libro = Book._meta.db_table
+    autor = Author._meta.db_table
+    relacion = Book.authors.through._meta.db_table
+    return f'''
+        SELECT b.id, b.title,
+               COALESCE(b.isbn || ' ' || REPLACE(REPLACE(b.isbn, '-', ''), ' ', ''), ''),
+               COALESCE(b.summary, ''),
+               COALESCE((SELECT GROUP_CONCAT(a.name, ' ')
+                         FROM "{relacion}" ba JOIN "{autor}" a ON a.id = ba.author_id
+                         WHERE ba.book_id = b.id), '')
+        FROM "{libro}" b
+        WHERE {where}
+    '''
+
+
+def indexar_libros(ids: Iterable[int]) -> None:
+    """(Re)indexa los libros indicados; los que ya no existan se eliminan."""
+    if not fts_disponible():
+        return
+    ids = list(ids)
+    # Por debajo del límite de variables de SQLite en cualquier versión.
+    for inicio in range(0, len(ids), 500):
+        lote = ids[inicio:inicio + 500]
+        marcadores = ', '.join(['%s'] * len(lote))
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM "{FTS_TABLE}" WHERE rowid IN ({marcadores})', lote)
+            cursor.execute(
+                f'INSERT INTO "{FTS_TABLE}" (rowid, title, isbn, summary, authors) '
+                + _select_documentos(f'b.id IN ({marcadores})'),
+                lote,
+            )
+
+
+def reconstruir_indice(tamano_lote: int = 10000) -> int:
+    """Vacía y vuelve a llenar el índice por rangos de id. Devuelve el total."""
+    if not fts_disponible():
+        return 0
+    total = 0
+    ultimo_id = 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM "{FTS_TABLE}"')
+        while True:
+            cursor.execute(
+                f'SELECT id FROM "{Book._meta.db_table}" WHERE id > %s ORDER BY id LIMIT 1 OFFSET %s',
+                [ultimo_id, tamano_lote - 1],
+            )
+            fila = cursor.fetchone()
+            hasta = fila[0] if fila else None
+            if hasta is None:
+                cursor.execute(
+                    f'INSERT INTO "{FTS_TABLE}" (rowid, title, isbn, summary, authors) '
+                    + _select_documentos('b.id > %s'),
+                    [ultimo_id],
+                )
+                total += cursor.rowcount
+                break
+            cursor.execute(
+                f'INSERT INTO "{FTS_TABLE}" (rowid, title, isbn, summary, authors) '
+                + _select_documentos('b.id > %s AND b.id <= %s'),
+                [ultimo_id, hasta],
+            )
+            total += cursor.rowcount
+            ultimo_id = hasta
+        cursor.execute(f'INSERT INTO "{FTS_TABLE}" ("{FTS_TABLE}") VALUES (\'optimize\')')
+    return total
@@ -0,0 +1,188 @@
+"""Receptores de señales que mantienen al día los datos derivados del catálogo."""
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import cache, images, search, typeahead
+from .models import Author, Book, Publisher
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+def reindexar_libro(sender, instance, **kwargs):
+    search.indexar_libros([instance.pk])
+
+
+@receiver(m2m_changed, sender=Book.authors.through)
+def reindexar_autores_de_libro(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action.startswith('post_'):
+            search.indexar_libros([instance.pk])
+    elif action == 'pre_clear':
+        # Tras el clear ya no se sabe qué libros tenía el autor.
+        instance._libros_a_reindexar = list(instance.book_set.values_list('pk', flat=True))
+    elif action == 'post_clear':
+        search.indexar_libros(getattr(instance, '_libros_a_reindexar', []))
+    elif action in ('post_add', 'post_remove'):
+        search.indexar_libros(pk_set or [])
+
+
+@receiver(post_save, sender=Author)
+def reindexar_libros_de_autor(sender, instance, created, **kwargs):
+    if not created:
+        search.indexar_libros(instance.book_set.values_list('pk', flat=True))
+
+
+@receiver(pre_delete, sender=Author)
+def recordar_libros_de_autor(sender, instance, **kwargs):
+    instance._libros_a_reindexar = list(instance.book_set.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Author)
+def reindexar_libros_de_autor_borrado(sender, instance, **kwargs):
+    search.indexar_libros(getattr(instance, '_libros_a_reindexar', []))
+
+
+# --- Invalidación de la caché de respuestas del catálogo ---------------------
+
+@receiver(pre_save, sender=Book)
+def recordar_editorial_anterior(sender, instance, **kwargs):
+    if instance.pk:
+        instance._editorial_anterior, instance._fecha_anterior = (
+            Book.objects.filter(pk=instance.pk).values_list('publisher_id', 'publication_date').first()
+            or (None, None)
+        )
+
+
+@receiver(pre_delete, sender=Book)
+def recordar_autores_de_libro(sender, instance, **kwargs):
+    instance._autores_anteriores = list(instance.authors.values_list('pk', flat=True))
+
+
+def _invalidar_al_confirmar(*etiquetas: str) -> None:
+    # Antes del commit otra petición podría leer la versión nueva, pintar las
+    # filas antiguas y guardarlas con ella: se invalida cuando ya son visibles.
+    transaction.on_commit(lambda: cache.invalidar(*etiquetas))
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+def invalidar_libro(sender, instance, **kwargs):
+    autores = getattr(instance, '_autores_anteriores', None)
+    if autores is None:
+        autores = [] if kwargs.get('created') else instance.authors.values_list('pk', flat=True)
+    editoriales = {instance.publisher_id, getattr(instance, '_editorial_anterior', None)} - {None}
+    etiquetas = [
+        cache.PORTADA, cache.LISTA_LIBROS, cache.libro(instance.pk),
+        *(cache.libros_de_editorial(pk) for pk in editoriales),
+        *(cache.libros_de_autor(pk) for pk in autores),
+    ]
+    # Los directorios muestran el número de libros y la última publicación:
+    # solo cambian al crear o borrar el libro, o al cambiar su editorial o fecha.
+    if (kwargs.get('created') or kwargs['signal'] is post_delete or len(editoriales) > 1
+            or getattr(instance, '_fecha_anterior', None) != instance.publication_date):
+        etiquetas += [cache.LISTA_EDITORIALES, cache.LISTA_AUTORES]
+    _invalidar_al_confirmar(*etiquetas)
+
+
+@receiver(m2m_changed, sender=Book.authors.through)
+def invalidar_autores_de_libro(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear':
+        # Tras el clear ya no se sabe qué había al otro lado de la relación.
+        if reverse:
+            instance._relacionados = list(instance.book_set.values_list('pk', flat=True))
+        else:
+            instance._relacionados = list(instance.authors.values_list('pk', flat=True))
+        return
+    if action == 'post_clear':
+        pk_set = getattr(instance, '_relacionados', [])
+    elif action not in ('post_add', 'post_remove'):
+        return
+
+    if reverse:
+        etiquetas = [cache.libros_de_autor(instance.pk), *(cache.libro(pk) for pk in pk_set or [])]
+    else:
+        etiquetas = [cache.libro(instance.pk), *(cache.libros_de_autor(pk) for pk in pk_set or [])]
+    _invalidar_al_confirmar(cache.LISTA_LIBROS, cache.LISTA_AUTORES, *etiquetas)
+
+
+@receiver(post_save, sender=Author)
+@receiver(post_delete, sender=Author)
+def invalidar_autor(sender, instance, **kwargs):
+    # La lista de libros también depende de los autores a través de la búsqueda.
+    _invalidar_al_confirmar(cache.LISTA_AUTORES, cache.LISTA_LIBROS, cache.autor(instance.pk))
+
+
+@receiver(post_save, sender=Publisher)
+@receiver(post_delete, sender=Publisher)
+def invalidar_editorial(sender, instance, **kwargs):
+    _invalidar_al_confirmar(cache.PORTADA, cache.LISTA_EDITORIALES, cache.LISTA_LIBROS,
+                            cache.editorial(instance.pk))
+
+
+# --- Fecha de modificación de los libros (GET condicional) -------------------
+
+@receiver(m2m_changed, sender=Book.authors.through)
+def actualizar_fecha_por_autores(sender, instance, action, reverse, pk_set, **kwargs):
+    # Los autores se muestran en el detalle del libro; no pasan por save().
+    if action == 'post_clear':
+        libros = getattr(instance, '_relacionados', []) if reverse else [instance.pk]
+    elif action in ('post_add', 'post_remove') and pk_set:
+        libros = pk_set if reverse else [instance.pk]
+    else:
+        return
+    ahora = timezone.now()
+    Book.objects.filter(pk__in=libros).update(updated_at=ahora, related_inputs_at=ahora)
+
+
+@receiver(post_delete, sender=Author)
+def actualizar_fecha_por_autor_borrado(sender, instance, **kwargs):
+    # El borrado en cascada de la relación no envía m2m_changed.
+    ahora = timezone.now()
+    Book.objects.filter(pk__in=getattr(instance, '_libros_a_reindexar', [])).update(
+        updated_at=ahora, related_inputs_at=ahora,
+    )
+
+
+@receiver(post_save, sender=Book)
+def actualizar_fecha_de_relacionados(sender, instance, created, **kwargs):
+    # Los libros nuevos ya la traen por defecto; el stock o la portada no cuentan.
+    if created:
+        return
+    anterior = (getattr(instance, '_editorial_anterior', None), getattr(instance, '_fecha_anterior', None))
+    if anterior != (instance.publisher_id, instance.publication_date):
+        Book.objects.filter(pk=instance.pk).update(related_inputs_at=timezone.now())
+
+
+# --- Autocompletado -----------------------------------------------------------
+
+TIPOS_TYPEAHEAD = {Book: (typeahead.LIBRO, 'title'), Author: (typeahead.AUTOR, 'name'),
+                   Publisher: (typeahead.EDITORIAL, 'name')}
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_save, sender=Author)
+@receiver(post_save, sender=Publisher)
+@receiver(post_delete, sender=Book)
+@receiver(post_delete, sender=Author)
+@receiver(post_delete, sender=Publisher)
+def actualizar_typeahead(sender, instance, **kwargs):
+    tipo, campo = TIPOS_TYPEAHEAD[sender]
+    pk, nombre = instance.pk, None if kwargs['signal'] is post_delete else getattr(instance, campo)
+    # El índice está en memoria: un cambio deshecho por un rollback no debe llegar.
+    transaction.on_commit(lambda: typeahead.registrar_cambio(tipo, pk, nombre))
+
+
+# --- Variantes de imágenes ----------------------------------------------------
+
+CAMPOS_IMAGEN = {Book: 'cover_image', Publisher: 'logo', Author: 'photo'}
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_save, sender=Publisher)
+@receiver(post_save, sender=Author)
+def generar_variantes_imagen(sender, instance, **kwargs):
+    # Solo abre la imagen si es otra que la de las variantes registradas.
+    images.procesar(instance, CAMPOS_IMAGEN[sender])
@@ -0,0 +1,214 @@
+"""Ficheros estáticos con el hash del contenido en el nombre, precomprimidos y
+servidos por delante de Django.
+
+``collectstatic`` con ``AlmacenComprimido`` escribe, como el almacén con
+manifiesto de Django, ``styles.css`` y ``styles.<hash>.css`` y el manifiesto
+``staticfiles.json`` que usa ``{% static %}``; después guarda junto a cada
+fichero de texto su versión ``.gz`` y, si está instalado ``brotli``, ``.br``
+(solo cuando ocupan menos que el original). Se comprime una vez al desplegar
+y con el nivel máximo, no en cada petición.
+
+``ServidorEstaticosWSGI`` y ``ServidorEstaticosASGI`` envuelven la aplicación
+(ver wsgi.py y asgi.py): cargan en memoria lo recogido en ``STATIC_ROOT`` al
+arrancar, eligen la variante según ``Accept-Encoding`` y marcan los nombres
+con hash como inmutables durante un año; el resto se revalida con ``ETag``.
+Las demás peticiones pasan a Django sin cambios. Tras un ``collectstatic``
+hay que reiniciar los procesos.
+"""
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:  # Opcional: sin brotli solo se genera gzip.
+    brotli = None
+
+COMPRIMIBLES = {'.css', '.js', '.mjs', '.map', '.json', '.svg', '.html', '.txt', '.xml'}
+# Por debajo de este tamaño la compresión no compensa las cabeceras.
+MIN_COMPRIMIR = 256
+INMUTABLE = f'public, max-age={365 * 24 * 3600}, immutable'
+REVALIDAR = 'no-cache'
+# Preferencia del servidor entre las codificaciones que acepta el cliente.
+CODIFICACIONES = {'br': '.br', 'gzip': '.gz'}
+
+
+def comprimir(contenido: bytes) -> dict[str, bytes]:
+    """Variantes comprimidas de ``contenido`` que ocupan menos que el original."""
+    variantes = {'gzip': gzip.compress(contenido, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variantes['br'] = brotli.compress(contenido, quality=11)
+    return {codificacion: datos for codificacion, datos in variantes.items() if len(datos) < len(contenido)}
+
+
+class AlmacenComprimido(ManifestStaticFilesStorage):
+    """``ManifestStaticFilesStorage`` que además precomprime los ficheros de texto."""
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        nombres = set(paths) | set(self.hashed_files.values())
+        for nombre in sorted(nombres):
+            if Path(nombre).suffix not in COMPRIMIBLES or not self.exists(nombre):
+                continue
+            with self.open(nombre) as fichero:
+                contenido = fichero.read()
+            if len(contenido) < MIN_COMPRIMIR:
+                continue
+            for codificacion, datos in comprimir(contenido).items():
+                # Se escribe directamente: _save() añadiría un sufijo si ya existe.
+                Path(self.path(nombre + CODIFICACIONES[codificacion])).write_bytes(datos)
+
+
+@dataclass
+class Fichero:
+    tipo: str
+    etag: str
+    cache_control: str
+    # Codificación ('identity', 'gzip', 'br') -> contenido.
+    variantes: dict[str, bytes]
+
+
+def _tipo(nombre: str) -> str:
+    tipo = mimetypes.guess_type(nombre)[0] or 'application/octet-stream'
+    if tipo.startswith('text/') or tipo in ('application/javascript', 'application/json', 'image/svg+xml'):
+        tipo += '; charset=utf-8'
+    return tipo
+
+
+def aceptadas(cabecera: str) -> dict[str, float]:
+    """``Accept-Encoding`` como ``{codificación: q}``."""
+    resultado = {}
+    for parte in cabecera.split(','):
+        nombre, _, parametros = parte.partition(';')
+        nombre = nombre.strip().lower()
+        if not nombre:
+            continue
+        q = 1.0
+        parametros = parametros.strip().replace(' ', '')
+        if parametros.startswith('q='):
+            try:
+                q = float(parametros[2:])
+            except ValueError:
+                q = 0.0
+        resultado[nombre] = q
+    return resultado
+
+
+def elegir_codificacion(fichero: Fichero, cabecera: str) -> str:
+    codificaciones = aceptadas(cabecera)
+    for codificacion in CODIFICACIONES:
+        if codificacion in fichero.variantes and codificaciones.get(codificacion, codificaciones.get('*', 0)) > 0:
+            return codificacion
+    return 'identity'
+
+
+class Estaticos:
+    """Los ficheros de ``raiz`` (``STATIC_ROOT``) cargados en memoria."""
+
+    def __init__(self, raiz=None, prefijo: Optional[str] = None):
+        raiz = Path(raiz or settings.STATIC_ROOT)
+        self.prefijo = prefijo or settings.STATIC_URL
+        self.ficheros: dict[str, Fichero] = {}
+        if not raiz.is_dir():
+            return
+        try:
+            manifiesto = json.loads((raiz / ManifestStaticFilesStorage.manifest_name).read_text('utf-8'))
+            con_hash = set(manifiesto['paths'].values())
+        except (FileNotFoundError, ValueError, KeyError):
+            con_hash = set()
+
+        sufijos = tuple(CODIFICACIONES.values())
+        for directorio, _subdirectorios, nombres in os.walk(raiz):
+            for nombre in nombres:
+                ruta = Path(directorio, nombre)
+                relativo = ruta.relative_to(raiz).as_posix()
+                if nombre.endswith(sufijos) or relativo == ManifestStaticFilesStorage.manifest_name:
+                    continue
+                variantes = {'identity': ruta.read_bytes()}
+                for codificacion, sufijo in CODIFICACIONES.items():
+                    comprimido = ruta.with_name(nombre + sufijo)
+                    if comprimido.exists():
+                        variantes[codificacion] = comprimido.read_bytes()
+                self.ficheros[relativo] = Fichero(
+                    tipo=_tipo(nombre),
+                    etag=hashlib.md5(variantes['identity']).hexdigest()[:16],
+                    cache_control=INMUTABLE if relativo in con_hash else REVALIDAR,
+                    variantes=variantes,
+                )
+
+    def buscar(self, ruta: str) -> Optional[Fichero]:
+        if not ruta.startswith(self.prefijo):
+            return None
+        return self.ficheros.get(ruta[len(self.prefijo):])
+
+    def respuesta(self, fichero: Fichero, metodo: str, accept_encoding: str,
+                  if_none_match: str) -> tuple[int, list[tuple[str, str]], bytes]:
+        """Estado, cabeceras y cuerpo de la respuesta a ``fichero``."""
+        codificacion = elegir_codificacion(fichero, accept_encoding)
+        etag = f'"{fichero.etag}-{codificacion}"'
+        cabeceras = [('Cache-Control', fichero.cache_control), ('ETag', etag)]
+        if len(fichero.variantes) > 1:
+            cabeceras.append(('Vary', 'Accept-Encoding'))
+        if etag in (valor.strip() for valor in if_none_match.split(',')):
+            return 304, cabeceras, b''
+        cuerpo = fichero.variantes[codificacion]
+        cabeceras += [('Content-Type', fichero.tipo), ('Content-Length', str(len(cuerpo)))]
+        if codificacion != 'identity':
+            cabeceras.append(('Content-Encoding', codificacion))
+        return 200, cabeceras, b'' if metodo == 'HEAD' else cuerpo
+
+
+ESTADOS = {200: '200 OK', 304: '304 Not Modified'}
+
+
+class ServidorEstaticosWSGI:
+    def __init__(self, aplicacion, estaticos: Optional[Estaticos] = None):
+        self.aplicacion = aplicacion
+        self.estaticos = estaticos or Estaticos()
+
+    def __call__(self, environ, start_response):
+        metodo = environ['REQUEST_METHOD']
+        fichero = self.estaticos.buscar(environ.get('PATH_INFO', '')) if metodo in ('GET', 'HEAD') else None
+        if fichero is None:
+            return self.aplicacion(environ, start_response)
+        estado, cabeceras, cuerpo = self.estaticos.respuesta(
+            fichero, metodo, environ.get('HTTP_ACCEPT_ENCODING', ''), environ.get('HTTP_IF_NONE_MATCH', ''),
+        )
+        start_response(ESTADOS[estado], cabeceras)
+        return [cuerpo]
+
+
+class ServidorEstaticosASGI:
+    def __init__(self, aplicacion, estaticos: Optional[Estaticos] = None):
+        self.aplicacion = aplicacion
+        self.estaticos = estaticos or Estaticos()
+
+    async def __call__(self, scope, receive, send):
+        fichero = None
+        if scope['type'] == 'http' and scope['method'] in ('GET', 'HEAD'):
+            fichero = self.estaticos.buscar(scope['path'])
+        if fichero is None:
+            return await self.aplicacion(scope, receive, send)
+        cabeceras = dict(scope['headers'])
+        estado, cabeceras, cuerpo = self.estaticos.respuesta(
+            fichero, scope['method'],
+            cabeceras.get(b'accept-encoding', b'').decode('latin-1'),
+            cabeceras.get(b'if-none-match', b'').decode('latin-1'),
+        )
+        await send({
+            'type': 'http.response.start',
+            'status': estado,
+            'headers': [(nombre.lower().encode('latin-1'), valor.encode('latin-1')) for nombre, valor in cabeceras],
+        })
+        await send({'type': 'http.response.body', 'body': cuerpo})
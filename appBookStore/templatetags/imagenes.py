@@ -0,0 +1,34 @@
+from django import template
+
+from appBookStore.images import tipo_mime, variantes_disponibles
+
+register = template.Library()
+
+# Orden de preferencia de las <source>: el navegador usa la primera que soporte.
+_ORDEN_FUENTES = ('avif', 'webp')
+
+
+def _srcset(variantes):
+    return ', '.join(f'{url} {ancho}w' for url, ancho in variantes)
+
+
+@register.inclusion_tag('imagen_responsive.html')
+def imagen_responsive(campo, alt='', clase='', sizes='160px', carga='lazy'):
+    """Renderiza ``campo`` (un ImageField) como ``<picture>`` con sus variantes.
+
+    Si no hay variantes registradas se muestra solo la imagen original. Las
+    lee del modelo: no consulta el almacenamiento.
+    """
+    variantes = variantes_disponibles(campo)
+    return {
+        'original': campo.url,
+        'fuentes': [
+            (tipo_mime(extension), _srcset(variantes[extension]))
+            for extension in _ORDEN_FUENTES if extension in variantes
+        ],
+        'srcset': _srcset(variantes.get('jpg', [])),
+        'alt': alt,
+        'clase': clase,
+        'sizes': sizes,
+        'carga': carga,
+    }
@@ -1,3 +1,1962 @@
-from django.test import TestCase
+import csv
+import re
+import gzip
+import shutil
+import json
+import tempfile
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib.admin import helpers
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import caches
+from django.core.mail.backends import locmem
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import OperationalError, connection, connections, router as db_router, transaction
+from django.db.models import Count
+from django.db.utils import ConnectionHandler
+from django.http import Http404
+from django.test import (
+    AsyncRequestFactory, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from asgiref.sync import async_to_sync, sync_to_async
+from PIL import Image
+
+from bookStore.databases import sqlite_produccion
+
+from . import (
+    async_views, cache, contacts, export, images, newsletter, prerender, related, reservations, search,
+    static_assets, typeahead, views,
+)
+from .benchmarking import sembrar_catalogo, vaciar_catalogo
+from .forms import BookSearchForm
+from .management.commands.benchmark_catalog import Command as BenchmarkCommand
+from .middleware import MetricasPeticion, huella
+from .models import Author, Book, Contact, NewsletterCampaign, NewsletterSubscription, Publisher, RelatedBook, Reservation
+from .pagination import TAMANO_PAGINA, codificar_cursor
+from .routers import CatalogoRouter
+from .search import reconstruir_indice
+
+
+def crear_catalogo(n_editoriales, libros_por_editorial=2):
+    """Crea un catálogo sintético pequeño con bulk_create."""
+    editoriales = Publisher.objects.bulk_create(
+        [Publisher(name=f'Editorial {i:04d}') for i in range(n_editoriales)]
+    )
+    libros = []
+    for i, editorial in enumerate(editoriales):
+        for j in range(libros_por_editorial):
+            libros.append(Book(
+                publisher=editorial,
+                title=f'Libro {i:04d}-{j}',
+                publication_date=date(2000 + j, 1, 1 + (i % 28)),
+                stock=j,
+                isbn=f'978{i:06d}{j:04d}',
+            ))
+    Book.objects.bulk_create(libros)
+    # bulk_create no dispara señales: se indexa como haría una carga masiva.
+    reconstruir_indice()
+    return editoriales
+
+
+@override_settings(CATALOGO_CACHE_ENABLED=False)
+class CatalogoTestCase(TestCase):
+    """Pruebas de vistas sin la caché de respuestas, para inspeccionar el contexto."""
+
+
+class IndexTests(CatalogoTestCase):
+
+    def test_libro_mas_reciente_por_editorial(self):
+        con_libros = Publisher.objects.create(name='Con libros')
+        sin_libros = Publisher.objects.create(name='Sin libros')
+        Book.objects.create(publisher=con_libros, title='Viejo', publication_date=date(1990, 1, 1))
+        nuevo = Book.objects.create(publisher=con_libros, title='Nuevo', publication_date=date(2020, 1, 1))
+
+        response = self.client.get(reverse('index'))
+
+        editoriales = response.context['editoriales']
+        self.assertEqual(editoriales[con_libros], nuevo)
+        self.assertIsNone(editoriales[sin_libros])
+        self.assertEqual(list(editoriales), [con_libros, sin_libros])
+
+    def test_numero_de_consultas_constante(self):
+        crear_catalogo(1000)
+        Publisher.objects.create(name='Sin libros')
+
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('index'))
+
+        self.assertEqual(len(response.context['editoriales']), 1001)
+
+
+class BookListPaginationTests(CatalogoTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        crear_catalogo(150, libros_por_editorial=4)  # 600 libros
+
+    def test_primera_pagina_sin_consultas_por_fila(self):
+        # Facetas (que dan también el total, sin COUNT) y la página con select_related.
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('book-list'))
+        self.assertEqual(len(response.context['libros']), TAMANO_PAGINA)
+
+    def test_recorrido_completo_por_paginas_y_cursores(self):
+        vistos = []
+        url = reverse('book-list') + '?min_stock=1'
+        while url:
+            response = self.client.get(url)
+            pagina = response.context['pagina']
+            vistos.extend(libro.pk for libro in pagina)
+            url = reverse('book-list') + pagina.siguiente if pagina.siguiente else None
+
+        esperados = list(
+            Book.objects.filter(stock__gte=1).order_by('title', 'pk').values_list('pk', flat=True)
+        )
+        self.assertEqual(vistos, esperados)
+
+    def test_cursor_profundo_conserva_filtros_y_vuelve_atras(self):
+        libros = list(Book.objects.order_by('title', 'pk'))
+        cursor = codificar_cursor(libros[400].title, libros[400].pk)
+
+        response = self.client.get(reverse('book-list'), {'after': cursor})
+        pagina = response.context['pagina']
+        self.assertEqual([l.pk for l in pagina], [l.pk for l in libros[401:401 + TAMANO_PAGINA]])
+
+        response = self.client.get(reverse('book-list') + pagina.anterior)
+        anterior = response.context['pagina']
+        self.assertEqual([l.pk for l in anterior], [l.pk for l in libros[401 - TAMANO_PAGINA:401]])
+
+    def test_cursor_invalido_vuelve_a_la_primera_pagina(self):
+        response = self.client.get(reverse('book-list'), {'after': 'no-es-un-cursor'})
+        self.assertEqual(response.context['pagina'].numero, 1)
+
+
+class BookSearchIndexTests(CatalogoTestCase):
+
+    def setUp(self):
+        self.editorial = Publisher.objects.create(name='Anagrama')
+        self.autora = Author.objects.create(name='Almudena Grandes')
+        self.libro = Book.objects.create(
+            publisher=self.editorial, title='El corazón helado',
+            publication_date=date(2007, 1, 1), isbn='978-84-8310-367-4',
+            summary='Una novela sobre la memoria histórica.',
+        )
+        self.libro.authors.add(self.autora)
+        self.otro = Book.objects.create(
+            publisher=self.editorial, title='Memorias de Adriano',
+            publication_date=date(1951, 1, 1),
+        )
+
+    def buscar(self, termino):
+        response = self.client.get(reverse('book-list'), {'search': termino})
+        return [libro.pk for libro in response.context['libros']]
+
+    def test_prefijos_y_acentos(self):
+        self.assertEqual(self.buscar('corazon hel'), [self.libro.pk])
+        self.assertEqual(self.buscar('CORAZÓN'), [self.libro.pk])
+
+    def test_isbn_con_y_sin_guiones(self):
+        self.assertEqual(self.buscar('978-84-8310'), [self.libro.pk])
+        self.assertEqual(self.buscar('9788483103674'), [self.libro.pk])
+
+    def test_ordena_por_relevancia(self):
+        # "memoria" está en el título de uno y solo en el resumen del otro.
+        self.assertEqual(self.buscar('memoria'), [self.otro.pk, self.libro.pk])
+
+    def test_autores_se_mantienen_sincronizados(self):
+        self.assertEqual(self.buscar('almudena'), [self.libro.pk])
+
+        self.autora.name = 'Benito Pérez Galdós'
+        self.autora.save()
+        self.assertEqual(self.buscar('almudena'), [])
+        self.assertEqual(self.buscar('galdos'), [self.libro.pk])
+
+        self.libro.authors.clear()
+        self.assertEqual(self.buscar('galdos'), [])
+
+    def test_reconstruir_indice(self):
+        Book.objects.bulk_create([
+            Book(publisher=self.editorial, title='Sin señales', publication_date=date(2020, 1, 1)),
+        ])
+        self.assertEqual(self.buscar('senales'), [])
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(len(self.buscar('senales')), 1)
+
+
+class LiveSearchTests(CatalogoTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        crear_catalogo(20)
+
+    def test_peticion_ajax_devuelve_solo_el_fragmento(self):
+        response = self.client.get(
+            reverse('book-list'), {'search': 'libro'}, HTTP_X_REQUESTED_WITH='XMLHttpRequest',
+        )
+        contenido = response.content.decode()
+        self.assertNotIn('<html', contenido)
+        self.assertIn('lista-items', contenido)
+        self.assertTemplateNotUsed(response, 'base.html')
+        self.assertIn('X-Requested-With', response['Vary'])
+
+    def test_peticion_ajax_en_json(self):
+        response = self.client.get(
+            reverse('book-list'), {'search': 'libro 0001'},
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest', HTTP_ACCEPT='application/json',
+        )
+        datos = response.json()
+        self.assertEqual({r['title'] for r in datos['results']}, {'Libro 0001-0', 'Libro 0001-1'})
+        self.assertEqual(datos['results'][0]['publisher'], 'Editorial 0001')
+        self.assertIsNone(datos['next'])
+
+
+class BusquedaSinLimiteTests(CatalogoTestCase):
+
+    def test_todas_las_coincidencias_por_paginas(self):
+        crear_catalogo(300)
+        primera = self.client.get(reverse('book-list'), {'search': 'libro'}).context['pagina']
+        self.assertEqual(primera.num_paginas, 600 // TAMANO_PAGINA)
+        vistos = []
+        for numero in range(1, primera.num_paginas + 1):
+            pagina = self.client.get(reverse('book-list'), {'search': 'libro', 'page': numero}).context['pagina']
+            vistos += [libro.pk for libro in pagina]
+        self.assertEqual(len(vistos), 600)
+        self.assertEqual(set(vistos), set(Book.objects.values_list('pk', flat=True)))
+
+    def test_filtro_sin_limite(self):
+        crear_catalogo(300)
+        busqueda = search.buscar_libros('libro')
+        self.assertEqual(Book.objects.filter(busqueda.filtro()).count(), 600)
+
+
+class CatalogCacheTests(TestCase):
+
+    def setUp(self):
+        caches['default'].clear()
+        self.editorial = Publisher.objects.create(name='Anagrama')
+        self.otra = Publisher.objects.create(name='Penguin')
+        self.autor = Author.objects.create(name='Isaac Asimov')
+        self.libro = Book.objects.create(
+            publisher=self.editorial, title='Fundación', publication_date=date(1951, 1, 1),
+        )
+        self.libro.authors.add(self.autor)
+
+    def get(self, nombre, *args, **params):
+        response = self.client.get(reverse(nombre, args=args), params)
+        return response['X-Catalog-Cache']
+
+    def test_acierto_tras_primera_peticion(self):
+        self.assertEqual(self.get('book-detail', self.libro.pk), 'MISS')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get('book-detail', self.libro.pk), 'HIT')
+
+    def test_clave_por_idioma_y_parametros_normalizados(self):
+        self.assertEqual(self.get('book-list', min_stock=0, search=''), 'MISS')
+        self.assertEqual(self.client.get('/es/books/?search=&min_stock=0')['X-Catalog-Cache'], 'HIT')
+        self.assertEqual(self.client.get('/en/books/?min_stock=0')['X-Catalog-Cache'], 'MISS')
+
+    def test_invalida_solo_las_claves_afectadas(self):
+        for nombre, args in [('book-detail', [self.libro.pk]), ('publisher-detail', [self.otra.pk]),
+                             ('author-list', []), ('publisher-list', [])]:
+            self.get(nombre, *args)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.libro.title = 'Fundación e Imperio'
+            self.libro.save()
+
+        self.assertEqual(self.get('book-detail', self.libro.pk), 'MISS')
+        self.assertEqual(self.get('publisher-detail', self.otra.pk), 'HIT')
+        self.assertEqual(self.get('author-list'), 'HIT')
+        self.assertEqual(self.get('publisher-list'), 'HIT')
+
+    def test_cambios_de_editorial_autor_y_m2m(self):
+        self.get('book-detail', self.libro.pk)
+        self.get('author-detail', self.autor.pk)
+        self.get('publisher-detail', self.otra.pk)
+
+        # Mover el libro invalida el detalle de la editorial nueva.
+        with self.captureOnCommitCallbacks(execute=True):
+            self.libro.publisher = self.otra
+            self.libro.save()
+        self.assertEqual(self.get('publisher-detail', self.otra.pk), 'MISS')
+
+        self.get('book-detail', self.libro.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.autor.name = 'I. Asimov'
+            self.autor.save()
+        self.assertEqual(self.get('book-detail', self.libro.pk), 'MISS')
+
+        self.get('author-detail', self.autor.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.libro.authors.remove(self.autor)
+        self.assertEqual(self.get('author-detail', self.autor.pk), 'MISS')
+        self.assertNotContains(self.client.get(reverse('author-detail', args=[self.autor.pk])), 'Fundación')
+
+    def test_invalida_tras_el_commit(self):
+        self.get('book-detail', self.libro.pk)
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.libro.title = 'Fundación e Imperio'
+            self.libro.save()
+            # Sin confirmar, la versión no cambia: nadie guarda las filas
+            # antiguas con ella.
+            self.assertEqual(self.get('book-detail', self.libro.pk), 'HIT')
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.get('book-detail', self.libro.pk), 'MISS')
+
+    def test_estadisticas(self):
+        cache.reiniciar_estadisticas()
+        self.get('index')
+        self.get('index')
+        self.assertEqual(cache.estadisticas(), {'hits': 1, 'misses': 1})
+
+    def test_cache_en_ficheros(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            ajustes = {'default': {
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': directorio,
+            }}
+            with override_settings(CACHES=ajustes):
+                self.assertEqual(self.get('index'), 'MISS')
+                self.assertEqual(self.get('index'), 'HIT')
+                with self.captureOnCommitCallbacks(execute=True):
+                    Publisher.objects.create(name='Nueva')
+                self.assertEqual(self.get('index'), 'MISS')
+
+
+def imagen_png(ancho=800, alto=1200):
+    buffer = BytesIO()
+    Image.new('RGB', (ancho, alto), (200, 80, 40)).save(buffer, 'PNG')
+    return SimpleUploadedFile('portada.png', buffer.getvalue(), content_type='image/png')
+
+
+class ImageVariantTests(CatalogoTestCase):
+
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        ajustes = override_settings(MEDIA_ROOT=self.media.name)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.editorial = Publisher.objects.create(name='Anagrama')
+
+    def test_variantes_al_subir_y_srcset(self):
+        libro = Book.objects.create(
+            publisher=self.editorial, title='Con portada', publication_date=date(2020, 1, 1),
+            cover_image=imagen_png(),
+        )
+        for ancho in images.ANCHOS:
+            for extension in images.FORMATOS:
+                self.assertTrue(default_storage.exists(
+                    images.ruta_variante(libro.cover_image.name, ancho, extension)
+                ))
+
+        libro.refresh_from_db()
+        self.assertEqual(libro.cover_image_variants['origen'], libro.cover_image.name)
+
+        # Las variantes salen del modelo, sin consultar el almacenamiento.
+        with mock.patch.object(FileSystemStorage, 'exists', side_effect=AssertionError) as exists:
+            response = self.client.get(reverse('book-list'))
+        exists.assert_not_called()
+        self.assertContains(response, 'type="image/webp"')
+        self.assertContains(response, 'loading="lazy"')
+        self.assertContains(response, '_320.jpg 320w')
+
+    def test_no_se_reprocesa_la_misma_imagen(self):
+        libro = Book.objects.create(
+            publisher=self.editorial, title='Pequeña', publication_date=date(2020, 1, 1),
+            cover_image=imagen_png(100, 150),
+        )
+        # Más estrecha que todos los anchos: queda registrada sin variantes.
+        self.assertEqual(libro.cover_image_variants, {'origen': libro.cover_image.name, 'anchos': {}})
+        with mock.patch('appBookStore.images.Image.open') as abrir:
+            libro.title = 'Pequeña (revisada)'
+            libro.save()
+        abrir.assert_not_called()
+
+    def test_sin_variantes_se_usa_el_original(self):
+        libro = Book(publisher=self.editorial, title='Antiguo', publication_date=date(2020, 1, 1))
+        libro.cover_image.save('antigua.png', imagen_png(100, 150), save=False)
+        Book.objects.bulk_create([libro])  # sin señales, como los datos previos
+
+        response = self.client.get(reverse('book-list'))
+        self.assertContains(response, f'src="{libro.cover_image.url}"')
+        self.assertNotContains(response, 'srcset')
+
+    def test_comando_de_relleno_en_paralelo(self):
+        libro = Book(publisher=self.editorial, title='Antiguo', publication_date=date(2020, 1, 1))
+        libro.cover_image.save('antigua.png', imagen_png(), save=False)
+        Book.objects.bulk_create([libro])
+
+        call_command('generate_image_variants', workers=2, stdout=StringIO())
+
+        self.assertTrue(default_storage.exists(images.ruta_variante(libro.cover_image.name, 160, 'webp')))
+        self.assertContains(self.client.get(reverse('book-list')), '_160.webp 160w')
+        salida = StringIO()
+        call_command('generate_image_variants', workers=2, stdout=salida)
+        self.assertIn('0 imágenes a procesar', salida.getvalue())
+
+
+class ImportCatalogTests(CatalogoTestCase):
+
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directorio.cleanup)
+        Publisher.objects.create(name='Anagrama')
+
+    def escribir(self, nombre, contenido):
+        ruta = Path(self.directorio.name) / nombre
+        ruta.write_text(contenido, encoding='utf-8')
+        return str(ruta)
+
+    def test_csv_deduplica_y_enlaza_autores(self):
+        ruta = self.escribir('catalogo.csv', (
+            'title,isbn,publication_date,stock,summary,publisher,authors\n'
+            'Uno,111,2001-01-01,3,,Anagrama,Ana;Luis\n'
+            'Dos,222,2002-01-01,0,,Nueva,Luis\n'
+            'Tres,333,2003-01-01,1,Resumen,Nueva,\n'
+        ))
+        call_command('import_catalog', ruta, batch_size=2, stdout=StringIO())
+
+        self.assertEqual(Publisher.objects.count(), 2)
+        self.assertEqual(sorted(Author.objects.values_list('name', flat=True)), ['Ana', 'Luis'])
+        uno = Book.objects.get(title='Uno')
+        self.assertEqual(sorted(a.name for a in uno.authors.all()), ['Ana', 'Luis'])
+        self.assertEqual(Book.objects.get(title='Dos').publisher.name, 'Nueva')
+        self.assertEqual(self.client.get(reverse('book-list'), {'search': 'luis'}).context['pagina'].num_paginas, 1)
+
+    def test_consultas_por_lote_no_por_fila(self):
+        filas = '\n'.join(
+            json.dumps({'title': f'Libro {i}', 'publication_date': '2020-01-01',
+                        'publisher': f'Editorial {i % 3}', 'authors': [f'Autor {i % 7}']})
+            for i in range(500)
+        )
+        ruta = self.escribir('catalogo.jsonl', filas)
+        with CaptureQueriesContext(connection) as consultas:
+            call_command('import_catalog', ruta, batch_size=1000, no_index=True, stdout=StringIO())
+        self.assertEqual(Book.authors.through.objects.count(), 500)
+        # Unos pocos INSERT multi-fila por tabla, nunca uno por libro.
+        self.assertLess(len(consultas), 20)
+
+    def test_descarta_isbn_repetidos(self):
+        Book.objects.create(publisher=Publisher.objects.get(), title='Existente',
+                            publication_date=date(2000, 1, 1), isbn='84-376-0494-X')
+        ruta = self.escribir('catalogo.csv', (
+            'title,isbn,publication_date,stock,summary,publisher,authors\n'
+            'Repetido,843760494X,2001-01-01,1,,Anagrama,\n'
+            'Nuevo,978-0-00-000000-2,2001-01-01,1,,Anagrama,\n'
+            'Nuevo bis,9780000000002,2001-01-01,1,,Anagrama,\n'
+        ))
+        call_command('import_catalog', ruta, stdout=StringIO())
+        self.assertEqual(sorted(Book.objects.values_list('title', 'isbn_normalizado')),
+                         [('Existente', '843760494X'), ('Nuevo', '9780000000002')])
+
+    def test_reanuda_tras_un_fallo(self):
+        contenido = (
+            'title,isbn,publication_date,stock,summary,publisher,authors\n'
+            'Uno,,2001-01-01,1,,Anagrama,Ana\n'
+            'Dos,,2002-01-01,1,,Anagrama,Ana\n'
+            'Tres,,FECHA-MALA,1,,Anagrama,Ana\n'
+        )
+        ruta = self.escribir('catalogo.csv', contenido)
+        with self.assertRaisesMessage(CommandError, "Línea 4: fecha de publicación no válida: 'FECHA-MALA'"):
+            call_command('import_catalog', ruta, batch_size=2, stdout=StringIO())
+        self.assertEqual(Book.objects.count(), 2)
+
+        self.escribir('catalogo.csv', contenido.replace('FECHA-MALA', '2003-01-01'))
+        call_command('import_catalog', ruta, batch_size=2, resume=True, stdout=StringIO())
+        self.assertEqual(sorted(Book.objects.values_list('title', flat=True)), ['Dos', 'Tres', 'Uno'])
+        self.assertFalse(Path(ruta + '.progress').exists())
+
+
+    def test_filas_mal_formadas_indican_la_linea(self):
+        casos = {
+            'catalogo.csv': (
+                'title,isbn,publication_date,stock,summary,publisher,authors\n'
+                'Uno,,2001-01-01,1,,Anagrama,Ana\n'
+                'Sin editorial,,2002-01-01,1,,,Ana\n',
+                'Línea 3: falta la editorial',
+            ),
+            'stock.csv': (
+                'title,isbn,publication_date,stock,summary,publisher,authors\n'
+                'Uno,,2001-01-01,muchos,,Anagrama,Ana\n',
+                "Línea 2: stock no válido: 'muchos'",
+            ),
+            'catalogo.jsonl': (
+                '{"title": "Uno", "publication_date": "2001-01-01", "publisher": "Anagrama"}\n'
+                '\n'
+                '{"title": "Dos", "publication_date": "2001-01-01",\n',
+                'Línea 3: JSON no válido',
+            ),
+        }
+        for nombre, (contenido, mensaje) in casos.items():
+            with self.subTest(nombre):
+                ruta = self.escribir(nombre, contenido)
+                with self.assertRaisesMessage(CommandError, mensaje):
+                    call_command('import_catalog', ruta, stdout=StringIO())
+                self.assertFalse(Book.objects.exists())
+
+
+class CatalogExportTests(CatalogoTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        crear_catalogo(30)
+        autor = Author.objects.create(name='Ana, "la autora"')
+        Book.objects.get(title='Libro 0000-0').authors.add(autor, Author.objects.create(name='Luis'))
+
+    def test_csv_en_streaming(self):
+        response = self.client.get(reverse('catalog-export'))
+        self.assertTrue(response.streaming)
+        filas = list(csv.reader(b''.join(response.streaming_content).decode().splitlines()))
+        self.assertEqual(filas[0][:2], ['id', 'title'])
+        self.assertEqual(len(filas), 61)
+        primera = next(f for f in filas if f[1] == 'Libro 0000-0')
+        self.assertEqual(primera[5:], ['Editorial 0000', 'Ana, "la autora";Luis'])
+
+    def test_jsonl_gzip(self):
+        response = self.client.get(reverse('catalog-export'), {'format': 'jsonl', 'gzip': '1'})
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        lineas = gzip.decompress(b''.join(response.streaming_content)).decode().splitlines()
+        libros = [json.loads(linea) for linea in lineas]
+        self.assertEqual(len(libros), 60)
+        self.assertEqual(libros[0]['authors'], ['Ana, "la autora"', 'Luis'])
+
+    def test_consultas_por_bloque(self):
+        # Un cursor para los libros y una precarga de autores por bloque, no por libro.
+        with self.assertNumQueries(1 + 3):
+            filas = list(export.lineas_jsonl(chunk_size=25))
+        self.assertEqual(len(filas), 60)
+
+    def test_comando(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            salida = Path(directorio) / 'catalogo.csv.gz'
+            call_command('export_catalog', gzip=True, output=str(salida), stderr=StringIO())
+            self.assertEqual(len(gzip.decompress(salida.read_bytes()).splitlines()), 61)
+
+
+class QueryPlanTests(CatalogoTestCase):
+    """Comprueba con EXPLAIN QUERY PLAN que ninguna vista recorre una tabla
+    del catálogo entera sin índice."""
+
+    @classmethod
+    def setUpTestData(cls):
+        crear_catalogo(20, libros_por_editorial=5)
+        autor = Author.objects.create(name='Autora')
+        autor.book_set.add(*Book.objects.all()[:10])
+        cls.autor = autor
+        cls.libro = Book.objects.order_by('pk').first()
+        cls.libro.isbn = '978-84-376-0494-7'
+        cls.libro.save()
+
+    def planes(self, url, params=None):
+        with CaptureQueriesContext(connection) as capturadas:
+            self.assertEqual(self.client.get(url, params).status_code, 200)
+        with connection.cursor() as cursor:
+            for consulta in capturadas:
+                if consulta['sql'].startswith('SELECT'):
+                    cursor.execute('EXPLAIN QUERY PLAN ' + consulta['sql'])
+                    yield consulta['sql'], [fila[-1] for fila in cursor.fetchall()]
+
+    def assertSinRecorridosCompletos(self, url, params=None, permitidos=()):
+        for sql, plan in self.planes(url, params):
+            for paso in plan:
+                if paso in permitidos:
+                    continue
+                # "SCAN tabla" a secas es un recorrido completo; "SCAN tabla USING
+                # INDEX" recorre un índice ya ordenado. Los alias U0, U1... son
+                # tablas del catálogo dentro de subconsultas.
+                self.assertIsNone(
+                    re.fullmatch(r'SCAN (appBookStore_\w+|U\d+)', paso),
+                    f'{url}: recorrido completo ({paso}) en\n{sql}',
+                )
+
+    def test_vistas_del_catalogo(self):
+        # La portada muestra todas las editoriales: recorrerlas es inevitable,
+        # pero los libros se resuelven con el índice (publisher, -publication_date).
+        self.assertSinRecorridosCompletos(reverse('index'), permitidos={'SCAN appBookStore_publisher'})
+
+        rutas = [
+            (reverse('book-list'), None),
+            (reverse('book-list'), {'min_stock': 2}),
+            (reverse('book-list'), {'search': '978-84-376-0494-7'}),
+            (reverse('book-list'), {'after': codificar_cursor('Libro 0010-0', 1)}),
+            (reverse('book-detail', args=[self.libro.pk]), None),
+            (reverse('publisher-list'), None),
+            (reverse('publisher-detail', args=[self.libro.publisher_id]), None),
+            (reverse('author-list'), None),
+            (reverse('author-detail', args=[self.autor.pk]), None),
+        ]
+        for url, params in rutas:
+            with self.subTest(url=url, params=params):
+                self.assertSinRecorridosCompletos(url, params)
+
+    def test_busqueda_por_isbn_usa_su_indice(self):
+        planes = dict(self.planes(reverse('book-list'), {'search': '9788437604947'}))
+        isbn = [plan for sql, plan in planes.items() if 'isbn_normalizado' in sql]
+        self.assertTrue(isbn)
+        self.assertIn('INDEX book_isbn_normalizado_idx (isbn_normalizado=?)', isbn[0][0])
+
+    def test_busqueda_de_texto_no_repite_el_match_por_libro(self):
+        planes = dict(self.planes(reverse('book-list'), {'search': 'libro'}))
+        fts = [paso for plan in planes.values() for paso in plan if 'VIRTUAL TABLE' in paso]
+        self.assertTrue(fts)
+        # "INDEX 32:=M..." sería una búsqueda FTS5 por cada rowid del filtro.
+        for paso in fts:
+            self.assertNotIn(':=', paso)
+
+    def test_isbn_repetido_permitido(self):
+        otro = Book.objects.create(publisher=self.libro.publisher, title='Otra edición',
+                                   publication_date=date(2001, 1, 1), isbn='9788437604947')
+        self.assertEqual(otro.isbn_normalizado, self.libro.isbn_normalizado)
+        otro.save()
+        response = self.client.get(reverse('book-list'), {'search': '978-84-376-0494-7'})
+        self.assertEqual({b.pk for b in response.context['libros']}, {self.libro.pk, otro.pk})
+
+    def test_marca_del_get_condicional_con_indice_cubriente(self):
+        planes = dict(self.planes(reverse('publisher-detail', args=[self.libro.publisher_id])))
+        marca = [plan for sql, plan in planes.items() if 'MAX("appBookStore_book"."updated_at")' in sql]
+        self.assertIn('COVERING INDEX book_publisher_updated_idx (publisher_id=?)', ' '.join(marca[0]))
+
+
+class BenchmarkTests(TestCase):
+    def test_siembra_determinista(self):
+        sembrar_catalogo(300, semilla=7)
+        primeros = list(Book.objects.order_by('pk').values_list('title', 'publisher__name')[:20])
+        self.assertEqual(Book.objects.count(), 300)
+        self.assertTrue(all(1 <= n <= 3 for n in Book.objects.annotate(n=Count('authors')).values_list('n', flat=True)))
+
+        vaciar_catalogo()
+        self.assertFalse(Book.objects.exists())
+        sembrar_catalogo(300, semilla=7)
+        self.assertEqual(
+            list(Book.objects.order_by('pk').values_list('title', 'publisher__name')[:20]), primeros
+        )
+
+    def test_comparacion_con_linea_base(self):
+        def fila(p95, consultas):
+            return {'size': 1000, 'route': 'book-list', 'lang': 'es', 'p50_ms': p95, 'p95_ms': p95,
+                    'queries': consultas}
+
+        with tempfile.TemporaryDirectory() as directorio:
+            base = Path(directorio) / 'base.json'
+            base.write_text(json.dumps({'meta': {}, 'results': [fila(20.0, 3)]}))
+            opciones = {'baseline': str(base), 'threshold': 0.25, 'min_delta_ms': 5.0}
+            comando = BenchmarkCommand(stdout=StringIO())
+
+            comando._comparar([fila(24.0, 3)], opciones)
+            for actual in (fila(30.0, 3), fila(20.0, 4)):
+                with self.subTest(actual=actual), self.assertRaises(CommandError):
+                    comando._comparar([actual], opciones)
+
+
+class InstrumentacionTests(CatalogoTestCase):
+    SERVER_TIMING_RE = re.compile(
+        r'db;dur=[\d.]+;desc="(\d+) queries, (\d+) dup", tpl;dur=([\d.]+), total;dur=[\d.]+'
+    )
+
+    def test_cabecera_server_timing(self):
+        crear_catalogo(3)
+        response = self.client.get(reverse('book-list'))
+
+        encontrado = self.SERVER_TIMING_RE.fullmatch(response['Server-Timing'])
+        self.assertIsNotNone(encontrado, response['Server-Timing'])
+        self.assertGreater(int(encontrado[1]), 0)
+        self.assertEqual(encontrado[2], '0')
+        self.assertGreater(float(encontrado[3]), 0)
+
+    def test_detecta_consultas_repetidas(self):
+        metricas = MetricasPeticion()
+        editoriales = crear_catalogo(5)
+        with connection.execute_wrapper(metricas):
+            for editorial in editoriales:
+                list(editorial.book_set.all())
+
+        self.assertEqual(len(metricas.consultas), 5)
+        self.assertEqual(metricas.duplicadas(), 4)
+        [(clave, veces, _)] = metricas.huellas()
+        self.assertEqual(veces, 5)
+        self.assertIn('"publisher_id" = %s', clave)
+
+    def test_huella_agrupa_literales_y_listas(self):
+        self.assertEqual(
+            huella("SELECT * FROM t WHERE id IN (%s, %s, %s) AND name = 'x' LIMIT 25"),
+            huella("SELECT * FROM t WHERE id IN (%s, %s) AND name = 'y' LIMIT 50"),
+        )
+
+    @override_settings(SLOW_REQUEST_MS=0, SLOW_REQUEST_SAMPLE_RATE=1.0)
+    def test_registro_de_peticiones_lentas(self):
+        crear_catalogo(3)
+        with self.assertLogs('appBookStore.rendimiento', 'WARNING') as registro:
+            self.client.get(reverse('publisher-list'))
+
+        self.assertIn('Petición lenta GET', registro.output[0])
+        self.assertTrue(registro.records[0].huellas)
+
+    @override_settings(SLOW_REQUEST_MS=0, SLOW_REQUEST_SAMPLE_RATE=0.0)
+    def test_muestreo_del_registro(self):
+        with self.assertNoLogs('appBookStore.rendimiento', 'WARNING'):
+            self.client.get(reverse('publisher-list'))
+
+
+@override_settings(NEWSLETTER_BATCH_SIZE=3, NEWSLETTER_FLUSH_INTERVAL=None)
+class NewsletterTests(TestCase):
+    def tearDown(self):
+        newsletter.volcar_suscripciones()
+
+    def suscribir(self, email, name='Ana Pérez', url=None):
+        return self.client.post(url or reverse('newsletter'), {'email': email, 'name': name})
+
+    def test_se_guarda_al_completar_el_lote(self):
+        self.suscribir('uno@example.com')
+        self.suscribir('dos@example.com')
+        self.assertFalse(NewsletterSubscription.objects.exists())
+        self.assertEqual(newsletter.pendientes(), 2)
+
+        with self.assertNumQueries(1):
+            response = self.suscribir('tres@example.com')
+
+        self.assertContains(response, 'tres@example.com')
+        self.assertEqual(NewsletterSubscription.objects.count(), 3)
+        self.assertEqual(newsletter.pendientes(), 0)
+
+    def test_duplicados_idempotentes(self):
+        NewsletterSubscription.objects.create(name='Primera', email='ana@example.com')
+        self.suscribir('ANA@example.com ', name='Segunda')
+        self.suscribir('luis@example.com', name='Luis')
+        self.suscribir('Luis@Example.com', name='Otro')
+        self.assertEqual(newsletter.volcar_suscripciones(), 2)
+
+        self.assertEqual(
+            dict(NewsletterSubscription.objects.values_list('email', 'name')),
+            {'ana@example.com': 'Primera', 'luis@example.com': 'Luis'},
+        )
+
+    def test_formulario_invalido_no_encola(self):
+        response = self.suscribir('no-es-un-email', name='<script>')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['form'].errors)
+        self.assertEqual(newsletter.pendientes(), 0)
+
+    def test_ruta_subscribe(self):
+        response = self.suscribir('otra@example.com', url='/newsletter/subscribe/')
+        self.assertContains(response, 'otra@example.com')
+        newsletter.volcar_suscripciones()
+        self.assertTrue(NewsletterSubscription.objects.filter(email='otra@example.com').exists())
+
+
+class BackendQueFalla(locmem.EmailBackend):
+    """Backend en memoria que cuenta las conexiones y falla tras ``limite`` mensajes."""
+
+    def __init__(self, limite=None, **kwargs):
+        super().__init__(**kwargs)
+        self.limite = limite
+        self.aperturas = 0
+
+    def open(self):
+        self.aperturas += 1
+        return True
+
+    def send_messages(self, messages):
+        if self.limite is not None and len(mail.outbox) >= self.limite:
+            raise ConnectionError('SMTP caído')
+        return super().send_messages(messages)
+
+
+class NewsletterMailingTests(TestCase):
+    def setUp(self):
+        NewsletterSubscription.objects.bulk_create([
+            NewsletterSubscription(name=f'Lector {i}', email=f'lector{i}@example.com') for i in range(25)
+        ])
+
+    def destinatarios(self):
+        return [mensaje.to[0] for mensaje in mail.outbox]
+
+    def test_envia_a_todos_por_lotes(self):
+        campana = newsletter.crear_campana('Novedades', 'Hola')
+        conexion = BackendQueFalla()
+
+        # Una consulta por lote, un UPDATE por mensaje y el cierre de la campaña.
+        with self.assertNumQueries(3 + 25 + 1):
+            enviados = newsletter.enviar_campana(campana, tamano_lote=10, conexion=conexion)
+
+        self.assertEqual(enviados, 25)
+        self.assertEqual(conexion.aperturas, 3)
+        self.assertEqual(sorted(self.destinatarios()),
+                         sorted(NewsletterSubscription.objects.values_list('email', flat=True)))
+        campana.refresh_from_db()
+        self.assertEqual(campana.sent_count, 25)
+        self.assertIsNotNone(campana.finished_at)
+
+    def test_reanuda_sin_repetir(self):
+        campana = newsletter.crear_campana('Novedades', 'Hola')
+        with self.assertRaises(ConnectionError):
+            newsletter.enviar_campana(campana, tamano_lote=10, conexion=BackendQueFalla(limite=13))
+
+        campana = NewsletterCampaign.objects.get(pk=campana.pk)
+        self.assertEqual(campana.sent_count, 13)
+        self.assertIsNone(campana.finished_at)
+
+        # Los suscritos después de crear la campaña no la reciben.
+        NewsletterSubscription.objects.create(name='Tarde', email='tarde@example.com')
+        newsletter.enviar_campana(campana, tamano_lote=10, conexion=BackendQueFalla())
+
+        destinatarios = self.destinatarios()
+        self.assertEqual(len(destinatarios), 25)
+        self.assertEqual(len(set(destinatarios)), 25)
+        self.assertNotIn('tarde@example.com', destinatarios)
+
+    def test_progreso_anotado_tras_cada_mensaje(self):
+        campana = newsletter.crear_campana('Novedades', 'Hola')
+        anotados = []
+
+        class BackendQueMira(BackendQueFalla):
+            def send_messages(self, messages):
+                # Lo que encontraría --resume si se matara el proceso ahora.
+                anotados.append(NewsletterCampaign.objects.get(pk=campana.pk).last_sent_id)
+                return super().send_messages(messages)
+
+        newsletter.enviar_campana(campana, tamano_lote=10, conexion=BackendQueMira())
+
+        ids = list(NewsletterSubscription.objects.order_by('pk').values_list('pk', flat=True))
+        self.assertEqual(anotados, [0] + ids[:-1])
+
+    def test_limite_de_mensajes_por_segundo(self):
+        campana = newsletter.crear_campana('Novedades', 'Hola')
+        reloj = [0.0]
+
+        def dormir(segundos):
+            reloj[0] += segundos
+
+        with mock.patch('appBookStore.newsletter.time.monotonic', lambda: reloj[0]), \
+                mock.patch('appBookStore.newsletter.time.sleep', dormir):
+            newsletter.enviar_campana(campana, conexion=BackendQueFalla(), por_segundo=10)
+
+        # 25 mensajes a 10/s: el último sale 2,4s después del primero.
+        self.assertAlmostEqual(reloj[0], 2.4)
+
+    def test_comando(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as cuerpo:
+            cuerpo.write('Nuevos libros este mes')
+        self.addCleanup(Path(cuerpo.name).unlink)
+
+        salida = StringIO()
+        call_command('send_newsletter', subject='Novedades', body_file=cuerpo.name,
+                     batch_size=10, stdout=salida)
+
+        self.assertIn('25 mensajes enviados', salida.getvalue())
+        self.assertEqual(len(mail.outbox), 25)
+        self.assertEqual(mail.outbox[0].body, 'Nuevos libros este mes')
+
+
+class AsyncViewsTests(CatalogoTestCase):
+    def setUp(self):
+        editoriales = crear_catalogo(4, libros_por_editorial=3)
+        self.libro = Book.objects.filter(publisher=editoriales[0]).first()
+        self.autor = Author.objects.create(name='Autora')
+        self.libro.authors.add(self.autor)
+        self.factory = RequestFactory()
+        self.async_factory = AsyncRequestFactory()
+
+    async def test_mismo_contenido_que_las_vistas_sincronas(self):
+        rutas = [
+            ('index', {}, {}),
+            ('book_list', {}, {}),
+            ('book_list', {}, {'search': 'Libro 0001'}),
+            ('book_detail', {'book_id': self.libro.pk}, {}),
+            ('publisher_list', {}, {}),
+            ('publisher_detail', {'publisher_id': self.libro.publisher_id}, {}),
+            ('author_list', {}, {}),
+            ('author_detail', {'author_id': self.autor.pk}, {}),
+        ]
+        for nombre, kwargs, params in rutas:
+            with self.subTest(vista=nombre, params=params):
+                esperado = await sync_to_async(getattr(views, nombre))(self.factory.get('/', params), **kwargs)
+                response = await getattr(async_views, nombre)(self.async_factory.get('/', params), **kwargs)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.content, esperado.content)
+
+    async def test_busqueda_en_vivo(self):
+        request = self.async_factory.get('/', {'search': 'Libro'}, headers={
+            'X-Requested-With': 'XMLHttpRequest', 'Accept': 'application/json',
+        })
+        response = await async_views.book_list(request)
+        self.assertEqual(len(json.loads(response.content)['results']), 12)
+
+    async def test_no_encontrado(self):
+        with self.assertRaises(Http404):
+            await async_views.book_detail(self.async_factory.get('/'), book_id=0)
+
+
+class PerfilProduccionTests(SimpleTestCase):
+    # Las conexiones de las pruebas son ficheros temporales propios; los alias
+    # se declaran solo porque coinciden con los de la configuración activa.
+    databases = '__all__'
+
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.primaria = Path(directorio.name) / 'primaria.sqlite3'
+        self.replica = Path(directorio.name) / 'replica.sqlite3'
+        self.conexiones = ConnectionHandler(sqlite_produccion(self.primaria, replica=self.replica))
+        self.addCleanup(self.conexiones.close_all)
+
+    def pragma(self, alias, nombre):
+        with self.conexiones[alias].cursor() as cursor:
+            cursor.execute(f'PRAGMA {nombre}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_y_replica_de_solo_lectura(self):
+        primaria = self.conexiones['default']
+        with primaria.cursor() as cursor:
+            cursor.execute('CREATE TABLE libro (id INTEGER PRIMARY KEY, titulo TEXT)')
+            cursor.execute("INSERT INTO libro (titulo) VALUES ('Rayuela')")
+        self.assertEqual(self.pragma('default', 'journal_mode'), 'wal')
+        self.assertEqual(self.pragma('default', 'synchronous'), 1)  # NORMAL
+        self.assertEqual(self.pragma('default', 'mmap_size'), 268435456)
+        self.assertEqual(primaria.settings_dict['CONN_MAX_AGE'], 600)
+
+        # Un segundo fichero hace de réplica: se copia la primaria tras volcar el WAL.
+        primaria.close()
+        shutil.copyfile(self.primaria, self.replica)
+
+        with self.conexiones['replica'].cursor() as cursor:
+            cursor.execute('SELECT titulo FROM libro')
+            self.assertEqual(cursor.fetchall(), [('Rayuela',)])
+            with self.assertRaises(OperationalError):
+                cursor.execute("INSERT INTO libro (titulo) VALUES ('Ficciones')")
+
+    def test_router(self):
+        router = CatalogoRouter()
+        for modelo in (Book, Author, Publisher, Book.authors.through):
+            with self.subTest(modelo=modelo):
+                self.assertEqual(router.db_for_read(modelo), 'replica')
+                self.assertEqual(router.db_for_write(modelo), 'default')
+        self.assertEqual(router.db_for_read(NewsletterSubscription), 'default')
+        self.assertFalse(router.allow_migrate('replica', 'appBookStore'))
+        self.assertTrue(router.allow_migrate('default', 'appBookStore'))
+
+        # Dentro de una transacción se lee lo recién escrito, de la primaria.
+        with mock.patch.object(connections['default'], 'in_atomic_block', True):
+            self.assertEqual(router.db_for_read(Book), 'default')
+
+    def test_lecturas_de_la_replica_en_otro_fichero(self):
+        # Las conexiones del perfil sustituyen a las de las pruebas, con el router
+        # activo (la configuración de las pruebas puede no tener réplica).
+        for alias in ('default', 'replica'):
+            if alias in connections.settings:
+                self.addCleanup(connections.__setitem__, alias, connections[alias])
+            else:
+                self.addCleanup(connections.__delitem__, alias)
+            connections[alias] = self.conexiones[alias]
+        self.enterContext(mock.patch.object(db_router, 'routers', [CatalogoRouter()]))
+
+        with connection.schema_editor() as editor:
+            editor.create_model(Publisher)
+        Publisher.objects.create(name='Anagrama')
+        connection.close()
+        shutil.copyfile(self.primaria, self.replica)
+        # Escrita después de copiar: solo está en la primaria.
+        Publisher.objects.create(name='Planeta')
+
+        with CaptureQueriesContext(self.conexiones['replica']) as lecturas:
+            self.assertEqual(list(Publisher.objects.values_list('name', flat=True)), ['Anagrama'])
+        self.assertEqual(len(lecturas), 1)
+        self.assertEqual(sorted(Publisher.objects.using('default').values_list('name', flat=True)),
+                         ['Anagrama', 'Planeta'])
+        with transaction.atomic():
+            self.assertEqual(Publisher.objects.count(), 2)
+
+
+class FacetasTests(CatalogoTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.planeta = Publisher.objects.create(name='Planeta')
+        cls.anagrama = Publisher.objects.create(name='Anagrama')
+        libros = [
+            (cls.planeta, 'Cien años de soledad', date(1967, 5, 30), 0),
+            (cls.planeta, 'El amor en los tiempos del cólera', date(1985, 1, 1), 3),
+            (cls.planeta, 'La sombra del viento', date(2001, 4, 1), 30),
+            (cls.anagrama, 'Los detectives salvajes', date(1998, 1, 1), 3),
+            (cls.anagrama, '2666', date(2004, 1, 1), 10),
+        ]
+        Book.objects.bulk_create([
+            Book(publisher=p, title=t, publication_date=f, stock=s, isbn=f'978{i:010d}')
+            for i, (p, t, f, s) in enumerate(libros)
+        ])
+        reconstruir_indice()
+
+    def facetas(self, **params):
+        response = self.client.get(reverse('book-list'), params)
+        return response, {
+            faceta.nombre: {o.valor: (o.n, o.activa) for o in faceta.opciones}
+            for faceta in response.context['facetas']
+        }
+
+    def test_recuentos_del_catalogo(self):
+        response, facetas = self.facetas()
+        self.assertEqual(facetas['publisher'], {
+            str(self.planeta.pk): (3, False), str(self.anagrama.pk): (2, False),
+        })
+        self.assertEqual(facetas['stock'], {'0': (1, False), '1-5': (2, False), '6-20': (1, False), '21+': (1, False)})
+        self.assertEqual(facetas['decade'], {'2000': (2, False), '1990': (1, False), '1980': (1, False),
+                                             '1960': (1, False)})
+        self.assertEqual(response.context['pagina'].num_paginas, 1)
+
+    def test_varias_facetas_a_la_vez(self):
+        response, facetas = self.facetas(publisher=[self.planeta.pk, self.anagrama.pk], stock=['1-5', '6-20'])
+        self.assertEqual(
+            sorted(l.title for l in response.context['libros']),
+            ['2666', 'El amor en los tiempos del cólera', 'Los detectives salvajes'],
+        )
+        # Los recuentos de una faceta no dependen de su propia selección.
+        self.assertEqual(facetas['stock']['0'], (1, False))
+        self.assertEqual(facetas['stock']['1-5'], (2, True))
+        self.assertEqual(facetas['publisher'][str(self.planeta.pk)], (1, True))
+        self.assertEqual(facetas['decade'], {'2000': (1, False), '1990': (1, False), '1980': (1, False)})
+
+        _, facetas = self.facetas(stock='1-5', decade=1990)
+        self.assertEqual(facetas['publisher'], {str(self.anagrama.pk): (1, False)})
+
+    def test_reflejan_la_busqueda(self):
+        response, facetas = self.facetas(search='soledad')
+        self.assertEqual(facetas['publisher'], {str(self.planeta.pk): (1, False)})
+        self.assertEqual(facetas['decade'], {'1960': (1, False)})
+
+    def test_enlaces_alternan_la_seleccion(self):
+        response = self.client.get(reverse('book-list'), {'decade': 1990})
+        opcion = next(o for f in response.context['facetas'] if f.nombre == 'decade'
+                      for o in f.opciones if o.valor == '1990')
+        self.assertTrue(opcion.activa)
+        self.assertNotIn('decade', opcion.enlace)
+        self.assertContains(response, 'name="decade" value="1990"')
+
+    def test_valores_no_validos(self):
+        response = self.client.get(reverse('book-list'), {'publisher': 'x', 'stock': 'muchos'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['libros']), 5)
+
+    def test_decadas_fuera_de_rango(self):
+        for decada in ('99999', '-5', '0', '9995', '1995'):
+            with self.subTest(decada=decada):
+                response = self.client.get(reverse('book-list'), {'decade': decada})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.context['libros']), 5)
+        self.assertTrue(BookSearchForm({'decade': '9990'}).is_valid())
+
+    @override_settings(CATALOGO_CACHE_ENABLED=True)
+    def test_facetas_del_catalogo_en_cache(self):
+        caches['default'].clear()
+        self.client.get(reverse('book-list'), {'page': 1})
+        # Otra página (otra respuesta) reutiliza las facetas: solo se consulta la página.
+        with self.assertNumQueries(1):
+            self.client.get(reverse('book-list'), {'stock': '0'})
+
+        Book.objects.filter(title='2666').first().save()
+        response, facetas = self.facetas(page=2)
+        self.assertEqual(sum(n for n, _ in facetas['publisher'].values()), 5)
+
+    def test_json_incluye_facetas(self):
+        response = self.client.get(reverse('book-list'), {'search': 'salvajes'},
+                                   headers={'X-Requested-With': 'XMLHttpRequest', 'Accept': 'application/json'})
+        datos = response.json()
+        self.assertEqual(datos['facets']['publisher'][0]['count'], 1)
+
+
+class DirectoriosTests(CatalogoTestCase):
+
+    def test_secciones_por_inicial_con_recuentos(self):
+        editorial = Publisher.objects.create(name='Anagrama')
+        nombres = ['Borges', 'bolaño', 'Benedetti', 'Cortázar', 'Álvarez', '1984 Colectivo']
+        autores = {n: Author.objects.create(name=n) for n in nombres}
+        for i, fecha in enumerate([date(1990, 1, 1), date(2010, 5, 1)]):
+            libro = Book.objects.create(publisher=editorial, title=f'Libro {i}', publication_date=fecha)
+            libro.authors.add(autores['Borges'])
+
+        response = self.client.get(reverse('author-list'), {'letter': 'b'})
+        pagina = response.context['autores']
+        self.assertEqual([a.name for a in pagina], ['Benedetti', 'bolaño', 'Borges'])
+        borges = pagina[2]
+        self.assertEqual((borges.n_libros, borges.ultima_publicacion), (2, date(2010, 5, 1)))
+        self.assertEqual((pagina[0].n_libros, pagina[0].ultima_publicacion), (0, None))
+
+        for seccion, esperado in [('0-9', ['1984 Colectivo']), ('#', ['Álvarez']), ('C', ['Cortázar'])]:
+            with self.subTest(seccion=seccion):
+                response = self.client.get(reverse('author-list'), {'letter': seccion})
+                self.assertEqual([a.name for a in response.context['autores']], esperado)
+
+        # Sin letra (o con una no válida) se muestra la A.
+        self.assertEqual(self.client.get(reverse('author-list'), {'letter': 'ñ'}).context['seccion'], 'A')
+
+    def test_numero_de_consultas_constante(self):
+        crear_catalogo(300)  # 'Editorial 0000' ... 'Editorial 0299'
+        autores = Author.objects.bulk_create([Author(name=f'Autor {i:04d}') for i in range(300)])
+        Book.authors.through.objects.bulk_create([
+            Book.authors.through(book=libro, author=autores[i % 300])
+            for i, libro in enumerate(Book.objects.all())
+        ])
+
+        for nombre, contexto, letra in [('publisher-list', 'editoriales', 'E'), ('author-list', 'autores', 'a')]:
+            with self.subTest(vista=nombre):
+                with self.assertNumQueries(2):
+                    response = self.client.get(reverse(nombre), {'letter': letra, 'page': 3})
+                pagina = response.context[contexto]
+                self.assertEqual(len(pagina), 50)
+                self.assertEqual(pagina.paginator.num_pages, 6)
+                self.assertEqual(pagina[0].n_libros, 2)
+
+    def test_detalles_paginados(self):
+        editorial = crear_catalogo(1, libros_por_editorial=60)[0]
+        autor = Author.objects.create(name='Autora')
+        autor.book_set.add(*Book.objects.all())
+
+        for url in [reverse('publisher-detail', args=[editorial.pk]), reverse('author-detail', args=[autor.pk])]:
+            with self.subTest(url=url):
+                # La marca del GET condicional, la entidad, el recuento y la página.
+                with self.assertNumQueries(4):
+                    response = self.client.get(url)
+                libros = response.context['libros']
+                self.assertEqual(len(libros), TAMANO_PAGINA)
+                self.assertEqual(libros.num_paginas, 3)
+
+                ultima = self.client.get(url, {'page': 3}).context['libros']
+                self.assertEqual([l.title for l in ultima][-1], 'Libro 0000-9')
+                self.assertContains(self.client.get(url), 'rel="next"')
+
+    def test_cache_de_los_directorios(self):
+        with self.settings(CATALOGO_CACHE_ENABLED=True):
+            caches['default'].clear()
+            autor = Author.objects.create(name='Asimov')
+            editorial = Publisher.objects.create(name='Acantilado')
+            url = reverse('author-list')
+            self.assertEqual(self.client.get(url)['X-Catalog-Cache'], 'MISS')
+
+            libro = Book.objects.create(publisher=editorial, title='Yo, robot', publication_date=date(1950, 1, 1))
+            self.client.get(url)
+            # Cambiar el título no altera los recuentos del directorio.
+            with self.captureOnCommitCallbacks(execute=True):
+                libro.title = 'Yo, Robot'
+                libro.save()
+            self.assertEqual(self.client.get(url)['X-Catalog-Cache'], 'HIT')
+
+            with self.captureOnCommitCallbacks(execute=True):
+                libro.authors.add(autor)
+            response = self.client.get(url)
+            self.assertEqual(response['X-Catalog-Cache'], 'MISS')
+            self.assertContains(response, '1 libro ')
+
+
+class TypeaheadTests(TestCase):
+
+    def setUp(self):
+        typeahead.reiniciar()
+        self.addCleanup(typeahead.reiniciar)
+        editorial = Publisher.objects.create(name='Alfaguara')
+        self.autor = Author.objects.create(name='Gabriel García Márquez')
+        self.cien = Book.objects.create(publisher=editorial, title='Cien años de soledad',
+                                        publication_date=date(1967, 5, 30))
+        self.perro = Book.objects.create(publisher=editorial, title='Años de perro',
+                                         publication_date=date(1963, 1, 1))
+
+    def sugerencias(self, q, **params):
+        return json.loads(self.client.get(reverse('autocomplete'), {'q': q, **params}).content)
+
+    def test_prefijos_sin_acentos_y_orden(self):
+        datos = self.sugerencias('ANOS')
+        # Primero los títulos que empiezan por el término, luego los que lo contienen.
+        self.assertEqual([s['label'] for s in datos['books']], ['Años de perro', 'Cien años de soledad'])
+        self.assertEqual(datos['books'][0]['url'], reverse('book-detail', args=[self.perro.pk]))
+        self.assertEqual([s['id'] for s in self.sugerencias('garcía marq')['authors']], [self.autor.pk])
+        self.assertEqual(self.sugerencias('alfa')['publishers'][0]['label'], 'Alfaguara')
+        self.assertEqual(self.sugerencias('  '), {'books': [], 'authors': [], 'publishers': []})
+
+    def test_sin_consultas_una_vez_construido(self):
+        self.sugerencias('cien')
+        with self.assertNumQueries(0):
+            self.assertEqual(len(self.sugerencias('c', limit=1)['books']), 1)
+
+    def test_cambios_por_senales(self):
+        self.sugerencias('cien')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cien.title = 'Crónica de una muerte anunciada'
+            self.cien.save()
+            self.perro.delete()
+            Author.objects.create(name='Ángeles Mastretta')
+
+        self.assertEqual(self.sugerencias('anos')['books'], [])
+        self.assertEqual([s['label'] for s in self.sugerencias('cronica')['books']],
+                         ['Crónica de una muerte anunciada'])
+        self.assertEqual([s['label'] for s in self.sugerencias('angeles')['authors']], ['Ángeles Mastretta'])
+
+    def test_rollback_no_cambia_el_indice(self):
+        self.sugerencias('cien')
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    Author.objects.create(name='Fantasma')
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(callbacks, [])
+        self.assertEqual(self.sugerencias('fantasma')['authors'], [])
+
+
+class IndiceTypeaheadTests(SimpleTestCase):
+
+    def test_fundir_conserva_los_cambios_posteriores(self):
+        indice = typeahead.IndiceTypeahead(
+            [(typeahead.LIBRO, i, f'Libro {i}') for i in range(10)], max_cambios=3,
+        )
+        indice.actualizar(typeahead.LIBRO, 1, 'Otro título')
+        indice.eliminar(typeahead.LIBRO, 2)
+        indice.actualizar(typeahead.LIBRO, 20, 'Libro nuevo')
+        indice.fundir()
+        self.assertEqual(indice._cambios, {})
+
+        buscar = lambda q: [s.pk for s in indice.buscar(q, typeahead.LIBRO, 20)]
+        self.assertEqual(buscar('libro'), [0, 3, 4, 5, 6, 7, 8, 9, 20])
+        self.assertEqual(buscar('titulo'), [1])
+        # Tras fundir sigue aceptando cambios sobre la parte compacta.
+        indice.eliminar(typeahead.LIBRO, 20)
+        self.assertEqual(buscar('nuevo'), [])
+
+    def test_claves_acotadas(self):
+        titulo = 'Una palabra ' * 20
+        claves = typeahead.claves(titulo, max_palabras=3, max_longitud=10)
+        self.assertEqual(claves, ['0una palabr', '1palabra un', '1una palabr'])
+
+
+class ReservasTests(TestCase):
+
+    def setUp(self):
+        editorial = Publisher.objects.create(name='Anagrama')
+        self.libro = Book.objects.create(publisher=editorial, title='Rayuela', publication_date=date(1963, 1, 1), stock=5)
+        self.otro = Book.objects.create(publisher=editorial, title='Ficciones', publication_date=date(1944, 1, 1), stock=1)
+
+    def stock(self):
+        return dict(Book.objects.values_list('pk', 'stock'))
+
+    def test_reserva_de_varios_libros_todo_o_nada(self):
+        reservations.reservar({self.libro.pk: 2, self.otro.pk: 1})
+        self.assertEqual(self.stock(), {self.libro.pk: 3, self.otro.pk: 0})
+
+        with self.assertRaises(reservations.StockInsuficiente) as error:
+            reservations.reservar({self.libro.pk: 1, self.otro.pk: 1})
+        self.assertEqual(error.exception.book_id, self.otro.pk)
+        # El libro con stock no queda descontado.
+        self.assertEqual(self.stock(), {self.libro.pk: 3, self.otro.pk: 0})
+        self.assertEqual(Reservation.objects.count(), 1)
+
+    def test_consultas_por_reserva(self):
+        # Un UPDATE condicional por libro, la reserva y sus líneas (más el savepoint).
+        with self.assertNumQueries(6):
+            reservations.reservar({self.libro.pk: 1, self.otro.pk: 1})
+
+    def test_confirmar_liberar_y_caducar(self):
+        confirmada = reservations.reservar({self.libro.pk: 1})
+        reservations.confirmar(confirmada.token)
+        with self.assertRaises(reservations.ReservaNoDisponible):
+            reservations.liberar(confirmada.token)
+
+        liberada = reservations.reservar({self.libro.pk: 2})
+        reservations.liberar(liberada.token)
+        with self.assertRaises(reservations.ReservaNoDisponible):
+            reservations.confirmar(liberada.token)
+        self.assertEqual(self.stock()[self.libro.pk], 4)
+
+        caducada = reservations.reservar({self.libro.pk: 3}, duracion=timedelta(seconds=-1))
+        with self.assertRaises(reservations.ReservaNoDisponible):
+            reservations.confirmar(caducada.token)
+        out = StringIO()
+        call_command('release_reservations', stdout=out)
+        self.assertIn('1 reservas', out.getvalue())
+        self.assertEqual(reservations.liberar_caducadas(), 0)
+        self.assertEqual(self.stock()[self.libro.pk], 4)
+
+    def test_api(self):
+        response = self.client.post(reverse('reservation-create'), {
+            'items': [{'book': self.libro.pk, 'quantity': 2}, {'book': self.otro.pk}],
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        token = response.json()['token']
+        self.assertEqual(self.client.post(reverse('reservation-checkout', args=[token])).json()['status'], 'confirmed')
+        self.assertEqual(self.client.post(reverse('reservation-release', args=[token])).status_code, 409)
+
+        response = self.client.post(reverse('reservation-create'), {'items': [{'book': self.otro.pk}]},
+                                    content_type='application/json')
+        self.assertEqual((response.status_code, response.json()['book']), (409, self.otro.pk))
+        for cuerpo in ['no es json', {'items': [{'book': self.libro.pk, 'quantity': 0}]}, {'items': []}]:
+            with self.subTest(cuerpo=cuerpo):
+                response = self.client.post(reverse('reservation-create'), cuerpo, content_type='application/json')
+                self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get(reverse('reservation-create')).status_code, 405)
+
+    def test_invalida_la_cache_del_libro(self):
+        with self.settings(CATALOGO_CACHE_ENABLED=True):
+            caches['default'].clear()
+            url = reverse('book-detail', args=[self.libro.pk])
+            self.client.get(url)
+            with self.captureOnCommitCallbacks(execute=True):
+                reservations.reservar({self.libro.pk: 1})
+            response = self.client.get(url)
+            self.assertEqual(response['X-Catalog-Cache'], 'MISS')
+            self.assertContains(response, '4')
+
+
+class ReservasConcurrentesTests(TransactionTestCase):
+    """Muchos hilos compran a la vez las últimas unidades: nunca se vende más
+    de lo que hay."""
+
+    def test_sin_sobreventa(self):
+        editorial = Publisher.objects.create(name='Anagrama')
+        libros = [Book.objects.create(publisher=editorial, title=f'Libro {i}', publication_date=date(2000, 1, 1),
+                                      stock=20) for i in range(2)]
+        vendidos, agotados, errores = [], [], []
+
+        def comprar(n):
+            try:
+                # Pedidos de uno o de los dos libros, en orden distinto.
+                lineas = {libros[n % 2].pk: 1} if n % 3 else {libros[1].pk: 1, libros[0].pk: 1}
+                try:
+                    reserva = reservations.reservar(lineas)
+                    reservations.confirmar(reserva.token)
+                    vendidos.append(lineas)
+                except reservations.StockInsuficiente:
+                    agotados.append(lineas)
+            except Exception as error:
+                errores.append(error)
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(8) as pool:
+            list(pool.map(comprar, range(120)))
+
+        self.assertEqual(errores, [])
+        self.assertTrue(agotados)
+        for libro in libros:
+            libro.refresh_from_db()
+            unidades = sum(lineas.get(libro.pk, 0) for lineas in vendidos)
+            self.assertEqual(libro.stock, 20 - unidades)
+            self.assertGreaterEqual(libro.stock, 0)
+        # Todo el stock acaba vendido: ningún pedido falla si quedaba stock para él.
+        self.assertEqual([libro.stock for libro in libros], [0, 0])
+
+
+class PrerenderTests(TestCase):
+
+    def setUp(self):
+        caches['default'].clear()
+        self.raiz = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.raiz)
+        self.editorial = Publisher.objects.create(name='Anagrama')
+        self.autor = Author.objects.create(name='Isaac Asimov')
+        self.libro = Book.objects.create(
+            publisher=self.editorial, title='Fundación', publication_date=date(1951, 1, 1),
+        )
+        self.libro.authors.add(self.autor)
+        self.otro = Book.objects.create(
+            publisher=self.editorial, title='Yo, robot', publication_date=date(1950, 1, 1),
+        )
+
+    def test_genera_todas_las_paginas_por_idioma(self):
+        resultado = prerender.prerenderizar(self.raiz)
+
+        for idioma in ('es', 'en'):
+            for ruta in ('', 'books', f'books/{self.libro.pk}', 'publishers', f'publishers/{self.editorial.pk}',
+                         'authors', f'authors/{self.autor.pk}'):
+                self.assertTrue((self.raiz / idioma / ruta / 'index.html').exists(), f'{idioma}/{ruta}')
+        self.assertTrue((self.raiz / 'es' / 'authors' / 'index.letter=I.html').exists())
+        self.assertTrue((self.raiz / 'en' / 'publishers' / 'index.letter=%23.html').exists())
+        self.assertIn('/en/books/', resultado.renderizadas)
+        self.assertIn('Fundación', (self.raiz / 'es' / 'books' / str(self.libro.pk) / 'index.html').read_text())
+        self.assertEqual(prerender.verificar(self.raiz), [])
+
+    def test_solo_regenera_las_paginas_afectadas(self):
+        prerender.prerenderizar(self.raiz)
+        self.assertEqual(prerender.prerenderizar(self.raiz).renderizadas, [])
+
+        self.libro.title = 'Fundación e Imperio'
+        self.libro.save()
+        renderizadas = set(prerender.prerenderizar(self.raiz).renderizadas)
+
+        self.assertIn(f'/es/books/{self.libro.pk}/', renderizadas)
+        self.assertIn(f'/en/authors/{self.autor.pk}/', renderizadas)
+        self.assertIn('/es/books/', renderizadas)
+        self.assertNotIn(f'/es/books/{self.otro.pk}/', renderizadas)
+        self.assertNotIn('/es/authors/', renderizadas)
+        self.assertIn('Fundación e Imperio',
+                      (self.raiz / 'es' / 'books' / str(self.libro.pk) / 'index.html').read_text())
+        self.assertEqual(prerender.verificar(self.raiz), [])
+
+    def test_versiones_de_la_base_de_datos_y_no_de_la_cache(self):
+        prerender.prerenderizar(self.raiz)
+        # Otro proceso, con su propia caché en memoria: nada ha cambiado.
+        caches['default'].clear()
+        self.assertEqual(prerender.prerenderizar(self.raiz).renderizadas, [])
+
+        # Un UPDATE directo sin señales (stock de una reserva) también cuenta.
+        Book.objects.filter(pk=self.otro.pk).update(stock=3, updated_at=timezone.now())
+        renderizadas = set(prerender.prerenderizar(self.raiz).renderizadas)
+        self.assertIn(f'/es/books/{self.otro.pk}/', renderizadas)
+        self.assertIn(f'/es/publishers/{self.editorial.pk}/', renderizadas)
+        self.assertNotIn(f'/es/books/{self.libro.pk}/', renderizadas)
+        self.assertNotIn('/es/publishers/', renderizadas)
+
+        self.autor.name = 'Isaac Asimov (1920-1992)'
+        self.autor.save()
+        renderizadas = set(prerender.prerenderizar(self.raiz).renderizadas)
+        self.assertIn('/es/authors/', renderizadas)
+        self.assertIn(f'/es/books/{self.libro.pk}/', renderizadas)
+        self.assertNotIn(f'/es/books/{self.otro.pk}/', renderizadas)
+        self.assertEqual(prerender.verificar(self.raiz), [])
+
+    def test_anade_y_borra_paginas(self):
+        prerender.prerenderizar(self.raiz)
+        nuevo = Book.objects.create(publisher=self.editorial, title='Nuevo', publication_date=date(2020, 1, 1))
+        borrado = self.otro.pk
+        self.otro.delete()
+
+        resultado = prerender.prerenderizar(self.raiz)
+
+        self.assertIn(f'/es/books/{nuevo.pk}/', resultado.renderizadas)
+        self.assertIn(f'/en/books/{borrado}/', resultado.borradas)
+        self.assertFalse((self.raiz / 'en' / 'books' / str(borrado) / 'index.html').exists())
+        self.assertEqual(prerender.verificar(self.raiz), [])
+
+    def test_verificar_detecta_diferencias(self):
+        prerender.prerenderizar(self.raiz)
+        ruta = prerender.fichero(self.raiz, f'/es/books/{self.libro.pk}/')
+        ruta.write_bytes(ruta.read_bytes().replace(b'Fundaci', b'Fundici'))
+
+        self.assertEqual(prerender.verificar(self.raiz), [f'/es/books/{self.libro.pk}/'])
+
+    def test_paginas_numeradas_del_detalle(self):
+        Book.objects.bulk_create([
+            Book(publisher=self.editorial, title=f'Libro {i:03d}', publication_date=date(2000, 1, 1))
+            for i in range(TAMANO_PAGINA * 2)
+        ])
+        urls = prerender.urls_del_catalogo()
+        detalle = reverse('publisher-detail', args=[self.editorial.pk])
+
+        self.assertIn(f'{detalle}?page=3', urls)
+        self.assertNotIn(f'{detalle}?page=4', urls)
+
+    def test_comando_con_verificacion(self):
+        salida = StringIO()
+        call_command('prerender_catalog', output=self.raiz, jobs=1, verify=True, stdout=salida)
+
+        self.assertIn('coinciden', salida.getvalue())
+        self.assertTrue((self.raiz / prerender.MANIFIESTO).exists())
+
+
+class StaticAssetsTests(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.raiz = Path(tempfile.mkdtemp())
+        cls.addClassCleanup(shutil.rmtree, cls.raiz)
+        cls.ajustes = override_settings(STATIC_ROOT=cls.raiz, STORAGES={
+            'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+            'staticfiles': {'BACKEND': 'appBookStore.static_assets.AlmacenComprimido'},
+        })
+        cls.ajustes.enable()
+        cls.addClassCleanup(cls.ajustes.disable)
+        call_command('collectstatic', interactive=False, verbosity=0)
+        cls.estaticos = static_assets.Estaticos()
+        manifiesto = json.loads((cls.raiz / 'staticfiles.json').read_text())
+        cls.css = '/static/' + manifiesto['paths']['styles.css']
+
+    def get(self, ruta, metodo='GET', **cabeceras):
+        respuestas = []
+        servidor = static_assets.ServidorEstaticosWSGI(lambda environ, start: [b'django'], self.estaticos)
+        environ = {'REQUEST_METHOD': metodo, 'PATH_INFO': ruta, **cabeceras}
+        cuerpo = b''.join(servidor(environ, lambda estado, cabeceras: respuestas.append((estado, dict(cabeceras)))))
+        estado, cabeceras = respuestas[0] if respuestas else (None, {})
+        return estado, cabeceras, cuerpo
+
+    def test_nombres_con_hash_y_version_gzip(self):
+        self.assertRegex(self.css, r'^/static/styles\.[0-9a-f]{12}\.css$')
+        original = (self.raiz / 'styles.css').read_bytes()
+        self.assertEqual(gzip.decompress((self.raiz / self.css[8:]).with_suffix('.css.gz').read_bytes()), original)
+
+    def test_negocia_la_codificacion(self):
+        estado, cabeceras, cuerpo = self.get(self.css, HTTP_ACCEPT_ENCODING='gzip, deflate')
+
+        self.assertEqual(estado, '200 OK')
+        self.assertEqual(cabeceras['Content-Encoding'], 'gzip')
+        self.assertEqual(cabeceras['Vary'], 'Accept-Encoding')
+        self.assertEqual(cabeceras['Cache-Control'], static_assets.INMUTABLE)
+        self.assertTrue(cabeceras['Content-Type'].startswith('text/css'))
+        self.assertEqual(gzip.decompress(cuerpo), (self.raiz / 'styles.css').read_bytes())
+
+        for aceptadas in ('', 'identity', 'gzip;q=0', 'br;q=0, *;q=0'):
+            _estado, cabeceras, cuerpo = self.get(self.css, HTTP_ACCEPT_ENCODING=aceptadas)
+            self.assertNotIn('Content-Encoding', cabeceras, aceptadas)
+            self.assertEqual(int(cabeceras['Content-Length']), len(cuerpo))
+
+    @skipUnless(static_assets.brotli, 'brotli no está instalado')
+    def test_prefiere_brotli(self):
+        _estado, cabeceras, _cuerpo = self.get(self.css, HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(cabeceras['Content-Encoding'], 'br')
+
+    def test_sin_hash_se_revalida_con_etag(self):
+        _estado, cabeceras, _cuerpo = self.get('/static/styles.css', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(cabeceras['Cache-Control'], static_assets.REVALIDAR)
+
+        estado, _cabeceras, cuerpo = self.get('/static/styles.css', HTTP_ACCEPT_ENCODING='gzip',
+                                              HTTP_IF_NONE_MATCH=cabeceras['ETag'])
+        self.assertEqual((estado, cuerpo), ('304 Not Modified', b''))
+
+    def test_head_y_rutas_ajenas(self):
+        _estado, cabeceras, cuerpo = self.get(self.css, metodo='HEAD')
+        self.assertEqual(cuerpo, b'')
+        self.assertGreater(int(cabeceras['Content-Length']), 0)
+
+        self.assertEqual(self.get('/static/no-existe.css')[2], b'django')
+        self.assertEqual(self.get('/es/books/')[2], b'django')
+        self.assertEqual(self.get(self.css, metodo='POST')[2], b'django')
+
+    def test_asgi(self):
+        enviados = []
+
+        async def aplicacion(scope, receive, send):
+            enviados.append('django')
+
+        async def send(mensaje):
+            enviados.append(mensaje)
+
+        servidor = static_assets.ServidorEstaticosASGI(aplicacion, self.estaticos)
+        scope = {'type': 'http', 'method': 'GET', 'path': self.css, 'headers': [(b'accept-encoding', b'gzip')]}
+        async_to_sync(servidor)(scope, None, send)
+
+        self.assertEqual(enviados[0]['status'], 200)
+        self.assertIn((b'content-encoding', b'gzip'), enviados[0]['headers'])
+        self.assertEqual(gzip.decompress(enviados[1]['body']), (self.raiz / 'styles.css').read_bytes())
+
+        async_to_sync(servidor)({'type': 'http', 'method': 'GET', 'path': '/es/', 'headers': []}, None, send)
+        self.assertEqual(enviados[-1], 'django')
+
+    def test_plantillas_enlazan_el_nombre_con_hash(self):
+        self.assertIn(self.css.encode(), self.client.get('/es/newsletter/').content)
+
+
+class GetCondicionalTests(CatalogoTestCase):
+
+    def setUp(self):
+        self.editorial = Publisher.objects.create(name='Anagrama')
+        self.autor = Author.objects.create(name='Isaac Asimov')
+        self.libro = Book.objects.create(
+            publisher=self.editorial, title='Fundación', publication_date=date(1951, 1, 1), stock=5,
+        )
+        self.libro.authors.add(self.autor)
+        self.otro = Book.objects.create(publisher=self.editorial, title='Otro', publication_date=date(1940, 1, 1))
+        self.urls = [reverse('book-detail', args=[self.libro.pk]),
+                     reverse('publisher-detail', args=[self.editorial.pk]),
+                     reverse('author-detail', args=[self.autor.pk])]
+
+    def etags(self):
+        return [self.client.get(url)['ETag'] for url in self.urls]
+
+    def test_304_sin_renderizar_la_plantilla(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertIn('no-cache', response['Cache-Control'])
+
+                with self.assertNumQueries(1):
+                    no_modificada = self.client.get(url, headers={'If-None-Match': response['ETag']})
+                self.assertEqual(no_modificada.status_code, 304)
+                self.assertEqual(no_modificada.templates, [])
+                self.assertEqual(no_modificada['ETag'], response['ETag'])
+
+                por_fecha = self.client.get(url, headers={'If-Modified-Since': response['Last-Modified']})
+                self.assertEqual(por_fecha.status_code, 304)
+
+    def test_cambios_que_invalidan_la_etag(self):
+        cambios = [
+            ('título', lambda: Book.objects.get(pk=self.libro.pk).save(), [True, True, True]),
+            ('autor', lambda: Author.objects.filter(pk=self.autor.pk).get().save(), [True, False, True]),
+            ('editorial', lambda: Publisher.objects.get(pk=self.editorial.pk).save(), [True, True, False]),
+            ('autores del libro', lambda: self.libro.authors.add(Author.objects.create(name='Otro')),
+             [True, True, True]),
+            ('reserva', lambda: reservations.reservar({self.libro.pk: 1}), [True, True, True]),
+            # No cambia ninguna fecha de lo que queda, pero sí el número de libros.
+            ('libro borrado', lambda: Book.objects.filter(pk=self.otro.pk).delete(), [False, True, False]),
+        ]
+        for descripcion, cambio, cambian in cambios:
+            with self.subTest(cambio=descripcion):
+                antes = self.etags()
+                cambio()
+                self.assertEqual([a != d for a, d in zip(antes, self.etags())], cambian)
+
+    def test_autor_borrado_cambia_el_libro(self):
+        otro = Author.objects.create(name='Otro')
+        self.libro.authors.add(otro)
+        antes = self.client.get(self.urls[0])['ETag']
+        otro.delete()
+        self.assertNotEqual(self.client.get(self.urls[0])['ETag'], antes)
+
+    def test_no_encontrado(self):
+        self.assertEqual(self.client.get(reverse('book-detail', args=[0]),
+                                         headers={'If-None-Match': '*'}).status_code, 404)
+
+    async def test_vista_asincrona(self):
+        factory = AsyncRequestFactory()
+        response = await async_views.book_detail(factory.get('/'), book_id=self.libro.pk)
+        request = factory.get('/', headers={'If-None-Match': response['ETag']})
+        self.assertEqual((await async_views.book_detail(request, book_id=self.libro.pk)).status_code, 304)
+
+    @override_settings(CATALOGO_CACHE_ENABLED=True)
+    def test_acierto_de_cache_sin_consultas(self):
+        caches['default'].clear()
+        etag = self.client.get(self.urls[0])['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(self.urls[0], headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+
+class AgendaSyncTests(TestCase):
+
+    def setUp(self):
+        self.usuario = User.objects.create_user('ana', password='clave')
+        self.client.force_login(self.usuario)
+
+    def sync(self, since=None, changes=None):
+        if changes is None:
+            response = self.client.get(reverse('agenda-sync'), {'since': since} if since is not None else {})
+        else:
+            response = self.client.post(reverse('agenda-sync'), {'since': since, 'changes': changes},
+                                        content_type='application/json')
+        return response.status_code, response.json()
+
+    def contacto(self, nombre, **datos):
+        return {'id': str(uuid.uuid4()), 'name': nombre, 'email': f'{nombre.lower()}@example.com',
+                'phone': '', **datos}
+
+    def test_agenda_vacia(self):
+        self.assertEqual(self.sync(), (200, {'changes': [], 'token': '0', 'more': False, 'reset': False,
+                                             'rejected': {}}))
+
+    def test_solo_devuelve_los_cambios_desde_el_token(self):
+        ana, carlos, maria = self.contacto('Ana'), self.contacto('Carlos'), self.contacto('Maria')
+        _estado, datos = self.sync(changes=[ana, carlos, maria])
+        self.assertEqual([c['id'] for c in datos['changes']], [ana['id'], carlos['id'], maria['id']])
+        token = datos['token']
+
+        # Otro cliente: la agenda entera la primera vez y nada después.
+        self.assertEqual(len(self.sync(0)[1]['changes']), 3)
+        self.assertEqual(self.sync(token)[1], {'changes': [], 'token': token, 'more': False, 'reset': False,
+                                               'rejected': {}})
+
+        _estado, datos = self.sync(token, [{**ana, 'phone': '600 111 222'}, {'id': carlos['id'], 'deleted': True}])
+        self.assertEqual(datos['changes'], [{**ana, 'phone': '600 111 222'}, {'id': carlos['id'], 'deleted': True}])
+        self.assertEqual(self.sync(token)[1]['changes'], datos['changes'])
+
+        lapida = Contact.objects.get(uid=carlos['id'])
+        self.assertEqual((lapida.deleted, lapida.name, lapida.email), (True, '', ''))
+
+    def test_reenviar_un_alta_no_la_duplica(self):
+        ana = self.contacto('Ana')
+        self.sync(changes=[ana])
+        self.sync(changes=[ana])
+        self.assertEqual(Contact.objects.count(), 1)
+
+    def test_secuencia_creciente_por_lotes(self):
+        self.sync(changes=[self.contacto('Ana'), self.contacto('Carlos')])
+        self.sync(changes=[self.contacto('Maria')])
+        self.assertEqual(list(Contact.objects.order_by('seq').values_list('seq', flat=True)), [1, 2, 3])
+
+    def test_escrituras_por_lotes(self):
+        def consultas(n):
+            with CaptureQueriesContext(connection) as capturadas:
+                self.sync(changes=[self.contacto(f'Contacto{i}') for i in range(n)])
+            return len(capturadas)
+
+        consultas(1)  # crea la fila de la secuencia
+        self.assertEqual(consultas(10), consultas(100))
+
+    def test_cambios_no_validos_se_rechazan_sin_bloquear_el_lote(self):
+        ana = self.contacto('Ana')
+        estado, datos = self.sync(changes=[ana, self.contacto('Carlos', email='no'), {'id': 'x'}])
+        self.assertEqual(estado, 200)
+        self.assertEqual(datos['rejected'], {'1': {'email': ['invalid']}, '2': {'id': ['invalid']}})
+        self.assertEqual([c['id'] for c in datos['changes']], [ana['id']])
+        self.assertEqual(list(Contact.objects.values_list('name', flat=True)), ['Ana'])
+
+        estado, datos = self.sync(changes=[{'id': 'x'}] * (contacts.MAX_CAMBIOS + 1))
+        self.assertEqual((estado, datos['error']), (400, 'invalid_changes'))
+        self.assertEqual(self.sync('abc')[0], 400)
+        self.assertEqual(self.client.post(reverse('agenda-sync'), 'no es json',
+                                          content_type='application/json').status_code, 400)
+
+    def test_respuestas_limitadas(self):
+        self.sync(changes=[self.contacto(f'Contacto{i}') for i in range(5)])
+        primera = contacts.sincronizar(self.usuario, 0, limite=3)
+        segunda = contacts.sincronizar(self.usuario, int(primera['token']), limite=3)
+        self.assertEqual((len(primera['changes']), primera['more']), (3, True))
+        self.assertEqual((len(segunda['changes']), segunda['more']), (2, False))
+
+    def test_token_de_otra_base_de_datos(self):
+        self.sync(changes=[self.contacto('Ana')])
+        _estado, datos = self.sync(999)
+        self.assertTrue(datos['reset'])
+        self.assertEqual(len(datos['changes']), 1)
+
+    def test_requiere_sesion(self):
+        self.sync(changes=[self.contacto('Ana')])
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('agenda-sync')).status_code, 401)
+        response = self.client.post(reverse('agenda-sync'), {'changes': [{'id': str(uuid.uuid4()), 'deleted': True}]},
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 401)
+        self.assertFalse(Contact.objects.filter(deleted=True).exists())
+
+    def test_cada_usuario_solo_ve_y_cambia_su_agenda(self):
+        ana = self.contacto('Ana')
+        self.sync(changes=[ana])
+        self.client.force_login(User.objects.create_user('carlos', password='clave'))
+
+        self.assertEqual(self.sync(0)[1]['changes'], [])
+        # El uid de un contacto ajeno no lo alcanza: la baja no lo toca y el
+        # cambio crea un contacto propio.
+        self.assertEqual(self.sync(0, [{'id': ana['id'], 'deleted': True}])[1]['changes'], [])
+        _estado, datos = self.sync(0, [{**ana, 'name': 'Otra'}])
+        self.assertEqual([c['name'] for c in datos['changes']], ['Otra'])
+        self.assertEqual(Contact.objects.get(owner=self.usuario, uid=ana['id']).name, 'Ana')
+        self.assertFalse(Contact.objects.get(owner=self.usuario).deleted)
+
+    def test_la_pagina_enlaza_la_api(self):
+        response = self.client.get(reverse('agenda_contactos'))
+        self.assertContains(response, f'data-sync-url="{reverse("agenda-sync")}"')
+        self.assertContains(response, 'data-usuario="ana"')
+        self.assertContains(response, 'name="csrf-token"')
+
+        self.client.logout()
+        response = self.client.get(reverse('agenda_contactos'))
+        self.assertContains(response, 'data-usuario=""')
+        self.assertContains(response, f'{reverse("login")}?next=')
+
+
+class LibrosRelacionadosTests(CatalogoTestCase):
+
+    def setUp(self):
+        self.anagrama = Publisher.objects.create(name='Anagrama')
+        self.alfaguara = Publisher.objects.create(name='Alfaguara')
+        self.asimov = Author.objects.create(name='Isaac Asimov')
+        self.lem = Author.objects.create(name='Stanislaw Lem')
+
+        def libro(titulo, editorial, anio, *autores):
+            creado = Book.objects.create(publisher=editorial, title=titulo, publication_date=date(anio, 1, 1))
+            creado.authors.add(*autores)
+            return creado
+
+        self.fundacion = libro('Fundación', self.anagrama, 1951, self.asimov)
+        self.robots = libro('Yo, robot', self.alfaguara, 1950, self.asimov)
+        self.solaris = libro('Solaris', self.anagrama, 1961, self.lem)
+        self.antiguo = libro('Antiguo', self.anagrama, 1900)
+        self.suelto = libro('Suelto', self.alfaguara, 2000)
+        self.ajeno = libro('Ajeno', Publisher.objects.create(name='Tusquets'), 1951)
+
+    def lista(self, libro):
+        return list(related.de_libro(libro.pk))
+
+    def test_autor_comun_antes_que_editorial(self):
+        resultado = related.calcular()
+        self.assertTrue(resultado.ejecucion.full)
+        self.assertEqual(resultado.calculados, 6)
+        # Autor compartido; después la editorial, por cercanía de fecha.
+        self.assertEqual(self.lista(self.fundacion), [self.robots, self.solaris, self.antiguo])
+        self.assertEqual(self.lista(self.robots), [self.fundacion, self.suelto])
+        puntuaciones = dict(RelatedBook.objects.filter(book=self.fundacion).values_list('related_id', 'score'))
+        self.assertAlmostEqual(puntuaciones[self.robots.pk], related.peso(2), places=5)
+        self.assertAlmostEqual(puntuaciones[self.solaris.pk], related.peso(3), places=5)
+        self.assertEqual(self.lista(self.ajeno), [])
+
+    def test_detalle_con_una_consulta(self):
+        related.calcular()
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(reverse('book-detail', args=[self.fundacion.pk]))
+        self.assertEqual(response.context['relacionados'], [self.robots, self.solaris, self.antiguo])
+        self.assertContains(response, 'Yo, robot')
+        tabla = RelatedBook._meta.db_table
+        # La de la ETag y la del panel.
+        self.assertEqual(len([c for c in consultas.captured_queries if tabla in c['sql']]), 2)
+
+    def test_incremental_igual_que_completo(self):
+        related.calcular()
+        self.antiguo.publication_date = date(1955, 1, 1)
+        self.antiguo.save()
+        Book.objects.filter(pk=self.robots.pk).delete()
+
+        resultado = related.calcular()
+        self.assertFalse(resultado.ejecucion.full)
+        self.assertEqual(resultado.calculados, 4)
+        self.assertEqual(self.lista(self.fundacion), [self.antiguo, self.solaris])
+        self.assertFalse(RelatedBook.objects.filter(related__isnull=True).exists())
+        self.assertEqual(related.calcular(completo=True).cambiados, 0)
+
+    def test_solo_recalcula_si_cambian_editorial_fecha_o_autores(self):
+        related.calcular()
+        # El stock (reservas, acciones del admin) y el título no cambian las listas.
+        self.fundacion.stock = 5
+        self.fundacion.title = 'Fundación (bolsillo)'
+        self.fundacion.save()
+        self.assertEqual(related.calcular().calculados, 0)
+
+        self.suelto.authors.add(self.lem)
+        self.assertGreater(related.calcular().calculados, 0)
+        self.assertEqual(self.lista(self.solaris)[0], self.suelto)
+
+    def test_grafo_sin_libros_que_no_leyo(self):
+        # Como un libro creado entre las dos lecturas: las claves ajenas se
+        # comprueban al confirmar, así que la fila huérfana entra sin error.
+        huerfana = Book.authors.through.objects.create(book_id=999999, author=self.asimov)
+        self.addCleanup(huerfana.delete)
+        grafo = related.Grafo()
+        self.assertEqual(len(grafo.miembros), 3)
+        self.assertEqual(len(grafo.relacionados(grafo.posicion[self.fundacion.pk])), 3)
+
+    def test_sin_cambios_no_reescribe(self):
+        related.calcular()
+        resultado = related.calcular()
+        self.assertEqual((resultado.calculados, resultado.cambiados), (0, 0))
+
+    @override_settings(CATALOGO_CACHE_ENABLED=True)
+    def test_recalcular_invalida_cache_y_etag(self):
+        caches['default'].clear()
+        url = reverse('book-detail', args=[self.fundacion.pk])
+        antes = self.client.get(url)
+        self.assertNotContains(antes, 'Yo, robot')
+        related.calcular()
+        despues = self.client.get(url)
+        self.assertContains(despues, 'Yo, robot')
+        self.assertNotEqual(despues['ETag'], antes['ETag'])
+
+        # Cambiar un libro relacionado invalida las páginas que lo muestran.
+        with self.captureOnCommitCallbacks(execute=True):
+            self.robots.title = 'Yo, robot (reedición)'
+            self.robots.save()
+        self.assertContains(self.client.get(url), 'Yo, robot (reedición)')
+
+    def test_comando(self):
+        salida = StringIO()
+        call_command('compute_related_books', '--full', stdout=salida)
+        self.assertIn('Cálculo completo: 6 libros calculados', salida.getvalue())
+
+
+class AdminCatalogoTests(TestCase):
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'clave'))
+        self.editoriales = crear_catalogo(10, libros_por_editorial=3)
+        self.autor = Author.objects.create(name='Isaac Asimov')
+        Author.objects.bulk_create([Author(name=f'Autor {i}') for i in range(20)])
+        self.url = reverse('admin:appBookStore_book_changelist')
+
+    def test_listado_sin_recuento_ni_consultas_por_fila(self):
+        with CaptureQueriesContext(connection) as pocos:
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+        crear_catalogo(40)
+        with CaptureQueriesContext(connection) as muchos:
+            response = self.client.get(self.url)
+        self.assertEqual(len(pocos), len(muchos))
+        self.assertFalse([c for c in muchos.captured_queries if 'COUNT(' in c['sql']])
+        self.assertContains(response, 'Editorial 0039')
+
+    def test_recuento_limitado_con_filtros(self):
+        with mock.patch('appBookStore.admin.MAX_RECUENTO', 5):
+            response = self.client.get(self.url, {'stock__exact': 1})
+        self.assertEqual(response.context['cl'].result_count, 5)
+
+    def test_busqueda_de_libros_por_el_indice(self):
+        response = self.client.get(self.url, {'q': 'Libro 0003'})
+        self.assertEqual({libro.title for libro in response.context['cl'].result_list},
+                         {'Libro 0003-0', 'Libro 0003-1', 'Libro 0003-2'})
+
+    def test_autocompletado_por_prefijo(self):
+        response = self.client.get(reverse('admin:autocomplete'), {
+            'app_label': 'appBookStore', 'model_name': 'book', 'field_name': 'authors', 'term': 'isaac',
+        })
+        self.assertEqual([r['text'] for r in response.json()['results']], ['Isaac Asimov'])
+
+        with CaptureQueriesContext(connection) as consultas:
+            self.client.get(reverse('admin:autocomplete'), {
+                'app_label': 'appBookStore', 'model_name': 'book', 'field_name': 'publisher', 'term': 'edi',
+            })
+        plan = [c['sql'] for c in consultas.captured_queries if 'nombre_normalizado' in c['sql']]
+        self.assertTrue(plan)
+        self.assertNotIn('LIKE', ' '.join(plan))
+
+    def test_busqueda_sin_acentos_ni_mayusculas(self):
+        Author.objects.bulk_create([Author(name='Gabriel García Márquez'), Author(name='Antonio Muñoz Molina')])
+        Publisher.objects.create(name='Ñu Ediciones')
+        autores = reverse('admin:appBookStore_author_changelist')
+        for termino, esperado in (('gabriel garcía', 'Gabriel García Márquez'),
+                                  ('GABRIEL GARCIA', 'Gabriel García Márquez'),
+                                  ('antonio muñoz', 'Antonio Muñoz Molina'),
+                                  ('Antonio Muñ', 'Antonio Muñoz Molina')):
+            with self.subTest(termino=termino):
+                response = self.client.get(autores, {'q': termino})
+                self.assertEqual([a.name for a in response.context['cl'].result_list], [esperado])
+
+        for termino in ('ñu', 'Ñu', 'nu edic'):
+            with self.subTest(termino=termino):
+                response = self.client.get(reverse('admin:autocomplete'), {
+                    'app_label': 'appBookStore', 'model_name': 'book', 'field_name': 'publisher', 'term': termino,
+                })
+                self.assertEqual([r['text'] for r in response.json()['results']], ['Ñu Ediciones'])
+
+    def test_formulario_del_libro_sin_todas_las_filas(self):
+        libro = Book.objects.first()
+        libro.authors.add(self.autor)
+        response = self.client.get(reverse('admin:appBookStore_book_change', args=[libro.pk]))
+        self.assertContains(response, 'Isaac Asimov')
+        self.assertNotContains(response, 'Autor 1')
+        self.assertNotContains(response, 'Editorial 0005')
+
+    def accion(self, libros, **datos):
+        return self.client.post(self.url, {
+            helpers.ACTION_CHECKBOX_NAME: [libro.pk for libro in libros], 'index': 0, **datos,
+        })
+
+    def test_ajuste_de_stock_en_un_update(self):
+        libros = list(Book.objects.order_by('pk'))
+        with CaptureQueriesContext(connection) as uno:
+            self.accion(libros[:1], action='ajustar_stock', cantidad=1)
+        with CaptureQueriesContext(connection) as todos:
+            self.accion(libros, action='ajustar_stock', cantidad=-1)
+        self.assertEqual(len(uno), len(todos))
+        actualizaciones = [c['sql'] for c in todos.captured_queries if c['sql'].startswith('UPDATE')]
+        self.assertEqual(len(actualizaciones), 1)
+        # stock inicial 0, 1, 2: +1 y -1 al primero, -1 sin bajar de 0 al resto.
+        self.assertEqual(sorted(Book.objects.values_list('stock', flat=True)), [0] * 10 + [0] * 10 + [1] * 10)
+        self.assertGreater(Book.objects.get(pk=libros[0].pk).updated_at, libros[0].updated_at)
+
+    def test_cambio_de_editorial_en_un_update(self):
+        destino = self.editoriales[0]
+        libros = list(Book.objects.exclude(publisher=destino)[:5])
+        with CaptureQueriesContext(connection) as consultas:
+            self.accion(libros, action='cambiar_editorial', editorial=destino.pk)
+        actualizaciones = [c['sql'] for c in consultas.captured_queries if c['sql'].startswith('UPDATE')]
+        self.assertEqual(len(actualizaciones), 1)
+        self.assertEqual(Book.objects.filter(publisher=destino).count(), 3 + 5)
+
+    def test_accion_sin_datos_no_cambia_nada(self):
+        with CaptureQueriesContext(connection) as consultas:
+            self.accion(Book.objects.all()[:2], action='ajustar_stock')
+        self.assertFalse([c for c in consultas.captured_queries if c['sql'].startswith('UPDATE')])
+        self.assertEqual(Book.objects.filter(stock=1).count(), 10)
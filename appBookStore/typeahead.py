@@ -0,0 +1,332 @@
+"""Índice de autocompletado en memoria para títulos, autores y editoriales.
+
+Cada nombre se normaliza (minúsculas y sin acentos) y genera varias claves:
+el nombre entero y el resto del nombre a partir de cada una de sus primeras
+palabras (``cien anos de soledad``, ``anos de soledad``, ...), recortadas a
+``TYPEAHEAD_MAX_LONGITUD`` caracteres. Cada clave lleva delante el tipo y si
+es el comienzo del nombre, de modo que una búsqueda por prefijo es un
+``bisect`` sobre las claves ordenadas seguido de un recorrido corto, y los
+nombres que empiezan por lo escrito salen antes que los que solo lo contienen.
+
+Para acotar la memoria las claves ordenadas no son una lista de ``str``
+sino un único ``str`` con sus posiciones en un ``array``, igual que los
+nombres: con un millón de títulos y 250.000 autores ocupa unos 190 MiB, se
+construye en unos 15 s y responde en menos de 0,2 ms
+(``scripts/bench_typeahead.py``).
+
+Los cambios llegan por las señales de ``signals.py`` y se guardan aparte en
+una lista ordenada pequeña que tiene prioridad sobre la parte compacta;
+cuando supera ``TYPEAHEAD_MAX_CAMBIOS`` se funden en segundo plano. Como
+cada proceso tiene su propio índice y solo ve sus propias señales, además se
+reconstruye cada ``TYPEAHEAD_REFRESCO`` segundos. ``precargar()`` lo
+construye al arrancar (``wsgi.py`` y ``asgi.py``); si no, se construye en la
+primera búsqueda.
+"""
+
+import re
+import sys
+import threading
+import time
+import unicodedata
+from array import array
+from bisect import bisect_left, insort
+from dataclasses import dataclass
+from itertools import accumulate, chain
+from typing import Iterable, Iterator, Optional
+
+from django.conf import settings
+from django.db import connections
+
+LIBRO, AUTOR, EDITORIAL = 'l', 'a', 'e'
+INICIO, PALABRA = '0', '1'
+
+_PALABRA_RE = re.compile(r'\w+')
+_DIACRITICOS_RE = re.compile('[\u0300-\u036f]')
+
+
+def normalizar(texto: str) -> str:
+    """Minúsculas, sin acentos y con las palabras separadas por un espacio."""
+    texto = texto.casefold()
+    if not texto.isascii():
+        texto = _DIACRITICOS_RE.sub('', unicodedata.normalize('NFKD', texto))
+    return ' '.join(_PALABRA_RE.findall(texto))
+
+
+def claves(texto: str, max_palabras: int, max_longitud: int) -> list[str]:
+    normal = normalizar(texto)
+    if not normal:
+        return []
+    resultado = [INICIO + normal[:max_longitud]]
+    posicion = 0
+    for _ in range(max_palabras - 1):
+        posicion = normal.find(' ', posicion) + 1
+        if not posicion:
+            break
+        resultado.append(PALABRA + normal[posicion:posicion + max_longitud])
+    return resultado
+
+
+class _Cadenas:
+    """Secuencia de cadenas guardada en un único ``str`` y un ``array`` de posiciones."""
+    __slots__ = ('_texto', '_posiciones')
+
+    def __init__(self, cadenas: list[str]):
+        self._texto = '\n'.join(cadenas)
+        # Posición de inicio de cada cadena; cada una ocupa su longitud más el separador.
+        self._posiciones = array('I', accumulate(map((1).__add__, map(len, cadenas)), initial=0))
+
+    def __len__(self):
+        return len(self._posiciones) - 1
+
+    def __getitem__(self, i):
+        return self._texto[self._posiciones[i]:self._posiciones[i + 1] - 1]
+
+    def memoria(self) -> int:
+        return sys.getsizeof(self._texto) + sys.getsizeof(self._posiciones)
+
+
+class _Compacto:
+    """Parte inmutable del índice: entidades y claves ordenadas.
+
+    Cada clave guarda al final, tras un ``\\0``, la posición de su entidad: así
+    se ordenan como ``str`` sin listas auxiliares, y el ``\\0`` (menor que
+    cualquier otro carácter) no altera el orden de las claves.
+    """
+
+    def __init__(self, entidades: Iterable[tuple[str, int, str]], max_palabras: int, max_longitud: int):
+        tipos, pks, nombres, lista_claves = [], array('q'), [], []
+        for tipo, pk, nombre in entidades:
+            sufijo = f'\0{len(pks)}'
+            tipos.append(tipo)
+            pks.append(pk)
+            nombres.append(nombre.replace('\n', ' '))
+            lista_claves.extend(tipo + clave + sufijo for clave in claves(nombre, max_palabras, max_longitud))
+        lista_claves.sort()
+        self.claves = _Cadenas(lista_claves)
+        del lista_claves
+        self.tipos = ''.join(tipos)
+        self.pks = pks
+        self.nombres = _Cadenas(nombres)
+
+    def recorrer(self, prefijo: str) -> Iterator[tuple[str, str, int, str]]:
+        """``(clave, tipo, pk, nombre)`` de las claves que empiezan por ``prefijo``, en orden."""
+        i = bisect_left(self.claves, prefijo)
+        while i < len(self.claves):
+            clave, _, n = self.claves[i].partition('\0')
+            if not clave.startswith(prefijo):
+                return
+            n = int(n)
+            yield clave, self.tipos[n], self.pks[n], self.nombres[n]
+            i += 1
+
+    def entidades(self) -> Iterator[tuple[str, int, str]]:
+        for n in range(len(self.pks)):
+            yield self.tipos[n], self.pks[n], self.nombres[n]
+
+    def memoria(self) -> int:
+        return (sys.getsizeof(self.tipos) + sys.getsizeof(self.pks)
+                + self.nombres.memoria() + self.claves.memoria())
+
+
+@dataclass
+class Sugerencia:
+    tipo: str
+    pk: int
+    nombre: str
+
+
+class IndiceTypeahead:
+
+    def __init__(self, entidades: Iterable[tuple[str, int, str]] = (), max_palabras: int = 4,
+                 max_longitud: int = 24, max_cambios: int = 10000):
+        self.max_palabras = max_palabras
+        self.max_longitud = max_longitud
+        self.max_cambios = max_cambios
+        self._compacto = _Compacto(entidades, max_palabras, max_longitud)
+        # (tipo, pk) -> nombre actual, o None si se ha borrado.
+        self._cambios: dict[tuple[str, int], Optional[str]] = {}
+        self._claves_cambios: list[tuple[str, int]] = []
+        self._lock = threading.Lock()
+        self._fundiendo = False
+
+    def _claves(self, tipo: str, nombre: Optional[str]) -> list[str]:
+        if nombre is None:
+            return []
+        return [tipo + c for c in claves(nombre, self.max_palabras, self.max_longitud)]
+
+    def actualizar(self, tipo: str, pk: int, nombre: Optional[str]) -> None:
+        """Añade, renombra o (con ``nombre=None``) elimina una entidad."""
+        with self._lock:
+            if (tipo, pk) in self._cambios:
+                for clave in self._claves(tipo, self._cambios[(tipo, pk)]):
+                    i = bisect_left(self._claves_cambios, (clave, pk))
+                    if i < len(self._claves_cambios) and self._claves_cambios[i] == (clave, pk):
+                        del self._claves_cambios[i]
+            self._cambios[(tipo, pk)] = nombre
+            for clave in self._claves(tipo, nombre):
+                insort(self._claves_cambios, (clave, pk))
+            fundir = len(self._cambios) > self.max_cambios and not self._fundiendo
+            if fundir:
+                self._fundiendo = True
+        if fundir:
+            threading.Thread(target=self.fundir, daemon=True).start()
+
+    def eliminar(self, tipo: str, pk: int) -> None:
+        self.actualizar(tipo, pk, None)
+
+    def fundir(self) -> None:
+        """Reconstruye la parte compacta con los cambios acumulados.
+
+        El trabajo se hace fuera del cerrojo; los cambios que lleguen mientras
+        tanto se conservan.
+        """
+        with self._lock:
+            compacto, cambios = self._compacto, dict(self._cambios)
+        vigentes = (e for e in compacto.entidades() if (e[0], e[1]) not in cambios)
+        nuevos = ((tipo, pk, nombre) for (tipo, pk), nombre in cambios.items() if nombre is not None)
+        nuevo = _Compacto(chain(vigentes, nuevos), self.max_palabras, self.max_longitud)
+        with self._lock:
+            for clave, nombre in cambios.items():
+                if self._cambios.get(clave, ...) is nombre:
+                    del self._cambios[clave]
+            self._claves_cambios = sorted(
+                (clave, pk)
+                for (tipo, pk), nombre in self._cambios.items()
+                for clave in self._claves(tipo, nombre)
+            )
+            self._compacto = nuevo
+            self._fundiendo = False
+
+    def buscar(self, termino: str, tipo: str, limite: int = 5) -> list[Sugerencia]:
+        """Entidades de ``tipo`` cuyo nombre empieza por ``termino`` y, después,
+        las que tienen una palabra que empieza por él."""
+        normal = normalizar(termino)[:self.max_longitud]
+        if not normal or limite <= 0:
+            return []
+        resultado, vistos = [], set()
+        with self._lock:
+            for etapa in (INICIO, PALABRA):
+                prefijo = tipo + etapa + normal
+                candidatos, del_compacto = [], set()
+                for clave, _tipo, pk, nombre in self._compacto.recorrer(prefijo):
+                    if pk not in vistos and pk not in del_compacto and (tipo, pk) not in self._cambios:
+                        del_compacto.add(pk)
+                        candidatos.append((clave, pk, nombre))
+                        if len(candidatos) >= limite:
+                            break
+                i = bisect_left(self._claves_cambios, (prefijo,))
+                while i < len(self._claves_cambios) and len(candidatos) < 2 * limite:
+                    clave, pk = self._claves_cambios[i]
+                    if not clave.startswith(prefijo):
+                        break
+                    if pk not in vistos:
+                        candidatos.append((clave, pk, self._cambios[(tipo, pk)]))
+                    i += 1
+                for _clave, pk, nombre in sorted(candidatos):
+                    if pk not in vistos and len(resultado) < limite:
+                        vistos.add(pk)
+                        resultado.append(Sugerencia(tipo, pk, nombre))
+                if len(resultado) >= limite:
+                    break
+        return resultado
+
+    def memoria(self) -> int:
+        """Bytes aproximados de la parte compacta (los cambios pendientes aparte)."""
+        return self._compacto.memoria()
+
+
+# --- Índice del proceso --------------------------------------------------------
+
+_indice: Optional[IndiceTypeahead] = None
+_construido_en = 0.0
+_refrescando = False
+# Cambios recibidos mientras se construye un índice nuevo; se aplican al terminar.
+_pendientes: Optional[list] = None
+_lock_construccion = threading.Lock()
+_lock_cambios = threading.Lock()
+
+
+def _leer_catalogo() -> Iterator[tuple[str, int, str]]:
+    from .models import Author, Book, Publisher
+
+    for tipo, modelo, campo in ((LIBRO, Book, 'title'), (AUTOR, Author, 'name'), (EDITORIAL, Publisher, 'name')):
+        for pk, nombre in modelo.objects.values_list('pk', campo).iterator(chunk_size=10000):
+            yield tipo, pk, nombre
+
+
+def construir() -> IndiceTypeahead:
+    """Construye el índice desde la base de datos y lo pone en uso."""
+    global _indice, _construido_en, _pendientes
+    with _lock_cambios:
+        _pendientes = []
+    try:
+        nuevo = IndiceTypeahead(
+            _leer_catalogo(),
+            max_palabras=getattr(settings, 'TYPEAHEAD_MAX_PALABRAS', 4),
+            max_longitud=getattr(settings, 'TYPEAHEAD_MAX_LONGITUD', 24),
+            max_cambios=getattr(settings, 'TYPEAHEAD_MAX_CAMBIOS', 10000),
+        )
+    except BaseException:
+        with _lock_cambios:
+            _pendientes = None
+        raise
+    with _lock_cambios:
+        for cambio in _pendientes:
+            nuevo.actualizar(*cambio)
+        _pendientes = None
+        _indice, _construido_en = nuevo, time.monotonic()
+    return nuevo
+
+
+def _refrescar() -> None:
+    global _refrescando
+    try:
+        with _lock_construccion:
+            construir()
+    finally:
+        _refrescando = False
+        connections.close_all()
+
+
+def indice() -> IndiceTypeahead:
+    """El índice del proceso: se construye la primera vez y se refresca en
+    segundo plano cuando caduca, sin dejar de responder con el anterior."""
+    global _refrescando
+    actual = _indice
+    if actual is None:
+        with _lock_construccion:
+            return _indice or construir()
+    refresco = getattr(settings, 'TYPEAHEAD_REFRESCO', 900)
+    if refresco and time.monotonic() - _construido_en > refresco and not _refrescando:
+        _refrescando = True
+        threading.Thread(target=_refrescar, daemon=True).start()
+    return actual
+
+
+def precargar() -> None:
+    """Construye el índice en segundo plano al arrancar el servidor."""
+    def tarea():
+        try:
+            with _lock_construccion:
+                if _indice is None:
+                    construir()
+        finally:
+            connections.close_all()
+
+    threading.Thread(target=tarea, daemon=True).start()
+
+
+def registrar_cambio(tipo: str, pk: int, nombre: Optional[str]) -> None:
+    """Aplica al índice del proceso un alta, cambio o baja (``nombre=None``)."""
+    with _lock_cambios:
+        if _pendientes is not None:
+            _pendientes.append((tipo, pk, nombre))
+        actual = _indice
+    if actual is not None:
+        actual.actualizar(tipo, pk, nombre)
+
+
+def reiniciar() -> None:
+    """Descarta el índice; el siguiente uso lo vuelve a construir."""
+    global _indice
+    _indice = None
@@ -1,32 +1,53 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
+# Bajo ASGI el catálogo se sirve con las vistas asíncronas (ver async_views.py).
+if settings.CATALOGO_ASYNC_VIEWS:
+    from . import async_views as vistas_catalogo
+else:
+    vistas_catalogo = views
+
 urlpatterns = [
     # listado de categorías
-    path('', views.index, name='index'),
+    path('', vistas_catalogo.index, name='index'),
 
     # Lista de Libros
-    path('books/', views.book_list, name='book-list'),
+    path('books/', vistas_catalogo.book_list, name='book-list'),
     
+    # Sugerencias del buscador (índice en memoria)
+    path('autocomplete/', views.autocomplete, name='autocomplete'),
+
+    # Exportación del catálogo (CSV o JSONL, opcionalmente en gzip)
+    path('books/export/', views.catalog_export, name='catalog-export'),
+
     # Detalle de un Libro
-    path('books/<int:book_id>/', views.book_detail, name='book-detail'),
+    path('books/<int:book_id>/', vistas_catalogo.book_detail, name='book-detail'),
+
+    # Reservas de stock (JSON)
+    path('reservations/', views.reservation_create, name='reservation-create'),
+    path('reservations/<uuid:token>/checkout/', views.reservation_checkout, name='reservation-checkout'),
+    path('reservations/<uuid:token>/release/', views.reservation_release, name='reservation-release'),
 
     # Lista de Editoriales
-    path('publishers/', views.publisher_list, name='publisher-list'),
+    path('publishers/', vistas_catalogo.publisher_list, name='publisher-list'),
 
     # Detalle de una Editorial
-    path('publishers/<int:publisher_id>/', views.publisher_detail, name='publisher-detail'),
+    path('publishers/<int:publisher_id>/', vistas_catalogo.publisher_detail, name='publisher-detail'),
 
     # Lista de Autores
-    path('authors/', views.author_list, name='author-list'),
+    path('authors/', vistas_catalogo.author_list, name='author-list'),
 
     # Detalle de un Autor
-    path('authors/<int:author_id>/', views.author_detail, name='author-detail'),
+    path('authors/<int:author_id>/', vistas_catalogo.author_detail, name='author-detail'),
     
     # Suscripción a newsletter
     path('newsletter/', views.newsletter_subscription, name='newsletter'),
 
     path('agenda-contactos/', views.agenda_contactos, name='agenda_contactos'),
+
+    # Sincronización incremental de la agenda (JSON)
+    path('agenda-contactos/sync/', views.agenda_sync, name='agenda-sync'),
 ]
 
 
@@ -1,100 +1,300 @@
+import json
+
+from django.http import HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, render
-from django.db.models import Q
+from django.urls import reverse
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.http import require_http_methods, require_POST
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber
 from .models import Publisher, Author, Book
 from .forms import BookSearchForm, NewsletterSubscriptionForm
-from django.shortcuts import render
-from .forms import NewsletterSubscriptionForm
+from .directories import SECCIONES, directorio, seccion_de
+from .facets import SeleccionFacetas, calcular_facetas, filas_agrupadas, filas_del_catalogo, seleccion_de
+from .pagination import paginar_catalogo, paginar_por_relevancia
+from .search import buscar_libros
+from . import cache, contacts, export, related, reservations, typeahead
+from .cache import cache_catalogo, etiquetar
+from .conditional import condicional, marca_autor, marca_editorial, marca_libro
+from .newsletter import encolar_suscripcion
+
+def libros_recientes_por_editorial():
+    # Una función de ventana numera los libros de cada editorial del más
+    # reciente al más antiguo y nos quedamos con el primero: dos consultas en
+    # total, independientemente del número de editoriales.
+    return Book.objects.annotate(
+        posicion=Window(
+            RowNumber(),
+            partition_by=[F('publisher_id')],
+            order_by=[F('publication_date').desc(), F('pk').asc()],
+        )
+    ).filter(posicion=1)
+
 
+@cache_catalogo
 def index(request):
     #la portada con un libro reciente de cada editorial
+    etiquetar(request, cache.PORTADA)
 
-    publishers = Publisher.objects.all()
-    editoriales_con_libro = {}
+    recientes = libros_recientes_por_editorial()
+    libro_por_editorial = {libro.publisher_id: libro for libro in recientes}  # type: ignore[attr-defined]
 
-    for publisher in publishers:
-        # Por cada editorial, busca el libro más reciente 
-        libro_reciente = Book.objects.filter(publisher=publisher).order_by('-publication_date').first()
-        editoriales_con_libro[publisher] = libro_reciente
+    editoriales_con_libro = {
+        publisher: libro_por_editorial.get(publisher.pk)
+        for publisher in Publisher.objects.all()
+    }
 
     context = {'editoriales': editoriales_con_libro}
     return render(request, 'index.html', context)
 
 
 # Vista para la lista de Libros (books.html)
+@cache_catalogo
 def book_list(request):
     
     #Muestra el listado de todos los libros con búsqueda y filtrado.
     
-    libros = Book.objects.all().order_by('title')
+    etiquetar(request, cache.LISTA_LIBROS)
+    form, pagina, facetas = buscar_pagina_de_libros(request)
+    return respuesta_listado(request, form, pagina, facetas)
+
+
+def buscar_pagina_de_libros(request):
+    #Valida los filtros y materializa la página pedida; devuelve (form, pagina, facetas).
+    libros = Book.objects.select_related('publisher')
     form = BookSearchForm(request.GET or None)
+    busqueda = None
+    seleccion = SeleccionFacetas()
+    filtrado = False
     
     if form.is_valid():
         search_term = form.cleaned_data.get('search')
         if search_term:
-            libros = libros.filter(Q(title__icontains=search_term) | Q(isbn__icontains=search_term))
-        
-        publisher = form.cleaned_data.get('publisher')
-        if publisher:
-            libros = libros.filter(publisher=publisher)
+            # Índice FTS5 (título, ISBN, resumen y autores) ordenado por relevancia;
+            # si no está disponible se mantiene la búsqueda con icontains.
+            busqueda = buscar_libros(search_term)
+            if busqueda is None:
+                libros = libros.filter(Q(title__icontains=search_term) | Q(isbn__icontains=search_term))
+            else:
+                libros = libros.filter(busqueda.filtro())
+            filtrado = True
         
         min_stock = form.cleaned_data.get('min_stock')
         if min_stock is not None:
             libros = libros.filter(stock__gte=min_stock)
-    
-    context = {'libros': libros, 'form': form}
-    return render(request, 'books.html', context)
+            filtrado = True
+
+        seleccion = seleccion_de(form.cleaned_data)
+
+    # Una consulta agrupada da todas las facetas y el total de resultados;
+    # sin búsqueda es la del catálogo entero, que se guarda en caché.
+    filas = filas_agrupadas(libros) if filtrado else filas_del_catalogo(libros)
+    facetas, total = calcular_facetas(filas, seleccion, request.GET)
+    libros = libros.filter(seleccion.filtro())
+
+    # Solo se materializa la página pedida; los filtros viajan en los enlaces.
+    if busqueda is None:
+        pagina = paginar_catalogo(libros, request.GET, total=total)
+    else:
+        pagina = paginar_por_relevancia(libros, busqueda, request.GET, total=total)
+    return form, pagina, facetas
+
+
+def es_busqueda_en_vivo(request):
+    return request.headers.get('x-requested-with') == 'XMLHttpRequest'
+
+
+def respuesta_listado(request, form, pagina, facetas):
+    context = {'libros': pagina, 'pagina': pagina, 'form': form, 'facetas': facetas}
+
+    # La búsqueda en vivo (interactive.js) solo necesita los resultados: un
+    # fragmento HTML o, si lo pide, un JSON compacto, sin la plantilla base.
+    if es_busqueda_en_vivo(request):
+        if 'application/json' in request.headers.get('accept', ''):
+            response = JsonResponse(_resultados_json(pagina, facetas))
+        else:
+            response = render(request, 'books_results.html', context)
+    else:
+        response = render(request, 'books.html', context)
+    patch_vary_headers(response, ('X-Requested-With', 'Accept'))
+    return response
+
+
+def _resultados_json(pagina, facetas):
+    return {
+        'results': [
+            {
+                'id': libro.pk,
+                'title': libro.title,
+                'publisher': libro.publisher.name,
+                'url': reverse('book-detail', args=[libro.pk]),
+                'cover': libro.cover_image.url if libro.cover_image else None,
+            }
+            for libro in pagina
+        ],
+        'previous': pagina.anterior,
+        'next': pagina.siguiente,
+        'facets': {
+            faceta.nombre: [
+                {'value': o.valor, 'label': o.etiqueta, 'count': o.n, 'selected': o.activa, 'url': o.enlace}
+                for o in faceta.opciones
+            ]
+            for faceta in facetas
+        },
+    }
+
+
+# Sugerencias del buscador desde el índice en memoria (typeahead.py)
+def autocomplete(request):
+
+    # No consulta la base de datos: responde con el índice del proceso.
+
+    termino = request.GET.get('q', '')[:100]
+    try:
+        limite = max(1, min(int(request.GET.get('limit', 5)), 10))
+    except ValueError:
+        limite = 5
+    indice = typeahead.indice()
+    resultados = {}
+    for clave, tipo, ruta in (('books', typeahead.LIBRO, 'book-detail'),
+                              ('authors', typeahead.AUTOR, 'author-detail'),
+                              ('publishers', typeahead.EDITORIAL, 'publisher-detail')):
+        resultados[clave] = [
+            {'id': s.pk, 'label': s.nombre, 'url': reverse(ruta, args=[s.pk])}
+            for s in indice.buscar(termino, tipo, limite)
+        ]
+    return JsonResponse(resultados)
+
+
+# API de reservas de stock (reservations.py)
+@require_POST
+def reservation_create(request):
+
+    # Cuerpo JSON: {"items": [{"book": 1, "quantity": 2}, ...]}
+
+    try:
+        lineas = {}
+        for item in json.loads(request.body)['items']:
+            book_id, cantidad = int(item['book']), int(item.get('quantity', 1))
+            lineas[book_id] = lineas.get(book_id, 0) + cantidad
+        reserva = reservations.reservar(lineas)
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': 'invalid'}, status=400)
+    except reservations.StockInsuficiente as error:
+        return JsonResponse({'error': 'insufficient_stock', 'book': error.book_id}, status=409)
+    return JsonResponse({
+        'token': str(reserva.token),
+        'expires_at': reserva.expires_at.isoformat(),
+        'items': [{'book': pk, 'quantity': n} for pk, n in sorted(lineas.items())],
+    }, status=201)
+
+
+@require_POST
+def reservation_checkout(request, token):
+    try:
+        reservations.confirmar(token)
+    except reservations.ReservaNoDisponible:
+        return JsonResponse({'error': 'unavailable'}, status=409)
+    return JsonResponse({'token': str(token), 'status': 'confirmed'})
+
+
+@require_POST
+def reservation_release(request, token):
+    try:
+        reservations.liberar(token)
+    except reservations.ReservaNoDisponible:
+        return JsonResponse({'error': 'unavailable'}, status=409)
+    return JsonResponse({'token': str(token), 'status': 'released'})
+
+
+# Exportación del catálogo completo para los feeds de los socios
+def catalog_export(request):
+
+    # Se genera por bloques mientras se envía: la memoria no depende del tamaño del catálogo.
+
+    formato = request.GET.get('format', 'csv')
+    if formato not in export.FORMATOS:
+        return HttpResponseBadRequest('Formato no soportado')
+    gzip = request.GET.get('gzip') == '1'
+
+    nombre = f'catalogo.{formato}' + ('.gz' if gzip else '')
+    response = StreamingHttpResponse(
+        export.exportar(formato, gzip=gzip),
+        content_type='application/gzip' if gzip else f'{export.FORMATOS[formato][1]}; charset=utf-8',
+    )
+    response['Content-Disposition'] = f'attachment; filename="{nombre}"'
+    return response
 
 
 # Vista para el detalle de un Libro (book.html)
+@cache_catalogo
+@condicional(marca_libro)
 def book_detail(request, book_id):
     
     # los detalles de un libro específico, incluyendo su editorial y autores.
     
-    libro = get_object_or_404(Book, pk=book_id)
-    autores = libro.authors.all()
-    context = {'libro': libro, 'autores': autores}
+    etiquetar(request, cache.libro(book_id))
+    libro = get_object_or_404(Book.objects.select_related('publisher'), pk=book_id)
+    etiquetar(request, cache.editorial(libro.publisher_id))  # type: ignore[attr-defined]
+    autores = list(libro.authors.all())
+    etiquetar(request, *(cache.autor(a.pk) for a in autores))
+    relacionados = list(related.de_libro(book_id))
+    etiquetar(request, *(cache.libro(r.pk) for r in relacionados))
+    context = {'libro': libro, 'autores': autores, 'relacionados': relacionados}
     return render(request, 'book.html', context)
 
 
 # Vista para la lista de Editoriales (publishers.html)
+@cache_catalogo
 def publisher_list(request):
     
-    #Muestra el listado de todas las editoriales.
+    #Muestra las editoriales de una inicial con su número de libros y última publicación.
     
-    editoriales = Publisher.objects.all().order_by('name')
-    context = {'editoriales': editoriales}
+    etiquetar(request, cache.LISTA_EDITORIALES)
+    seccion = seccion_de(request.GET)
+    pagina = directorio(Publisher.objects.all(), 'publisher', seccion, request.GET)
+    context = {'editoriales': pagina, 'pagina': pagina, 'seccion': seccion, 'secciones': SECCIONES}
     return render(request, 'publishers.html', context)
 
 
 # Vista para el detalle de una Editorial (publisher.html)
+@cache_catalogo
+@condicional(marca_editorial)
 def publisher_detail(request, publisher_id):
     
-    #Muestra los detalles de una editorial específica y todos sus libros.
+    #Muestra los detalles de una editorial específica y sus libros, paginados.
     
+    etiquetar(request, cache.editorial(publisher_id), cache.libros_de_editorial(publisher_id))
     editorial = get_object_or_404(Publisher, pk=publisher_id)
-    libros = Book.objects.filter(publisher=editorial).order_by('title')
-    context = {'editorial': editorial, 'libros': libros}
+    libros = paginar_catalogo(Book.objects.filter(publisher=editorial), request.GET)
+    context = {'editorial': editorial, 'libros': libros, 'pagina': libros}
     return render(request, 'publisher.html', context)
 
 
 # Vista para la lista de Autores (authors.html)
+@cache_catalogo
 def author_list(request):
     
-    #Muestra el listado de todos los autores.
+    #Muestra los autores de una inicial con su número de libros y última publicación.
     
-    autores = Author.objects.all().order_by('name')
-    context = {'autores': autores}
+    etiquetar(request, cache.LISTA_AUTORES)
+    seccion = seccion_de(request.GET)
+    pagina = directorio(Author.objects.all(), 'authors', seccion, request.GET)
+    context = {'autores': pagina, 'pagina': pagina, 'seccion': seccion, 'secciones': SECCIONES}
     return render(request, 'authors.html', context)
 
 
 # Vista para el detalle de un Autor (author.html)
+@cache_catalogo
+@condicional(marca_autor)
 def author_detail(request, author_id):
 
-    #Muestra los detalles de un autor específico y todos sus libros.
+    #Muestra los detalles de un autor específico y sus libros, paginados.
     
+    etiquetar(request, cache.autor(author_id), cache.libros_de_autor(author_id))
     autor = get_object_or_404(Author, pk=author_id)
-    libros = Book.objects.filter(authors=autor).order_by('title')
-    context = {'autor': autor, 'libros': libros}
+    libros = paginar_catalogo(Book.objects.filter(authors=autor), request.GET)
+    context = {'autor': autor, 'libros': libros, 'pagina': libros}
     return render(request, 'author.html', context)
 
 
@@ -102,12 +302,12 @@ def author_detail(request, author_id):
 def newsletter_subscription(request):
     
     #Procesa suscripciones al newsletter.
+    #La suscripción se encola y se guarda por lotes (ver newsletter.py).
     
     if request.method == 'POST':
         form = NewsletterSubscriptionForm(request.POST)
         if form.is_valid():
-            # Aquí se guardaría en base de datos o se enviaría un email
-            # Por ahora simplemente mostramos un mensaje de éxito
+            encolar_suscripcion(form.cleaned_data['name'], form.cleaned_data['email'])
             return render(request, 'newsletter_success.html', {
                 'email': form.cleaned_data['email'],
                 'name': form.cleaned_data['name']
@@ -121,20 +321,30 @@ def newsletter_subscription(request):
 def agenda_contactos(request):
     return render(request, 'agenda_contactos.html')
 
-def newsletter_subscribe(request):
-    if request.method == "POST":
-        form = NewsletterSubscriptionForm(request.POST)
-        if form.is_valid():
-            subscription = form.save() # type: ignore
-            return render(
-                request,
-                "newsletter_success.html",
-                {
-                    "name": subscription.name,
-                    "email": subscription.email,
-                },
-            )
-    else:
-        form = NewsletterSubscriptionForm()
 
-    return render(request, "newsletter_form.html", {"form": form})
\ No newline at end of file
+# API de sincronización de la agenda (contacts.py)
+@require_http_methods(['GET', 'POST'])
+def agenda_sync(request):
+
+    # GET ?since=<token>: cambios desde el token.
+    # POST {"since": token, "changes": [...]}: aplica el lote y responde igual.
+    # Cada usuario sincroniza solo su agenda.
+
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'authentication_required'}, status=401)
+    try:
+        if request.method == 'POST':
+            datos = json.loads(request.body)
+            token, cambios = contacts.leer_token(datos.get('since')), datos.get('changes') or []
+        else:
+            token, cambios = contacts.leer_token(request.GET.get('since')), []
+        respuesta = contacts.sincronizar(request.user, token, cambios)
+    except contacts.CambiosNoValidos as error:
+        return JsonResponse({'error': 'invalid_changes', 'changes': error.errores}, status=400)
+    except (ValueError, TypeError, AttributeError):
+        return JsonResponse({'error': 'invalid'}, status=400)
+    return JsonResponse(respuesta)
+
+def newsletter_subscribe(request):
+    #Misma suscripción que newsletter_subscription, en /newsletter/subscribe/ sin prefijo de idioma.
+    return newsletter_subscription(request)
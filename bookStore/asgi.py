@@ -12,5 +12,20 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bookStore.settings')
+# El catálogo se sirve con las vistas asíncronas (appBookStore/async_views.py).
+os.environ.setdefault('BOOKSTORE_ASYNC_VIEWS', '1')
 
 application = get_asgi_application()
+
+# Ficheros estáticos precomprimidos servidos antes de Django (perfil de producción).
+from django.conf import settings  # noqa: E402
+
+if settings.STATIC_ASSETS_SERVE:
+    from appBookStore.static_assets import ServidorEstaticosASGI  # noqa: E402
+
+    application = ServidorEstaticosASGI(application)
+
+# El índice de autocompletado se construye en segundo plano al arrancar.
+from appBookStore.typeahead import precargar  # noqa: E402
+
+precargar()
@@ -11,8 +11,11 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 
+import os
 from pathlib import Path
 
+from .databases import sqlite_desarrollo, sqlite_produccion
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -52,6 +55,9 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# La instrumentación va la primera para medir también el resto de middlewares.
+MIDDLEWARE.insert(0, 'appBookStore.middleware.InstrumentacionMiddleware')
+
 
 
 ROOT_URLCONF = 'bookStore.urls'
@@ -78,13 +84,89 @@ WSGI_APPLICATION = 'bookStore.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
+# BOOKSTORE_DB_PROFILE=production activa WAL, conexiones persistentes y la
+# réplica de lectura del catálogo (ver bookStore/databases.py). La réplica es
+# el mismo fichero en solo lectura salvo que se indique BOOKSTORE_DB_REPLICA.
+if os.environ.get('BOOKSTORE_DB_PROFILE') == 'production':
+    DATABASES = sqlite_produccion(
+        BASE_DIR / 'db.sqlite3',
+        replica=os.environ.get('BOOKSTORE_DB_REPLICA'),
+    )
+    DATABASE_ROUTERS = ['appBookStore.routers.CatalogoRouter']
+else:
+    DATABASES = sqlite_desarrollo(BASE_DIR / 'db.sqlite3')
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# La caché de respuestas del catálogo (appBookStore/cache.py) funciona igual
+# con la caché en memoria local o con la basada en ficheros:
+#   'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+#   'LOCATION': BASE_DIR / 'cache',
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
     }
 }
 
+CATALOGO_CACHE_ENABLED = True
+CATALOGO_CACHE_ALIAS = 'default'
+CATALOGO_CACHE_TIMEOUT = 600  # segundos
+
+# Vistas asíncronas del catálogo (appBookStore/async_views.py); asgi.py las
+# activa para que bajo ASGI no pasen por el ejecutor de hilos.
+CATALOGO_ASYNC_VIEWS = os.environ.get('BOOKSTORE_ASYNC_VIEWS') == '1'
+
+# Instrumentación por petición (appBookStore/middleware.py): cabecera
+# Server-Timing y registro muestreado de peticiones lentas.
+INSTRUMENTATION_ENABLED = True
+SLOW_REQUEST_MS = 500
+SLOW_REQUEST_SAMPLE_RATE = 0.1
+
+# Suscripciones al newsletter (appBookStore/newsletter.py): se escriben por
+# lotes al llenarse la cola o, como mucho, este número de segundos después.
+NEWSLETTER_BATCH_SIZE = 500
+NEWSLETTER_FLUSH_INTERVAL = 1.0
+
+# Segundos que dura una reserva de stock sin confirmar (appBookStore/reservations.py).
+RESERVATION_TTL = 15 * 60
+
+# Autocompletado en memoria (appBookStore/typeahead.py): palabras de cada
+# nombre que se indexan, longitud máxima de las claves, cambios acumulados
+# antes de fundirlos y segundos entre reconstrucciones completas.
+TYPEAHEAD_MAX_PALABRAS = 4
+TYPEAHEAD_MAX_LONGITUD = 24
+TYPEAHEAD_MAX_CAMBIOS = 10000
+TYPEAHEAD_REFRESCO = 900
+
+# Páginas del catálogo pre-renderizadas (appBookStore/prerender.py, comando
+# prerender_catalog). Para regenerar solo lo que cambia, la caché de arriba
+# tiene que compartirse entre el servidor y el comando.
+PRERENDER_ROOT = BASE_DIR / 'prerender'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'rendimiento': {
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': BASE_DIR / 'slow_requests.log',
+            'maxBytes': 5 * 1024 * 1024,
+            'backupCount': 3,
+            'encoding': 'utf-8',
+        },
+    },
+    'loggers': {
+        'appBookStore.rendimiento': {
+            'handlers': ['rendimiento'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -130,6 +212,17 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [ BASE_DIR / "static" ]
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# BOOKSTORE_STATIC_PROFILE=production: collectstatic escribe los nombres con
+# el hash del contenido y las versiones gzip/brotli, y wsgi.py/asgi.py los
+# sirven desde memoria con caché de un año (ver appBookStore/static_assets.py).
+STATIC_ASSETS_SERVE = os.environ.get('BOOKSTORE_STATIC_PROFILE') == 'production'
+if STATIC_ASSETS_SERVE:
+    STORAGES = {
+        'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+        'staticfiles': {'BACKEND': 'appBookStore.static_assets.AlmacenComprimido'},
+    }
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
@@ -142,6 +235,12 @@ MEDIA_ROOT = BASE_DIR / 'media'
 # URL pública para acceder a esos archivos desde el navegador
 MEDIA_URL = '/media/'
 
+# Inicio de sesión (la agenda de contactos es de cada usuario). Son nombres de
+# URL para que lleven el prefijo del idioma activo.
+LOGIN_URL = 'login'
+LOGIN_REDIRECT_URL = 'agenda_contactos'
+LOGOUT_REDIRECT_URL = 'index'
+
 # ===== SEGURIDAD =====
 # CSRF y CORS
 CSRF_COOKIE_SECURE = False  # True en producción con HTTPS
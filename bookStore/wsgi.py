@@ -14,3 +14,16 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bookStore.settings')
 
 application = get_wsgi_application()
+
+# Ficheros estáticos precomprimidos servidos antes de Django (perfil de producción).
+from django.conf import settings  # noqa: E402
+
+if settings.STATIC_ASSETS_SERVE:
+    from appBookStore.static_assets import ServidorEstaticosWSGI  # noqa: E402
+
+    application = ServidorEstaticosWSGI(application)
+
+# El índice de autocompletado se construye en segundo plano al arrancar.
+from appBookStore.typeahead import precargar  # noqa: E402
+
+precargar()
@@ -0,0 +1,135 @@
+"""Compara el catálogo servido por WSGI (vistas síncronas, un hilo por
+petición) con ASGI (vistas asíncronas, ``AsyncClient``) bajo concurrencia.
+
+Cada modo se ejecuta en un proceso aparte, porque las vistas del catálogo se
+eligen al cargar las URLs (``BOOKSTORE_ASYNC_VIEWS``), sobre el mismo
+catálogo sintético y con la caché de respuestas desactivada.
+
+    python scripts/bench_async.py --books 10000 --concurrency 16 --requests 800
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+RUTAS = ['/es/', '/es/books/', '/es/books/?search=memoria', '/es/publishers/', '/es/authors/']
+
+
+def _percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, round(p / 100 * len(ordenados)))]
+
+
+def _resumen(modo, tiempos, duracion):
+    return {
+        'modo': modo,
+        'peticiones_s': len(tiempos) / duracion,
+        'p50_ms': statistics.median(tiempos),
+        'p95_ms': _percentil(tiempos, 95),
+        'p99_ms': _percentil(tiempos, 99),
+    }
+
+
+def medir_wsgi(urls, concurrencia):
+    from django.db import connection
+    from django.test import Client
+
+    clientes = {}
+
+    def pedir(url):
+        client = clientes.setdefault(threading.get_ident(), Client())
+        inicio = time.perf_counter()
+        response = client.get(url)
+        assert response.status_code == 200, url
+        return (time.perf_counter() - inicio) * 1000
+
+    def cerrar(_):
+        connection.close()
+
+    with ThreadPoolExecutor(concurrencia) as pool:
+        inicio = time.perf_counter()
+        tiempos = list(pool.map(pedir, urls))
+        duracion = time.perf_counter() - inicio
+        list(pool.map(cerrar, range(concurrencia)))
+    return _resumen('wsgi', tiempos, duracion)
+
+
+def medir_asgi(urls, concurrencia):
+    from django.test import AsyncClient
+
+    async def principal():
+        client = AsyncClient()
+        semaforo = asyncio.Semaphore(concurrencia)
+
+        async def pedir(url):
+            async with semaforo:
+                inicio = time.perf_counter()
+                response = await client.get(url)
+                assert response.status_code == 200, url
+                return (time.perf_counter() - inicio) * 1000
+
+        inicio = time.perf_counter()
+        tiempos = await asyncio.gather(*(pedir(url) for url in urls))
+        return tiempos, time.perf_counter() - inicio
+
+    tiempos, duracion = asyncio.run(principal())
+    return _resumen('asgi', tiempos, duracion)
+
+
+def hijo(args):
+    sys.path.insert(0, str(BASE_DIR))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bookStore.settings')
+    import django
+    django.setup()
+
+    from django.test import override_settings
+    from django.test.utils import setup_test_environment
+
+    from appBookStore.benchmarking import base_de_datos_temporal, sembrar_catalogo
+
+    setup_test_environment()
+    urls = [RUTAS[i % len(RUTAS)] for i in range(args.requests)]
+    with override_settings(CATALOGO_CACHE_ENABLED=False, DEBUG=False), base_de_datos_temporal():
+        sembrar_catalogo(args.books)
+        medir = medir_asgi if args.mode == 'asgi' else medir_wsgi
+        # Una pasada de calentamiento antes de medir.
+        medir(RUTAS, 1)
+        print(json.dumps(medir(urls, args.concurrency)))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--books', type=int, default=10000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=800)
+    parser.add_argument('--mode', choices=['wsgi', 'asgi'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        hijo(args)
+        return
+
+    print(f'{"modo":<8}{"peticiones/s":>14}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}')
+    for modo in ('wsgi', 'asgi'):
+        entorno = dict(os.environ, BOOKSTORE_ASYNC_VIEWS='1' if modo == 'asgi' else '0')
+        salida = subprocess.run(
+            [sys.executable, __file__, '--mode', modo, '--books', str(args.books),
+             '--concurrency', str(args.concurrency), '--requests', str(args.requests)],
+            env=entorno, check=True, capture_output=True, text=True,
+        ).stdout
+        r = json.loads(salida.strip().splitlines()[-1])
+        print(f'{r["modo"]:<8}{r["peticiones_s"]:>14.1f}{r["p50_ms"]:>10.2f}'
+              f'{r["p95_ms"]:>10.2f}{r["p99_ms"]:>10.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""Mide bytes y tiempo de servidor por pulsación en la búsqueda en vivo.
+
+Compara la página completa (lo que descargaba antes interactive.js) con el
+fragmento HTML y con la respuesta JSON. La caché de respuestas se desactiva
+salvo con ``--with-cache``: si no, cada pulsación repetida sería un acierto.
+
+    python scripts/bench_live_search.py --books 10000
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bookStore.settings')
+import django
+django.setup()
+
+from django.test import Client, override_settings
+
+from appBookStore.benchmarking import base_de_datos_temporal, sembrar_catalogo
+
+MODOS = {
+    'página completa': {},
+    'fragmento': {'HTTP_X_REQUESTED_WITH': 'XMLHttpRequest'},
+    'json': {'HTTP_X_REQUESTED_WITH': 'XMLHttpRequest', 'HTTP_ACCEPT': 'application/json'},
+}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--books', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--with-cache', action='store_true',
+                        help='Mide con la caché de respuestas activada.')
+    args = parser.parse_args()
+
+    with base_de_datos_temporal(), override_settings(CATALOGO_CACHE_ENABLED=args.with_cache):
+        sembrar_catalogo(args.books)
+        client = Client()
+        # Simula las pulsaciones al escribir "memoria"
+        pulsaciones = ['me', 'mem', 'memo', 'memor', 'memori', 'memoria']
+
+        print(f'{"modo":<18}{"bytes/pulsación":>18}{"ms/pulsación":>15}')
+        for modo, cabeceras in MODOS.items():
+            total_bytes = 0
+            inicio = time.perf_counter()
+            for _ in range(args.repeat):
+                for termino in pulsaciones:
+                    response = client.get('/es/books/', {'search': termino}, **cabeceras)
+                    total_bytes += len(response.content)
+            n = args.repeat * len(pulsaciones)
+            ms = (time.perf_counter() - inicio) / n * 1000
+            print(f'{modo:<18}{total_bytes / n:>18.0f}{ms:>15.2f}')
+
+if __name__ == '__main__':
+    main()
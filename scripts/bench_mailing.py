@@ -0,0 +1,65 @@
+"""Mide el envío de una campaña del newsletter a muchos suscriptores.
+
+Siembra los suscriptores en una base de datos temporal y envía la campaña con
+el backend de correo indicado (``locmem`` guarda los mensajes en memoria,
+``dummy`` los descarta y ``file`` los escribe en un directorio temporal).
+
+    python scripts/bench_mailing.py --subscribers 100000 --backend dummy
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bookStore.settings')
+import django
+django.setup()
+
+from django.core.mail import get_connection
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from appBookStore.benchmarking import base_de_datos_temporal
+from appBookStore.models import NewsletterSubscription
+from appBookStore.newsletter import crear_campana, enviar_campana
+
+BACKENDS = {
+    'locmem': 'django.core.mail.backends.locmem.EmailBackend',
+    'dummy': 'django.core.mail.backends.dummy.EmailBackend',
+    'file': 'django.core.mail.backends.filebased.EmailBackend',
+}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--subscribers', type=int, default=100000)
+    parser.add_argument('--backend', choices=BACKENDS, default='locmem')
+    parser.add_argument('--batch-size', type=int, default=500)
+    args = parser.parse_args()
+
+    with base_de_datos_temporal(), tempfile.TemporaryDirectory() as directorio:
+        NewsletterSubscription.objects.bulk_create(
+            [NewsletterSubscription(name=f'Lector {i}', email=f'lector{i}@example.com')
+             for i in range(args.subscribers)],
+            batch_size=5000,
+        )
+        campana = crear_campana('Novedades del mes', 'Nuevos libros en el catálogo.\n' * 20)
+        opciones = {'file_path': directorio} if args.backend == 'file' else {}
+        conexion = get_connection(BACKENDS[args.backend], **opciones)
+
+        with CaptureQueriesContext(connection) as consultas:
+            inicio = time.perf_counter()
+            enviados = enviar_campana(campana, args.batch_size, conexion=conexion)
+            duracion = time.perf_counter() - inicio
+
+        print(f'{enviados} mensajes con el backend {args.backend} en {duracion:.1f}s '
+              f'({enviados / duracion:.0f} mensajes/s), {len(consultas)} consultas')
+
+
+if __name__ == '__main__':
+    main()
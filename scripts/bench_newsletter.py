@@ -0,0 +1,96 @@
+"""Prueba de carga de las suscripciones al newsletter sobre SQLite.
+
+Compara la escritura fila a fila (``get_or_create`` por suscripción) con la
+cola por lotes de ``appBookStore/newsletter.py``, llamada directamente y a
+través de la vista con varios hilos. Una parte de los correos se repite para
+simular reenvíos del formulario.
+
+    python scripts/bench_newsletter.py --subscriptions 20000 --threads 4
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bookStore.settings')
+import django
+django.setup()
+
+from django.db import connection
+from django.test import Client, override_settings
+
+from appBookStore import newsletter
+from appBookStore.benchmarking import base_de_datos_temporal
+from appBookStore.models import NewsletterSubscription
+
+
+def correos(n, repetidos, semilla=42):
+    rnd = random.Random(semilla)
+    unicos = int(n * (1 - repetidos))
+    return [f'lector{rnd.randrange(unicos)}@example.com' for _ in range(n)]
+
+
+def fila_a_fila(emails):
+    for email in emails:
+        NewsletterSubscription.objects.get_or_create(email=email, defaults={'name': 'Lector'})
+
+
+def cola(emails):
+    for email in emails:
+        newsletter.encolar_suscripcion('Lector', email)
+    newsletter.volcar_suscripciones()
+
+
+def vista(emails, hilos):
+    def trabajar(parte):
+        client = Client()
+        try:
+            for email in parte:
+                client.post('/es/newsletter/', {'email': email, 'name': 'Lector'})
+        finally:
+            connection.close()
+
+    trabajadores = [threading.Thread(target=trabajar, args=(emails[i::hilos],)) for i in range(hilos)]
+    for trabajador in trabajadores:
+        trabajador.start()
+    for trabajador in trabajadores:
+        trabajador.join()
+    newsletter.volcar_suscripciones()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--subscriptions', type=int, default=20000)
+    parser.add_argument('--duplicates', type=float, default=0.3,
+                        help='Fracción aproximada de correos repetidos.')
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--batch-size', type=int, default=500)
+    args = parser.parse_args()
+
+    emails = correos(args.subscriptions, args.duplicates)
+    modos = [
+        ('fila a fila', lambda: fila_a_fila(emails)),
+        ('cola', lambda: cola(emails)),
+        (f'vista ({args.threads} hilos)', lambda: vista(emails, args.threads)),
+    ]
+
+    with override_settings(NEWSLETTER_BATCH_SIZE=args.batch_size, INSTRUMENTATION_ENABLED=False), \
+            base_de_datos_temporal():
+        print(f'{"modo":<20}{"suscripciones/s":>18}{"guardadas":>12}')
+        for nombre, ejecutar in modos:
+            NewsletterSubscription.objects.all().delete()
+            inicio = time.perf_counter()
+            ejecutar()
+            duracion = time.perf_counter() - inicio
+            guardadas = NewsletterSubscription.objects.count()
+            print(f'{nombre:<20}{len(emails) / duracion:>18.0f}{guardadas:>12}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""Mide el pre-renderizado estático del catálogo: generación completa con uno
+y con varios procesos, regeneración tras cambiar un libro y verificación
+contra las vistas.
+
+Usa una base de datos SQLite temporal en fichero, para que la compartan los
+procesos.
+
+    python scripts/bench_prerender.py --books 5000 --jobs 8
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bookStore.settings')
+import django
+django.setup()
+
+from django.db import connection
+
+from appBookStore import prerender
+from appBookStore.benchmarking import base_de_datos_temporal, sembrar_catalogo
+from appBookStore.models import Book
+
+
+def medir(descripcion, funcion):
+    inicio = time.perf_counter()
+    resultado = funcion()
+    print(f'  {descripcion:<28}{time.perf_counter() - inicio:8.2f} s')
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--books', type=int, default=5000)
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directorio:
+        directorio = Path(directorio)
+        connection.settings_dict['TEST']['NAME'] = str(directorio / 'prerender.sqlite3')
+        with base_de_datos_temporal():
+            sembrar_catalogo(args.books)
+            n_paginas = len(prerender.urls_del_catalogo())
+            print(f'{args.books} libros, {n_paginas} páginas en {len(django.conf.settings.LANGUAGES)} idiomas')
+
+            medir('completo, 1 proceso', lambda: prerender.prerenderizar(directorio / 'serie', completo=True))
+            raiz = directorio / 'paralelo'
+            medir(f'completo, {args.jobs} procesos',
+                  lambda: prerender.prerenderizar(raiz, procesos=args.jobs, completo=True))
+            resultado = medir('sin cambios', lambda: prerender.prerenderizar(raiz, procesos=args.jobs))
+            print(f'    {len(resultado.renderizadas)} renderizadas')
+
+            libro = Book.objects.order_by('pk').first()
+            libro.title += ' (revisado)'
+            libro.save()
+            resultado = medir('tras cambiar un título', lambda: prerender.prerenderizar(raiz, procesos=args.jobs))
+            print(f'    {len(resultado.renderizadas)} renderizadas')
+
+            distintas = medir('verificación', lambda: prerender.verificar(raiz, procesos=args.jobs))
+            print(f'    {len(distintas)} páginas distintas de la vista')
+            if distintas:
+                sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
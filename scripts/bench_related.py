@@ -0,0 +1,92 @@
+"""Mide el cálculo de libros relacionados: ejecución completa, incremental
+tras cambiar el stock o la fecha de unos pocos libros y la consulta del panel
+en el detalle.
+
+Usa una base de datos SQLite temporal en fichero con un catálogo sintético.
+
+    python scripts/bench_related.py --books 1000000
+"""
+import argparse
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from datetime import date
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bookStore.settings')
+import django
+django.setup()
+
+from django.db import connection
+from django.test import override_settings
+
+from appBookStore import related
+from appBookStore.benchmarking import base_de_datos_temporal, sembrar_catalogo
+from appBookStore.models import Book, RelatedBook
+
+
+def medir(descripcion, funcion):
+    inicio = time.perf_counter()
+    resultado = funcion()
+    print(f'  {descripcion:<28}{time.perf_counter() - inicio:8.2f} s')
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--books', type=int, default=100000)
+    parser.add_argument('--changes', type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directorio:
+        connection.settings_dict['TEST']['NAME'] = str(Path(directorio) / 'related.sqlite3')
+        # Sin caché de respuestas: aquí solo cuenta el cálculo.
+        with override_settings(CATALOGO_CACHE_ENABLED=False), base_de_datos_temporal():
+            medir(f'sembrar {args.books} libros', lambda: sembrar_catalogo(args.books, indexar=False))
+
+            grafo = medir('cargar el grafo', related.Grafo)
+            print(f'    {len(grafo.miembros)} enlaces libro-autor, {len(grafo.rango)} editoriales')
+            inicio = time.perf_counter()
+            for i in range(0, len(grafo), max(1, len(grafo) // 10000)):
+                grafo.relacionados(i)
+            print(f'    {(time.perf_counter() - inicio) / min(len(grafo), 10000) * 1e6:.0f} µs por libro')
+            del grafo
+
+            resultado = medir('completo', lambda: related.calcular(completo=True))
+            print(f'    {resultado.calculados} libros, {RelatedBook.objects.count()} filas')
+
+            rnd = random.Random(1)
+            pks = list(Book.objects.values_list('pk', flat=True))
+            # Cambios de stock (reservas, acciones del admin): no afectan a las listas.
+            for pk in rnd.sample(pks, args.changes):
+                libro = Book.objects.get(pk=pk)
+                libro.stock += 1
+                libro.save()
+            resultado = medir(f'incremental ({args.changes} stocks)', related.calcular)
+            print(f'    {resultado.calculados} libros calculados, {resultado.cambiados} listas cambiadas')
+
+            for pk in rnd.sample(pks, args.changes):
+                libro = Book.objects.get(pk=pk)
+                libro.publication_date = date(rnd.randint(1950, 2024), 1, 1)
+                libro.save()
+            Book.objects.filter(pk__in=rnd.sample(pks, args.changes // 10)).delete()
+            resultado = medir(f'incremental ({args.changes} cambios)', related.calcular)
+            print(f'    {resultado.calculados} libros calculados, {resultado.cambiados} listas cambiadas')
+
+            muestra = rnd.sample(list(Book.objects.values_list('pk', flat=True)), 1000)
+            inicio = time.perf_counter()
+            for pk in muestra:
+                list(related.de_libro(pk))
+            print(f'  panel del detalle          {(time.perf_counter() - inicio) / len(muestra) * 1e3:8.3f} ms')
+
+            print(f'  memoria máxima            {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:8.0f} MiB')
+
+
+if __name__ == '__main__':
+    main()
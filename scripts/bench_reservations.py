@@ -0,0 +1,107 @@
+"""Prueba de carga de las reservas de stock: muchos hilos reservan, confirman
+o cancelan a la vez sobre pocos libros y al final se comprueba que no se ha
+vendido más de lo que había.
+
+Usa una base de datos SQLite temporal en fichero (no en memoria), como en
+producción; con ``BOOKSTORE_DB_PROFILE=production`` se aplican además WAL y
+las transacciones IMMEDIATE del perfil de producción.
+
+    python scripts/bench_reservations.py --threads 16 --orders 20000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bookStore.settings')
+import django
+django.setup()
+
+from django.db import connection
+from django.test import override_settings
+
+from appBookStore import reservations
+from appBookStore.benchmarking import base_de_datos_temporal
+from appBookStore.models import Book, Publisher, Reservation, ReservationItem
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--books', type=int, default=10)
+    parser.add_argument('--stock', type=int, default=1000)
+    parser.add_argument('--orders', type=int, default=20000)
+    parser.add_argument('--cancel-rate', type=float, default=0.2)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directorio, \
+            override_settings(CATALOGO_CACHE_ENABLED=False):
+        connection.settings_dict['TEST']['NAME'] = str(Path(directorio) / 'reservas.sqlite3')
+        with base_de_datos_temporal():
+            editorial = Publisher.objects.create(name='Editorial')
+            libros = Book.objects.bulk_create([
+                Book(publisher=editorial, title=f'Libro {i}', publication_date=date(2000, 1, 1), stock=args.stock)
+                for i in range(args.books)
+            ])
+            ids = [libro.pk for libro in libros]
+            resultados = Counter()
+            cerrojo = threading.Lock()
+
+            def pedido(n):
+                rnd = random.Random(n)
+                lineas = {pk: rnd.randint(1, 3) for pk in rnd.sample(ids, rnd.choice([1, 1, 1, 2, 3]))}
+                try:
+                    reserva = reservations.reservar(lineas)
+                    if rnd.random() < args.cancel_rate:
+                        reservations.liberar(reserva.token)
+                        resultado = 'canceladas'
+                    else:
+                        reservations.confirmar(reserva.token)
+                        resultado = 'confirmadas'
+                except reservations.StockInsuficiente:
+                    resultado = 'sin stock'
+                with cerrojo:
+                    resultados[resultado] += 1
+
+            def cerrar(_):
+                connection.close()
+
+            with ThreadPoolExecutor(args.threads) as pool:
+                inicio = time.perf_counter()
+                list(pool.map(pedido, range(args.orders)))
+                duracion = time.perf_counter() - inicio
+                list(pool.map(cerrar, range(args.threads)))
+
+            reservadas = resultados['confirmadas'] + resultados['canceladas']
+            print(f'{args.orders} pedidos con {args.threads} hilos en {duracion:.2f} s '
+                  f'({connection.settings_dict["OPTIONS"].get("transaction_mode", "DEFERRED")})')
+            print(f'  reservas/s:   {reservadas / duracion:10.1f}')
+            print(f'  pedidos/s:    {args.orders / duracion:10.1f}')
+            for clave in ('confirmadas', 'canceladas', 'sin stock'):
+                print(f'  {clave + ":":<14}{resultados[clave]:10d}')
+
+            vendido = Counter()
+            for book_id, cantidad in ReservationItem.objects.filter(
+                    reservation__status=Reservation.CONFIRMED).values_list('book_id', 'quantity'):
+                vendido[book_id] += cantidad
+            stock = dict(Book.objects.values_list('pk', 'stock'))
+            correcto = all(stock[pk] >= 0 and stock[pk] + vendido[pk] == args.stock for pk in ids)
+            print(f'  vendido {sum(vendido.values())} de {args.stock * args.books} unidades; '
+                  f'stock restante {sum(stock.values())}; '
+                  f'{"sin sobreventa" if correcto else "ERROR: el stock no cuadra"}')
+            if not correcto:
+                sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""Compara la búsqueda con icontains frente al índice FTS5.
+
+Crea una base de datos de pruebas temporal, la llena con un catálogo
+sintético y mide el tiempo medio por búsqueda de cada camino.
+
+    python scripts/bench_search.py --books 100000
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bookStore.settings')
+import django
+django.setup()
+
+from django.db.models import Q
+
+from appBookStore.benchmarking import base_de_datos_temporal, sembrar_catalogo
+from appBookStore.models import Book
+from appBookStore.search import buscar_libros, fts_disponible, reconstruir_indice
+
+
+def medir(funcion, repeticiones):
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        funcion()
+    return (time.perf_counter() - inicio) / repeticiones * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--books', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    if not fts_disponible():
+        sys.exit('SQLite no tiene FTS5: no hay índice que medir.')
+
+    with base_de_datos_temporal():
+        t0 = time.perf_counter()
+        sembrar_catalogo(args.books, indexar=False)
+        t1 = time.perf_counter()
+        reconstruir_indice()
+        t2 = time.perf_counter()
+        print(f'{args.books} libros sembrados en {t1 - t0:.1f}s, índice construido en {t2 - t1:.1f}s')
+
+        print(f'{"término":<14}{"icontains ms":>14}{"fts5 ms":>10}')
+        for termino in ['corazon', 'memoria', 'sombra vien', '978-84-00012']:
+            lento = medir(lambda: list(
+                Book.objects.filter(Q(title__icontains=termino) | Q(isbn__icontains=termino))
+                .order_by('title')[:25]
+            ), args.repeat)
+            rapido = medir(lambda: list(Book.objects.in_bulk(
+                buscar_libros(termino).ids(Book.objects.all(), 0, 25)
+            )), args.repeat)
+            print(f'{termino:<14}{lento:>14.2f}{rapido:>10.2f}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""Compara los ficheros estáticos servidos por Django (``django.views.static``,
+lo que hace ahora urls.py) con los precomprimidos de static_assets.py: bytes
+transferidos por fichero y codificación y latencia del manejador.
+
+Ejecuta collectstatic con el almacén comprimido en un directorio temporal.
+
+    python scripts/bench_static.py --requests 20000
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bookStore.settings')
+import django
+django.setup()
+
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.test import RequestFactory, override_settings
+from django.views.static import serve
+
+from appBookStore import static_assets
+from appBookStore.static_assets import Estaticos, ServidorEstaticosWSGI
+
+FICHEROS = ['styles.css', 'js/interactive.js']
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, round(p / 100 * len(ordenados)))]
+
+
+def latencias(funcion, n):
+    tiempos = []
+    for _ in range(n):
+        t = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - t) * 1_000_000)
+    return f'p50 {statistics.median(tiempos):7.1f} µs, p99 {percentil(tiempos, 99):7.1f} µs'
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=20000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as raiz, override_settings(STATIC_ROOT=raiz, STORAGES={
+        'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+        'staticfiles': {'BACKEND': 'appBookStore.static_assets.AlmacenComprimido'},
+    }):
+        call_command('collectstatic', interactive=False, verbosity=0)
+        estaticos = Estaticos()
+        servidor = ServidorEstaticosWSGI(lambda environ, start_response: [], estaticos)
+        print(f'brotli {"disponible" if static_assets.brotli else "no instalado (solo gzip)"}')
+
+        print('Bytes por descarga:')
+        for nombre in FICHEROS:
+            fichero = estaticos.buscar('/static/' + staticfiles_storage.stored_name(nombre))
+            tamanos = ', '.join(f'{codificacion} {len(datos):6d}' for codificacion, datos in fichero.variantes.items())
+            print(f'  {nombre:<20} {tamanos}')
+
+        print('Latencia del manejador:')
+        rf = RequestFactory()
+        for nombre in FICHEROS:
+            request = rf.get('/static/' + nombre, HTTP_ACCEPT_ENCODING='gzip, br')
+
+            def django_serve():
+                # Como el servidor de desarrollo: se lee el fichero en cada petición.
+                b''.join(serve(request, nombre, document_root=BASE_DIR / 'static'))
+
+            environ = {'REQUEST_METHOD': 'GET', 'PATH_INFO': '/static/' + staticfiles_storage.stored_name(nombre),
+                       'HTTP_ACCEPT_ENCODING': 'gzip, br'}
+
+            def precomprimido():
+                b''.join(servidor(environ, lambda estado, cabeceras: None))
+
+            print(f'  {nombre:<20} django.views.static: {latencias(django_serve, args.requests)}')
+            print(f'  {"":<20} static_assets:       {latencias(precomprimido, args.requests)}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""Mide el índice de autocompletado en memoria: tiempo de construcción,
+memoria, latencia de las búsquedas y de los cambios incrementales.
+
+Los títulos se generan en memoria con el vocabulario de los benchmarks, sin
+base de datos, para poder llegar al millón.
+
+    python scripts/bench_typeahead.py --titles 1000000
+"""
+import argparse
+import os
+import random
+import resource
+import statistics
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bookStore.settings')
+import django
+django.setup()
+
+from appBookStore.benchmarking import vocabulario
+from appBookStore.typeahead import AUTOR, LIBRO, IndiceTypeahead
+
+
+def entidades(n_titulos, semilla):
+    rnd = random.Random(semilla)
+    vocab = vocabulario(rnd)
+    for i in range(n_titulos):
+        yield LIBRO, i, ' '.join(rnd.sample(vocab, rnd.randint(2, 6))).capitalize()
+    for i in range(n_titulos // 4):
+        yield AUTOR, i, f'{rnd.choice(vocab).capitalize()} {rnd.choice(vocab).capitalize()}'
+
+
+def rss_mb():
+    # ru_maxrss está en KiB en Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, round(p / 100 * len(ordenados)))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--titles', type=int, default=1000000)
+    parser.add_argument('--queries', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--max-words', type=int, default=4)
+    parser.add_argument('--max-length', type=int, default=24)
+    args = parser.parse_args()
+
+    # Los datos se generan antes para no medir su creación.
+    catalogo = list(entidades(args.titles, args.seed))
+    rss_inicial = rss_mb()
+    inicio = time.perf_counter()
+    indice = IndiceTypeahead(catalogo,
+                             max_palabras=args.max_words, max_longitud=args.max_length)
+    construccion = time.perf_counter() - inicio
+    print(f'{args.titles} títulos (+{args.titles // 4} autores)')
+    print(f'  construcción:      {construccion:8.2f} s')
+    print(f'  memoria del índice:{indice.memoria() / 2**20:8.1f} MiB')
+    print(f'  pico de RSS:       {rss_mb() - rss_inicial:8.1f} MiB sobre los datos de entrada')
+    del catalogo
+
+    rnd = random.Random(args.seed + 1)
+    vocab = vocabulario(random.Random(args.seed))
+    terminos = [rnd.choice(vocab)[:rnd.randint(1, 6)] for _ in range(args.queries)]
+    tiempos = []
+    for termino in terminos:
+        t = time.perf_counter()
+        indice.buscar(termino, LIBRO, 5)
+        indice.buscar(termino, AUTOR, 5)
+        tiempos.append((time.perf_counter() - t) * 1000)
+    print(f'  búsqueda (libros y autores): p50 {statistics.median(tiempos):.3f} ms, '
+          f'p99 {percentil(tiempos, 99):.3f} ms')
+
+    tiempos = []
+    for i in range(5000):
+        t = time.perf_counter()
+        indice.actualizar(LIBRO, args.titles + i, f'{rnd.choice(vocab)} {rnd.choice(vocab)}')
+        tiempos.append((time.perf_counter() - t) * 1000)
+    print(f'  cambio incremental: p50 {statistics.median(tiempos):.3f} ms, p99 {percentil(tiempos, 99):.3f} ms')
+
+    inicio = time.perf_counter()
+    indice.fundir()
+    print(f'  fundir 5000 cambios: {time.perf_counter() - inicio:.2f} s (en segundo plano)')
+
+
+if __name__ == '__main__':
+    main()
@@ -88,49 +88,108 @@ function initializeDynamicSearch() {
             performAjaxSearch(this.value);
         }, 500);
     });
+
+    initializeAutocomplete(searchInput);
+}
+
+/**
+ * Sugerencias mientras escribes: libros, autores y editoriales desde el
+ * índice en memoria del servidor (/autocomplete/), sin esperar a la búsqueda.
+ */
+let autocompleteController = null;
+
+function initializeAutocomplete(searchInput) {
+    const list = document.getElementById('sugerencias');
+    if (!list) return;
+
+    let autocompleteTimeout;
+    searchInput.setAttribute('autocomplete', 'off');
+    searchInput.addEventListener('input', function() {
+        clearTimeout(autocompleteTimeout);
+        const term = this.value.trim();
+        if (!term) {
+            list.hidden = true;
+            return;
+        }
+        autocompleteTimeout = setTimeout(() => fetchSuggestions(list, term), 80);
+    });
+    searchInput.addEventListener('blur', () => {
+        // Se deja tiempo para que el clic en una sugerencia llegue al enlace
+        setTimeout(() => { list.hidden = true; }, 200);
+    });
+}
+
+function fetchSuggestions(list, term) {
+    if (autocompleteController) autocompleteController.abort();
+    autocompleteController = new AbortController();
+
+    fetch(`${list.dataset.url}?q=${encodeURIComponent(term)}`, {signal: autocompleteController.signal})
+    .then(response => response.json())
+    .then(data => {
+        list.replaceChildren();
+        ['books', 'authors', 'publishers'].forEach(type => {
+            data[type].forEach(item => {
+                const li = document.createElement('li');
+                li.className = `sugerencia-${type}`;
+                const link = document.createElement('a');
+                link.href = item.url;
+                link.textContent = item.label;
+                li.appendChild(link);
+                list.appendChild(li);
+            });
+        });
+        list.hidden = list.children.length === 0;
+    })
+    .catch(error => {
+        if (error.name === 'AbortError') return;
+        console.error('Error en autocompletado:', error);
+    });
 }
 
 /**
  * Realiza búsqueda AJAX
+ * El servidor devuelve solo el fragmento de resultados (sin la plantilla
+ * base) y cada nueva pulsación cancela la petición anterior.
  */
+let searchController = null;
+
 function performAjaxSearch(searchTerm) {
-    const currentUrl = window.location.pathname;
-    const params = new URLSearchParams();
-    params.append('search', searchTerm);
+    const results = document.getElementById('resultados-libros');
+    if (!results) return;
+
+    const form = document.querySelector('input[name="search"]').form;
+    const params = new URLSearchParams(new FormData(form));
+    params.set('search', searchTerm);
+
+    if (searchController) searchController.abort();
+    searchController = new AbortController();
 
     // Usar Fetch API para AJAX
-    fetch(`${currentUrl}?${params.toString()}`, {
+    fetch(`${window.location.pathname}?${params.toString()}`, {
         method: 'GET',
         headers: {
             'X-Requested-With': 'XMLHttpRequest'
-        }
+        },
+        signal: searchController.signal
     })
     .then(response => response.text())
     .then(html => {
-        // Extraer solo la lista de resultados
-        const parser = new DOMParser();
-        const doc = parser.parseFromString(html, 'text/html');
-        const newContent = doc.querySelector('ul') || doc.querySelector('.detalle-contenido');
-        
-        if (newContent) {
-            const currentContent = document.querySelector('ul') || document.querySelector('.detalle-contenido');
-            if (currentContent) {
-                // Efecto de fade-out y fade-in
-                currentContent.style.opacity = '0.5';
-                currentContent.style.transition = 'opacity 0.3s ease';
-                
-                setTimeout(() => {
-                    currentContent.innerHTML = newContent.innerHTML;
-                    currentContent.style.opacity = '1';
-                }, 300);
-            }
-        }
-        
+        // Efecto de fade-out y fade-in
+        results.style.opacity = '0.5';
+        results.style.transition = 'opacity 0.3s ease';
+
+        setTimeout(() => {
+            results.innerHTML = html;
+            results.style.opacity = '1';
+        }, 300);
+
         // Ocultar indicador
         const indicator = document.getElementById('loading-indicator');
         if (indicator) indicator.remove();
     })
     .catch(error => {
+        // Las peticiones canceladas por una búsqueda posterior no son errores
+        if (error.name === 'AbortError') return;
         console.error('Error en búsqueda AJAX:', error);
         const indicator = document.getElementById('loading-indicator');
         if (indicator) indicator.remove();